@@ -0,0 +1,75 @@
+"""
+Compares the cache backends: bulk insert, fingerprint lookups and reads
+
+Usage: python -m benchmarks.cache_backends [--users N] [--backends sqlite memory log]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from meeting_butler.cache import open_cache
+from meeting_butler.user import User
+
+
+def _users(count: int) -> list[User]:
+    return [
+        User(
+            name=f"NAME{index}",
+            surname=f"SURNAME{index}",
+            company=f"COMPANY{index % 100}",
+            email=f"USER{index}@EXAMPLE.COM",
+            title="ENGINEER",
+            asn=64496 + index % 16,
+            country="IT",
+        )
+        for index in range(count)
+    ]
+
+
+def _measure(backend: str, filename: str, users: list[User]) -> dict[str, float]:
+    keys = [user.email for user in users]
+    lookups = random.Random(0).sample(keys, min(len(keys), 1000))
+    results = {}
+
+    started = time.perf_counter()
+    with open_cache(filename, backend, reset=True) as cache:
+        cache.update((user.email, user.to_json()) for user in users)
+    results["insert"] = len(users) / (time.perf_counter() - started)
+
+    with open_cache(filename, backend) as cache:
+        started = time.perf_counter()
+        cache.fingerprints(keys)
+        results["fingerprints"] = len(keys) / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for key in lookups:
+            cache[key]  # pylint: disable=pointless-statement
+        results["reads"] = len(lookups) / (time.perf_counter() - started)
+
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=20000, help="Number of cached users")
+    parser.add_argument(
+        "--backends", nargs="+", default=["sqlite", "memory", "log"], help="Backends to compare"
+    )
+    args = parser.parse_args()
+
+    users = _users(args.users)
+    print(f"{'backend':<10}{'insert/s':>14}{'fingerprints/s':>18}{'reads/s':>14}")
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in args.backends:
+            results = _measure(backend, os.path.join(directory, backend), users)
+            print(
+                f"{backend:<10}{results['insert']:>14.0f}"
+                f"{results['fingerprints']:>18.0f}{results['reads']:>14.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
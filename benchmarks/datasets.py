@@ -0,0 +1,135 @@
+"""
+Synthetic attendee datasets, rendered in the formats served by each data source
+"""
+
+import csv
+import io
+import json
+import random
+
+# Attendees per Eventbrite page, as returned by the API
+EVENTBRITE_PAGE_SIZE = 50
+
+COMPANIES = ["ITNOG", "EXAMPLE", "ACME", "INITECH", "GLOBEX", ""]
+TITLES = ["NETWORK ENGINEER", "CTO", "PEERING COORDINATOR", "STUDENT", ""]
+
+
+def attendees(count: int, seed: int = 0) -> list[dict]:
+    """
+    Generates attendees. The same count and seed always generate the same attendees
+
+    Arguments:
+    ----------
+    count: int
+        Number of attendees
+    seed: int
+        Random seed. Default: 0
+
+    Returns:
+    --------
+    list[dict]: Attendees, with the fields shared by all of the data sources
+    """
+    generator = random.Random(seed)
+    return [
+        {
+            "name": f"Name{index}",
+            "surname": f"Surname{generator.randrange(count)}",
+            "company": generator.choice(COMPANIES),
+            "job_title": generator.choice(TITLES),
+            "email": f"attendee{index}@example{index % 97}.it",
+            # Some attendees do not tell their ASN
+            "asn": f"AS{generator.randrange(64496, 65535)}" if generator.random() < 0.8 else "",
+        }
+        for index in range(count)
+    ]
+
+
+def eventbrite_pages(records: list[dict], page_size: int = EVENTBRITE_PAGE_SIZE) -> list[bytes]:
+    """
+    Renders attendees as the pages of the Eventbrite attendees API
+
+    Arguments:
+    ----------
+    records: list[dict]
+        Attendees, see attendees()
+    page_size: int
+        Attendees per page. Default: EVENTBRITE_PAGE_SIZE
+
+    Returns:
+    --------
+    list[bytes]: JSON bodies, first page first
+    """
+    chunks = [records[start : start + page_size] for start in range(0, len(records), page_size)]
+    chunks = chunks or [[]]
+    return [
+        json.dumps(
+            {
+                "pagination": {"page_number": number, "page_count": len(chunks)},
+                "attendees": [
+                    {
+                        "cancelled": False,
+                        "changed": "2025-01-01T00:00:00Z",
+                        "profile": {
+                            "first_name": record["name"],
+                            "last_name": record["surname"],
+                            "company": record["company"],
+                            "email": record["email"],
+                            "job_title": record["job_title"],
+                        },
+                        "answers": [{"question": "ASN", "answer": record["asn"]}],
+                    }
+                    for record in chunk
+                ],
+            }
+        ).encode("utf-8")
+        for number, chunk in enumerate(chunks, 1)
+    ]
+
+
+def formbuilder_csv(records: list[dict]) -> bytes:
+    """
+    Renders attendees as the CSV export of formbuilder
+
+    Arguments:
+    ----------
+    records: list[dict]
+        Attendees, see attendees()
+
+    Returns:
+    --------
+    bytes: CSV body
+    """
+    output = io.StringIO()
+    writer = csv.writer(output)
+    for index, record in enumerate(records):
+        writer.writerow(
+            [
+                index,
+                "2025-01-01 00:00:00",
+                record["name"],
+                record["surname"],
+                record["company"],
+                record["job_title"],
+                record["email"],
+                "",
+                "IT",
+                record["asn"],
+            ]
+        )
+    return output.getvalue().encode("utf-8")
+
+
+def pretino_json(records: list[dict]) -> bytes:
+    """
+    Renders attendees as the Pretino attendees API
+
+    Arguments:
+    ----------
+    records: list[dict]
+        Attendees, see attendees()
+
+    Returns:
+    --------
+    bytes: JSON body
+    """
+    return json.dumps(records).encode("utf-8")
@@ -0,0 +1,164 @@
+"""
+Local HTTP server standing in for the data sources and for meetingtool
+"""
+
+import json
+import logging
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+
+import requests
+
+from benchmarks import datasets
+from meeting_butler.httpclient import HTTPClient
+
+LOGGER = logging.getLogger(__name__)
+
+EVENT = "1"
+FORMBUILDER_PATH = "/formbuilder.csv"
+PRETINO_PATH = "/pretino.json"
+EVENTBRITE_PATH = f"/v3/events/{EVENT}/attendees/"
+MEETINGTOOL_PATH = "/api/registrations/import/"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "BenchmarkServer"
+    # Keeps the connections alive, as the real services do
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written apart, Nagle would hold the body for a delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+        LOGGER.debug(format, *args)
+
+    def _reply(self, body: bytes, content_type: str) -> None:
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        parts = urlsplit(self.path)
+        data = self.server.data
+        if parts.path == EVENTBRITE_PATH:
+            page = int(parse_qs(parts.query).get("page", ["1"])[0])
+            if 1 <= page <= len(data["eventbrite"]):
+                self._reply(data["eventbrite"][page - 1], "application/json")
+                return
+        elif parts.path == FORMBUILDER_PATH:
+            self._reply(data["formbuilder"], "text/csv")
+            return
+        elif parts.path == PRETINO_PATH:
+            self._reply(data["pretino"], "application/json")
+            return
+        self.send_error(HTTPStatus.NOT_FOUND)
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        if urlsplit(self.path).path != MEETINGTOOL_PATH:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        records = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        if self.server.import_latency:
+            time.sleep(self.server.import_latency)
+        with self.server.lock:
+            self.server.imported += len(records)
+        self._reply(b"{}", "application/json")
+
+
+class BenchmarkServer(ThreadingHTTPServer):
+    """
+    Serves a synthetic dataset in the format of every data source, and accepts meetingtool
+    imports, each answered after import_latency seconds.
+
+    Arguments:
+    ----------
+    import_latency: float
+        Seconds meetingtool takes to answer an import request. Default: 0
+    """
+
+    daemon_threads = True
+    # Data source pages and imports connect concurrently, a short backlog drops connections
+    request_queue_size = 128
+
+    def __init__(self, import_latency: float = 0) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.import_latency = import_latency
+        self.lock = threading.Lock()
+        self.imported = 0
+        self.data: dict = {}
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """
+        Base URL of the server
+        """
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def load(self, records: list[dict]) -> None:
+        """
+        Renders the attendees, which are served from now on
+
+        Arguments:
+        ----------
+        records: list[dict]
+            Attendees, see datasets.attendees()
+        """
+        self.data = {
+            "eventbrite": datasets.eventbrite_pages(records),
+            "formbuilder": datasets.formbuilder_csv(records),
+            "pretino": datasets.pretino_json(records),
+        }
+        with self.lock:
+            self.imported = 0
+
+    def start(self) -> None:
+        """
+        Serves the requests in a background thread
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops serving the requests
+        """
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+
+
+class LocalClient(HTTPClient):
+    """
+    HTTP client sending every request to the benchmark server, whatever host the URL points
+    to, and recording how long each request takes.
+
+    Arguments:
+    ----------
+    url: str
+        Base URL of the benchmark server
+    kwargs:
+        Any argument accepted by HTTPClient
+    """
+
+    def __init__(self, url: str, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.url = urlsplit(url)
+        self.latencies: list[float] = []
+        self._latencies_lock = threading.Lock()
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        parts = urlsplit(url)
+        url = urlunsplit((self.url.scheme, self.url.netloc, parts.path, parts.query, ""))
+        started = time.perf_counter()
+        response = super().request(method, url, **kwargs)
+        with self._latencies_lock:
+            self.latencies.append(time.perf_counter() - started)
+        return response
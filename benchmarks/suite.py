@@ -0,0 +1,297 @@
+"""
+Benchmark suite: measures the data source adapters, the cache, the meetingtool import and
+the end-to-end sync against synthetic datasets served by a local HTTP server
+
+Usage: python -m benchmarks.suite [--sizes 1000 10000 100000] [--save] [--baseline PATH]
+
+Results are compared with the baseline, if any, and the exit status is 1 if any stage got
+slower or bigger than the tolerance allows. --save stores the results as the new baseline.
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Optional
+
+from benchmarks import datasets
+from benchmarks.server import (
+    EVENT,
+    FORMBUILDER_PATH,
+    PRETINO_PATH,
+    BenchmarkServer,
+    LocalClient,
+)
+from meeting_butler import eventbrite, formbuilder, meetingtool, pretino
+from meeting_butler.cache import open_cache
+from meeting_butler.diff import diff
+from meeting_butler.meeting_butler import sync
+
+BASELINES = os.path.join(os.path.dirname(__file__), "baselines")
+
+MEETINGTOOL_HOSTNAME = "meetingtool.invalid"
+SOURCES = ("eventbrite", "formbuilder", "pretino")
+
+
+class Suite:
+    """
+    Runs the stages against a dataset of the given size
+
+    Arguments:
+    ----------
+    server: BenchmarkServer
+        Server the dataset is loaded into
+    directory: str
+        Directory the caches are created into
+    cache_backend: str
+        Cache backend, see open_cache()
+    repeat: int
+        Runs per stage, the fastest one is kept
+    """
+
+    def __init__(self, server: BenchmarkServer, directory: str, cache_backend: str, repeat: int):
+        self.server = server
+        self.directory = directory
+        self.cache_backend = cache_backend
+        self.repeat = repeat
+        self.client = LocalClient(server.url)
+        self.users: list = []
+
+    def _source_settings(self, source: str) -> dict:
+        if source == "eventbrite":
+            return {"event": EVENT, "token": "token", "parallelism": 4}
+        if source == "formbuilder":
+            return {"url": self.server.url + FORMBUILDER_PATH}
+        return {"url": self.server.url + PRETINO_PATH, "token": "token"}
+
+    def _fetch(self, source: str) -> list:
+        settings = self._source_settings(source)
+        if source == "eventbrite":
+            users = eventbrite.iter_registered_users(
+                settings["event"], settings["token"], settings["parallelism"], self.client
+            )
+        elif source == "formbuilder":
+            users = formbuilder.iter_registered_users(settings["url"], self.client)
+        else:
+            users = pretino.iter_registered_users(settings["url"], settings["token"], self.client)
+        return list(users)
+
+    def _cache(self, name: str):
+        return open_cache(
+            os.path.join(self.directory, name), self.cache_backend, reset=True, namespace=name
+        )
+
+    def _diff(self) -> None:
+        with self._cache("diff") as cache:
+            cache.update((user.email, user.to_json()) for user in self.users)
+            cache.save()
+            # Steady state: nothing changed since the previous sync
+            diff(cache, self.users)
+
+    def _import(self) -> None:
+        with meetingtool.Importer(
+            MEETINGTOOL_HOSTNAME, "token", rate_limit=None, client=self.client
+        ) as importer:
+            importer.submit(self.users)
+            importer.results()
+
+    def _sync(self, source: str) -> None:
+        sync(
+            MEETINGTOOL_HOSTNAME,
+            "token",
+            self._source_settings(source),
+            source,
+            os.path.join(self.directory, f"sync-{source}"),
+            cache_settings={"backend": self.cache_backend, "reset": True},
+            meetingtool_settings={"rate_limit": None},
+            client=self.client,
+        )
+
+    def _measure(self, run: Callable[[], Optional[list]], size: int) -> dict:
+        """
+        Returns the throughput and request latencies of the fastest run, and the peak memory
+        allocated by an extra traced run, which is slower
+        """
+        best = None
+        for _ in range(self.repeat):
+            self.client.latencies.clear()
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+            if best is None or elapsed < best[0]:
+                best = (elapsed, sorted(self.client.latencies))
+
+        elapsed, latencies = best
+        result = {"seconds": elapsed, "throughput": size / elapsed}
+        if latencies:
+            result["latency_p50_ms"] = 1000 * statistics.median(latencies)
+            result["latency_p95_ms"] = 1000 * latencies[int(0.95 * (len(latencies) - 1))]
+
+        tracemalloc.start()
+        try:
+            run()
+            result["peak_mib"] = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+
+        return result
+
+    def run(self, size: int) -> dict[str, dict]:
+        """
+        Runs every stage against size attendees
+
+        Arguments:
+        ----------
+        size: int
+            Number of attendees
+
+        Returns:
+        --------
+        dict[str, dict]: stage@size to its measures
+        """
+        self.server.load(datasets.attendees(size))
+        results = {}
+
+        for source in SOURCES:
+            results[f"fetch:{source}@{size}"] = self._measure(lambda: self._fetch(source), size)
+        # Sources generate distinct email addresses, hence all of the attendees are there
+        self.users = self._fetch("pretino")
+        results[f"cache:diff@{size}"] = self._measure(self._diff, size)
+        results[f"meetingtool:import@{size}"] = self._measure(self._import, size)
+        for source in SOURCES:
+            results[f"sync:{source}@{size}"] = self._measure(lambda: self._sync(source), size)
+
+        return results
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    """
+    Returns the stages that are slower or take more memory than the baseline, beyond tolerance
+
+    Arguments:
+    ----------
+    results: dict[str, dict]
+        Current results
+    baseline: dict[str, dict]
+        Baseline results
+    tolerance: float
+        Accepted relative difference, e.g. 0.2 for 20%
+
+    Returns:
+    --------
+    list[str]: Regressions, as human readable lines
+    """
+    regressions = []
+    for stage, result in results.items():
+        if stage not in baseline:
+            continue
+        previous = baseline[stage]
+        if result["throughput"] < previous["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{stage}: throughput {result['throughput']:.0f}/s, "
+                f"was {previous['throughput']:.0f}/s"
+            )
+        if result["peak_mib"] > previous["peak_mib"] * (1 + tolerance):
+            regressions.append(
+                f"{stage}: peak memory {result['peak_mib']:.1f} MiB, "
+                f"was {previous['peak_mib']:.1f} MiB"
+            )
+    return regressions
+
+
+def _report(results: dict[str, dict], baseline: dict[str, dict]) -> None:
+    print(f"{'stage':<28}{'users/s':>12}{'vs base':>9}{'p50 ms':>9}{'p95 ms':>9}{'peak MiB':>10}")
+    for stage, result in results.items():
+        change = ""
+        if stage in baseline:
+            change = f"{result['throughput'] / baseline[stage]['throughput'] - 1:+.0%}"
+        latencies = [
+            f"{result[key]:.2f}" if key in result else "-"
+            for key in ("latency_p50_ms", "latency_p95_ms")
+        ]
+        print(
+            f"{stage:<28}{result['throughput']:>12.0f}{change:>9}"
+            f"{latencies[0]:>9}{latencies[1]:>9}{result['peak_mib']:>10.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Attendees"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage")
+    parser.add_argument(
+        "--import-latency", type=float, default=0, help="Seconds per meetingtool import"
+    )
+    parser.add_argument("--cache-backend", default="sqlite", help="sqlite, memory or log")
+    parser.add_argument(
+        "--baseline",
+        default=os.path.join(BASELINES, f"{platform.node() or 'default'}.json"),
+        help="Baseline file. Default: one per host, under benchmarks/baselines",
+    )
+    parser.add_argument("--save", action="store_true", help="Store the results as baseline")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="Accepted slowdown. Default: 0.2 (20%%)"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+
+    server = BenchmarkServer(args.import_latency)
+    server.start()
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            suite = Suite(server, directory, args.cache_backend, args.repeat)
+            for size in args.sizes:
+                results.update(suite.run(size))
+            suite.client.close()
+    finally:
+        server.stop()
+
+    _report(results, baseline)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "meta": {
+                        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                        "python": platform.python_version(),
+                        "platform": platform.platform(),
+                        "import_latency": args.import_latency,
+                        "cache_backend": args.cache_backend,
+                    },
+                    # Stages missing from this run are kept
+                    "results": dict(baseline, **results),
+                },
+                file,
+                indent=2,
+                sort_keys=True,
+            )
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
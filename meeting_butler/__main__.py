@@ -3,20 +3,28 @@ Main entrypoint for the package.
 """
 
 import argparse
+import asyncio
 import logging
 import sys
-from time import sleep
+from functools import partial
+from typing import Optional
 
 from pydantic import ValidationError
 
-from meeting_butler.meeting_butler import sync
-from meeting_butler.settings import Settings
+from meeting_butler.httpclient import HTTPClient
+from meeting_butler.meeting_butler import async_sync, maintain, push, sync
+from meeting_butler.rules import Rules
+from meeting_butler.scheduler import Job, Scheduler
+from meeting_butler.settings import JobSettings, RulesSettings, Settings
+from meeting_butler.webhook import WebhookServer
 
 
 def main() -> None:
     """
     Main application entrypoint.
-    Stats an infiite loop executing sync() every `sync_every` seconds
+    Runs each configured sync job every `sync_every` seconds, adapting the interval to the
+    registration activity. Without jobs, a single one is defined by the application wide
+    settings.
     """
     try:
         settings = Settings()
@@ -46,25 +54,207 @@ def main() -> None:
     )
     args = parser.parse_args()
 
-    source_settings = {}
-    if settings.data_source == "eventbrite":
-        source_settings = {"token": settings.eventbrite_token, "event": settings.eventbrite_event}
-    elif settings.data_source == "formbuilder":
-        source_settings = {"url": settings.formbuilder_url}
-    elif settings.data_source == "pretino":
-        source_settings = {"url": settings.pretino_url, "token": settings.pretino_token}
-
-    while True:
-        sync(
-            settings.meetingtool_hostname,
-            settings.meetingtool_token,
-            source_settings,
-            settings.data_source,
+    cache_settings = {"backend": settings.cache_backend}
+    if settings.cache_backend == "sqlite":
+        cache_settings.update(
+            wal=settings.cache_wal,
+            synchronous=settings.cache_synchronous,
+            memory=settings.cache_memory,
+        )
+    elif settings.cache_backend == "log":
+        cache_settings["fsync"] = settings.cache_synchronous != "OFF"
+    meetingtool_settings = {
+        "batch_size": settings.meetingtool_batch_size,
+        "rate_limit": settings.meetingtool_rate_limit,
+        "max_inflight": settings.meetingtool_max_inflight,
+    }
+
+    # Shared by all of the jobs, keeps the connections warm across sync cycles
+    client = HTTPClient(pool_size=settings.http_pool_size, timeout=settings.http_timeout)
+
+    # Defined by the application wide settings
+    default_job = JobSettings(name=settings.data_source, **settings.model_dump(include=JOB_FIELDS))
+    job_settings = [_inherit(job, settings) for job in settings.jobs] or [default_job]
+
+    jobs = []
+    ttls = {}
+    for job in job_settings:
+        namespace = _namespace(job, partitioned=bool(settings.jobs))
+        ttls[namespace] = job.cache_ttl or settings.cache_ttl
+        sync_args = (
+            job.meetingtool_hostname or settings.meetingtool_hostname,
+            job.meetingtool_token or settings.meetingtool_token,
+            _source_settings(job),
+            job.data_source,
             settings.cache_filename,
-            args.email_regex,
+            False,
+            dict(cache_settings, namespace=namespace),
+            meetingtool_settings,
+            client,
+        )
+        rules = _rules(job.rules or settings.rules, job.email_regex or args.email_regex)
+
+        if settings.sync_async:
+            run = partial(_run_async, sync_args, settings.sync_concurrency, rules)
+        else:
+            run = partial(sync, *sync_args, queue_size=settings.sync_queue_size, rules=rules)
+
+        jobs.append(
+            Job(
+                job.name,
+                job.sync_every or settings.sync_every,
+                run,
+                min_interval=job.sync_min_interval or settings.sync_min_interval,
+                max_interval=job.sync_max_interval or settings.sync_max_interval,
+                jitter=job.sync_jitter if job.sync_jitter is not None else settings.sync_jitter,
+            )
+        )
+
+    # Runs between syncs, and keeps the cache small
+    jobs.append(
+        Job(
+            "cache-maintenance",
+            settings.cache_maintenance_every,
+            partial(
+                maintain,
+                settings.cache_filename,
+                ttls,
+                cache_settings,
+                settings.cache_purge_limit,
+                settings.cache_vacuum_pages,
+            ),
+        )
+    )
+
+    if settings.eventbrite_webhook_port:
+        try:
+            webhook_job = _webhook_job(settings, default_job)
+        except ValueError as error:
+            sys.exit(error)
+        webhook_source = _source_settings(webhook_job)
+        if not webhook_source["token"] or not webhook_source["event"]:
+            sys.exit(f"Eventbrite webhooks need the token and event of job {webhook_job.name}")
+
+        # Scheduled syncs are still run, and reconcile whatever webhooks missed
+        server = WebhookServer(
+            (settings.eventbrite_webhook_address, settings.eventbrite_webhook_port),
+            webhook_source["token"],
+            partial(
+                push,
+                webhook_job.meetingtool_hostname or settings.meetingtool_hostname,
+                webhook_job.meetingtool_token or settings.meetingtool_token,
+                cache_filename=settings.cache_filename,
+                cache_settings=dict(
+                    cache_settings,
+                    namespace=_namespace(webhook_job, partitioned=bool(settings.jobs)),
+                ),
+                meetingtool_settings=meetingtool_settings,
+                client=client,
+                rules=_rules(
+                    webhook_job.rules or settings.rules, webhook_job.email_regex or args.email_regex
+                ),
+            ),
+            client,
+            settings.eventbrite_webhook_secret or None,
+            webhook_source["event"],
+        )
+        server.start()
+
+    Scheduler(jobs).run()
+
+
+# Source settings a job inherits from the application wide ones, unless it sets them
+SOURCE_FIELDS = {
+    "eventbrite_event",
+    "eventbrite_token",
+    "eventbrite_parallelism",
+    "eventbrite_full_resync_every",
+    "formbuilder_url",
+    "pretino_url",
+    "pretino_token",
+}
+
+# Fields the default job is defined by
+JOB_FIELDS = SOURCE_FIELDS | {"data_source", "cache_namespace"}
+
+
+def _inherit(job: JobSettings, settings: Settings) -> JobSettings:
+    """
+    Returns job, with the source settings it does not set taken from the application wide ones
+    """
+    return job.model_copy(
+        update={
+            field: getattr(settings, field)
+            for field in SOURCE_FIELDS
+            if getattr(job, field) is None
+        }
+    )
+
+
+def _namespace(job: JobSettings, partitioned: bool) -> str:
+    """
+    Returns the cache namespace of job. If partitioned, i.e. jobs are configured, it defaults
+    to one per data source and event. Otherwise it defaults to the default namespace, which
+    caches created by previous releases are moved into, so that their users are not
+    registered again after upgrading
+    """
+    if job.cache_namespace is not None:
+        return job.cache_namespace
+    if not partitioned:
+        return ""
+    if job.data_source == "eventbrite":
+        return f"eventbrite:{job.eventbrite_event}"
+    if job.data_source == "formbuilder":
+        return f"formbuilder:{job.formbuilder_url}"
+    return f"pretino:{job.pretino_url}"
+
+
+def _webhook_job(settings: Settings, default_job: JobSettings) -> JobSettings:
+    """
+    Returns the job Eventbrite webhooks are received for: the default job if no jobs are
+    configured, otherwise the only Eventbrite job. Raises ValueError if there is none, or more
+    than one
+    """
+    if not settings.jobs:
+        return default_job
+    jobs = [job for job in settings.jobs if job.data_source == "eventbrite"]
+    if len(jobs) != 1:
+        raise ValueError(
+            f"Eventbrite webhooks need exactly one Eventbrite job, {len(jobs)} are configured"
         )
+    return _inherit(jobs[0], settings)
+
 
-        sleep(int(settings.sync_every))
+def _source_settings(job: JobSettings) -> dict:
+    """
+    Returns the source specific settings of job
+    """
+    if job.data_source == "eventbrite":
+        return {
+            "token": job.eventbrite_token,
+            "event": job.eventbrite_event,
+            "parallelism": job.eventbrite_parallelism,
+            "full_resync_every": job.eventbrite_full_resync_every,
+        }
+    if job.data_source == "formbuilder":
+        return {"url": job.formbuilder_url}
+    if job.data_source == "pretino":
+        return {"url": job.pretino_url, "token": job.pretino_token}
+    return {}
+
+
+def _rules(settings: Optional[RulesSettings], email_regex: Optional[str]) -> Rules:
+    """
+    Compiles the rules defined by settings, plus the email regex
+    """
+    return Rules(**(settings.model_dump() if settings else {}), email_regex=email_regex or None)
+
+
+def _run_async(sync_args: tuple, concurrency: int, rules: Rules) -> list:
+    """
+    Runs async_sync() in its own event loop
+    """
+    return asyncio.run(async_sync(*sync_args, concurrency=concurrency, rules=rules))
 
 
 if __name__ == "__main__":
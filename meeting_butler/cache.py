@@ -2,20 +2,292 @@
 Local persistent caches
 """
 
+import abc
 import datetime
+import functools
+import hashlib
 import json
 import logging
 import os
 import sqlite3
+import threading
+import time
 from tempfile import gettempdir
-from typing import Any, Optional, Tuple
+from typing import Any, Iterable, Iterator, Literal, Mapping, Optional, Tuple, Union
 
 LOGGER = logging.getLogger(__name__)
 
+# Stay well below SQLITE_MAX_VARIABLE_NUMBER (999 on older SQLite releases)
+QUERY_CHUNK_SIZE = 500
 
-class Cache:
+# Bookkeeping key counting the writes to the data table, so that in-memory indexes can tell
+# whether they are still current
+GENERATION_KEY = "cache:generation"
+
+# Rows fetched at once by the iterators, bounding the memory they take
+ITER_CHUNK_SIZE = 1000
+
+# Rows deleted by each purge() call, so that the write lock is held briefly
+PURGE_LIMIT = 1000
+
+# In-memory indexes shared by the caches opened on the same file and namespace:
+# (path, namespace) -> (generation, index)
+_INDEXES: dict[tuple[str, str], tuple[int, dict[str, Optional[str]]]] = {}
+_INDEXES_LOCK = threading.Lock()
+
+SCHEMAS = {
+    "data": (
+        "CREATE TABLE IF NOT EXISTS data (namespace TEXT NOT NULL DEFAULT '', key TEXT NOT NULL, "
+        "value JSON, datetime TEXT, fingerprint TEXT, PRIMARY KEY (namespace, key));"
+    ),
+    # Bookkeeping (e.g. HTTP validators), kept apart from the cached data
+    "meta": (
+        "CREATE TABLE IF NOT EXISTS meta (namespace TEXT NOT NULL DEFAULT '', key TEXT NOT NULL, "
+        "value JSON, datetime TEXT, PRIMARY KEY (namespace, key));"
+    ),
+}
+
+
+def fingerprint(value: Any) -> str:
+    """
+    Returns the content fingerprint of value, as stored alongside it into the cache
+
+    Arguments:
+    ----------
+    value: Any
+        Any JSON serializable value
+
+    Returns:
+    -------
+    str: Hex digest
+    """
+    return _digest(json.dumps(value))
+
+
+def _digest(serialized: str) -> str:
+    return hashlib.blake2b(serialized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _synchronized(method):
+    """
+    Serializes the calls to method, so that the connection can be shared between threads
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+class BaseCache(abc.ABC):
+    """
+    Dict like object mapping the keys of a namespace to JSON serializable values, plus
+    bookkeeping data. Changes become persistent when save() is called: used as a context
+    manager, the cache is saved on success and rolled back on error.
+    Backends are selected by open_cache().
+    """
+
+    filename: str
+    namespace: str
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args, **kwargs) -> None:
+        # Do not persist half-done work
+        if exc_type is None:
+            self.save()
+        else:
+            self.rollback()
+        self.close()
+
+    @abc.abstractmethod
+    def __setitem__(self, key: str, value: Any) -> None:
+        """
+        Sets key to value
+        """
+
+    @abc.abstractmethod
+    def __getitem__(self, key: str) -> Any:
+        """
+        Gets the value for key
+        """
+
+    @abc.abstractmethod
+    def __delitem__(self, key: str) -> None:
+        """
+        Deletes key
+        """
+
+    @abc.abstractmethod
+    def fingerprints(self, keys: Iterable[str]) -> dict[str, Optional[str]]:
+        """
+        Returns the content fingerprints of the keys that are in the cache
+        """
+
+    @abc.abstractmethod
+    def keys(self) -> list[str]:
+        """
+        Returns the list of the keys
+        """
+
+    @abc.abstractmethod
+    def get_meta(self, key: str, default: Any = None) -> Any:
+        """
+        Gets the value for the bookkeeping key, or default if it is not set
+        """
+
+    @abc.abstractmethod
+    def set_meta(self, key: str, value: Any) -> None:
+        """
+        Sets the bookkeeping key to value. None deletes the key
+        """
+
+    @abc.abstractmethod
+    def purge(self, ttl: int, limit: int = PURGE_LIMIT) -> int:
+        """
+        Deletes at most limit entries not written or touched for ttl seconds, returns how many
+        """
+
+    @abc.abstractmethod
+    def namespaces(self) -> list[str]:
+        """
+        Returns the namespaces holding any data
+        """
+
+    @abc.abstractmethod
+    def drop(self, namespace: Optional[str] = None) -> None:
+        """
+        Deletes the data and the bookkeeping of a namespace, None meaning the cache one
+        """
+
+    @abc.abstractmethod
+    def save(self) -> None:
+        """
+        Makes the changes persistent
+        """
+
+    @abc.abstractmethod
+    def rollback(self) -> None:
+        """
+        Discards the changes made since the last save()
+        """
+
+    @abc.abstractmethod
+    def close(self) -> None:
+        """
+        Releases the resources held by the cache
+        """
+
+    def compact(self, pages: Optional[int] = None) -> None:
+        """
+        Returns the space freed by deletions to the file system, if the backend needs to
+
+        Arguments:
+        ----------
+        pages: Optional[int]
+           Maximum amount of work, in backend specific units. None means no limit
+        """
+
+    def update(self, items: Union[Mapping[str, Any], Iterable[Tuple[str, Any]]]) -> None:
+        """
+        Sets multiple keys at once
+
+        Arguments:
+        ----------
+        items: Union[Mapping[str, Any], Iterable[Tuple[str, Any]]]
+           Either a mapping or an iterable of (key, value) tuples
+        """
+        if isinstance(items, Mapping):
+            items = items.items()
+        for key, value in items:
+            self[key] = value
+
+    def touch(self, keys: Iterable[str]) -> None:
+        """
+        Marks keys as seen now, so that purge() counts their time to live from now on. Keys
+        that are not in the cache are ignored
+
+        Arguments:
+        ----------
+        keys: Iterable[str]
+           Cache keys
+        """
+        keys = list(keys)
+        found = self.fingerprints(keys)
+        self.update((key, self[key]) for key in keys if key in found)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.fingerprints([key])
+
+    def missing_keys(self, keys: Iterable[str]) -> list[str]:
+        """
+        Returns the keys that are not in the cache, preserving their order
+
+        Arguments:
+        ----------
+        keys: Iterable[str]
+            The keys to look for
+
+        Returns:
+        -------
+        list[str]: Keys that are not in the cache
+        """
+        keys = list(keys)
+        found = self.fingerprints(keys)
+        return [key for key in keys if key not in found]
+
+    def values(self) -> list[Any]:
+        """
+        Returns the list of the values
+        """
+        return list(self.itervalues())
+
+    def items(self) -> list[Tuple]:
+        """
+        Returns a list of (key, value) tuples
+        """
+        return list(self.iteritems())
+
+    def iterkeys(self, chunk_size: int = ITER_CHUNK_SIZE) -> Iterator[str]:
+        """
+        Yields the keys. Unlike keys(), backends may read them lazily, chunk_size at a time
+        """
+        return iter(self.keys())
+
+    def itervalues(self, chunk_size: int = ITER_CHUNK_SIZE) -> Iterator[Any]:
+        """
+        Yields the values. Unlike values(), backends may read them lazily, chunk_size at a time
+        """
+        return (value for _, value in self.iteritems(chunk_size))
+
+    def iteritems(self, chunk_size: int = ITER_CHUNK_SIZE) -> Iterator[Tuple]:
+        """
+        Yields (key, value) tuples. Unlike items(), backends may read them lazily, chunk_size
+        at a time
+        """
+        for key in self.iterkeys(chunk_size):
+            try:
+                yield key, self[key]
+            except KeyError:
+                # Deleted while iterating
+                continue
+
+    def __iter__(self) -> Iterator[str]:
+        return self.iterkeys()
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+
+class Cache(BaseCache):
     """
     SQLite backed dict like object. Connects to the databse specified at filename.
+    Instances can be shared between threads.
+    The database is partitioned into namespaces, e.g. one per event, and every instance only
+    sees the data and the bookkeeping of its own namespace.
 
      Arguments:
     ---------
@@ -24,12 +296,32 @@ class Cache:
         Default: False
     reset: Optional[bool]
         If true, deletes the database before starting. Default: False
+    wal: Optional[bool]
+        If true, opens the database in write-ahead logging mode. Default: False
+    synchronous: Optional[str]
+        SQLite synchronous mode (OFF, NORMAL, FULL or EXTRA). None keeps SQLite default.
+        Default: None
+    memory: Optional[bool]
+        If true, the keys and their fingerprints are kept in memory, and lookups do not hit
+        the database. The index outlives the instance, so that the next cache opened on the
+        same file reuses it, unless the data has been changed in the meantime. Writes are
+        buffered and flushed in a single batch by save(). Default: False
+    namespace: Optional[str]
+        Namespace. Databases created by previous releases are moved into the default one
+        Default: "" (default namespace)
     """
 
     def __init__(
-        self, filename: Optional[os.PathLike] = False, reset: Optional[bool] = False
+        self,
+        filename: Optional[os.PathLike] = False,
+        reset: Optional[bool] = False,
+        wal: Optional[bool] = False,
+        synchronous: Optional[Literal["OFF", "NORMAL", "FULL", "EXTRA"]] = None,
+        memory: Optional[bool] = False,
+        namespace: Optional[str] = "",
     ) -> None:
         self.filename = filename or os.path.join(gettempdir(), "meeting_butler.db")
+        self.namespace = namespace or ""
 
         if reset:
             try:
@@ -37,24 +329,176 @@ class Cache:
             except FileNotFoundError:
                 pass
 
-        self._connection = sqlite3.connect(self.filename)
+        # Calls are serialized by _lock, so the connection can be used from any thread
+        self._lock = threading.RLock()
+        # Bookkeeping changes waiting for save()
+        self._staged_meta: dict[str, Any] = {}
+        # Whether the data table changed since the last commit
+        self._dirty = False
+        # In-memory index and the writes waiting for save(), memory mode only
+        self._index: Optional[dict[str, Optional[str]]] = None
+        self._pending: dict[str, tuple[str, str]] = {}
+        self._generation = 0
+        self._connection = sqlite3.connect(self.filename, check_same_thread=False)
         self._cursor = self._connection.cursor()
 
+        # Only effective on new databases, existing ones are converted by compact(). Switching
+        # to WAL creates the database, hence it has to come first
+        self._cursor.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+        if wal:
+            self._cursor.execute("PRAGMA journal_mode=WAL;")
+        if synchronous:
+            if synchronous.upper() not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+                raise ValueError(f"Unsupported synchronous mode: {synchronous}")
+            self._cursor.execute(f"PRAGMA synchronous={synchronous.upper()};")
+        self._migrate()
+        for schema in SCHEMAS.values():
+            self._cursor.execute(schema)
+        # Expired entries are looked up by purge()
         self._cursor.execute(
-            "CREATE TABLE IF NOT EXISTS data (key TEXT PRIMARY KEY, value JSON, datetime TEXT);"
+            "CREATE INDEX IF NOT EXISTS data_namespace_datetime ON data(namespace, datetime);"
         )
 
-        self._connection.set_trace_callback(LOGGER.debug)
+        # Tracing costs a logging call per statement, even when it is discarded
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            self._connection.set_trace_callback(LOGGER.debug)
 
         LOGGER.debug("Connected to database: %s", self.filename)
 
-    def __enter__(self):
-        return self
+        if memory:
+            self._load_index()
 
-    def __exit__(self, *args, **kwargs) -> None:
-        self.save()
-        self.close()
+    def _migrate(self) -> None:
+        """
+        Moves the tables created by previous releases, which are not partitioned, into the
+        default namespace
+        """
+        for table, schema in SCHEMAS.items():
+            columns = [cols[1] for cols in self._cursor.execute(f"PRAGMA table_info({table});")]
+            if not columns or "namespace" in columns:
+                continue
+
+            LOGGER.info("Moving table %s of %s into the default namespace", table, self.filename)
+            names = ["key", "value", "datetime"] + (["fingerprint"] if table == "data" else [])
+            # Fingerprints of databases predating them are left NULL
+            selected = [name if name in columns else "NULL" for name in names]
+            self._cursor.execute("BEGIN;")
+            try:
+                self._cursor.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy;")
+                self._cursor.execute(schema)
+                self._cursor.execute(
+                    f"INSERT INTO {table} ({', '.join(names)}) "
+                    f"SELECT {', '.join(selected)} FROM {table}_legacy;"
+                )
+                self._cursor.execute(f"DROP TABLE {table}_legacy;")
+            except BaseException:
+                self._connection.rollback()
+                raise
+            self._connection.commit()
+
+    def _index_key(self) -> Optional[tuple[str, str]]:
+        """
+        Returns the key the in-memory index is shared under, None if it cannot be shared
+        """
+        if self.filename == ":memory:":
+            return None
+        return os.path.abspath(self.filename), self.namespace
 
+    def _read_generation(self) -> int:
+        result = self._cursor.execute(
+            "SELECT value FROM meta WHERE namespace = ? AND key = ?",
+            (self.namespace, GENERATION_KEY),
+        )
+        row = result.fetchone()
+        return int(row[0]) if row else 0
+
+    def _bump_generation(self, namespace: Optional[str] = None) -> None:
+        namespace = self.namespace if namespace is None else namespace
+        now = datetime.datetime.now(datetime.timezone.utc)
+        self._cursor.execute(
+            "INSERT INTO meta VALUES(?, ?, 1, ?) ON CONFLICT(namespace, key) "
+            "DO UPDATE SET value = value + 1, datetime = excluded.datetime;",
+            (namespace, GENERATION_KEY, now),
+        )
+        if namespace == self.namespace:
+            self._dirty = False
+
+    def _load_index(self) -> None:
+        """
+        Loads the in-memory index, unless the shared one is still current
+        """
+        # Read the generation and the keys from the same snapshot
+        self._cursor.execute("BEGIN;")
+        try:
+            self._generation = self._read_generation()
+            with _INDEXES_LOCK:
+                shared = _INDEXES.get(self._index_key())
+            if shared and shared[0] == self._generation:
+                LOGGER.debug("Reusing the in-memory index of %s", self.filename)
+                self._index = dict(shared[1])
+            else:
+                LOGGER.debug("Loading the in-memory index of %s", self.filename)
+                self._index = dict(
+                    self._cursor.execute(
+                        "SELECT key, fingerprint FROM data WHERE namespace = ?", (self.namespace,)
+                    )
+                )
+        finally:
+            self._connection.commit()
+
+    def _publish_index(self, generation: int, bumped: bool) -> None:
+        """
+        Shares the in-memory index with the next caches opened on the same file
+
+        Arguments:
+        ----------
+        generation: int
+            Generation of the data as committed
+        bumped: bool
+            Whether the commit bumped the generation
+        """
+        key = self._index_key()
+        if key is not None:
+            with _INDEXES_LOCK:
+                if generation == self._generation + (1 if bumped else 0):
+                    _INDEXES[key] = (generation, dict(self._index))
+                else:
+                    # Somebody else changed the data in the meantime
+                    _INDEXES.pop(key, None)
+
+        self._generation = generation
+
+    def _flush(self) -> None:
+        """
+        Writes the buffered data into the current transaction
+        """
+        if not self._pending:
+            return
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        self._cursor.executemany(
+            "INSERT OR REPLACE INTO data (namespace, key, value, datetime, fingerprint) "
+            "VALUES(?,?,?,?,?);",
+            [
+                (self.namespace, key, serialized, now, digest)
+                for key, (serialized, digest) in self._pending.items()
+            ],
+        )
+        self._pending.clear()
+        self._dirty = True
+
+    @_synchronized
+    def rollback(self) -> None:
+        """
+        Discards the changes made since the last save()
+        """
+        self._staged_meta.clear()
+        self._pending.clear()
+        self._connection.rollback()
+        if self._index is not None:
+            self._load_index()
+
+    @_synchronized
     def __setitem__(self, key: str, value: Any) -> None:
         """
         Sets key to value into the SQLite database
@@ -69,10 +513,80 @@ class Cache:
         if not isinstance(key, str):
             raise TypeError(f"Key must be str, not {type(key)}")
 
-        value = json.dumps(value)
+        serialized = json.dumps(value)
+        digest = _digest(serialized)
+        if self._index is not None:
+            self._pending[key] = (serialized, digest)
+            self._index[key] = digest
+            return
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        self._cursor.execute(
+            "INSERT OR REPLACE INTO data (namespace, key, value, datetime, fingerprint) "
+            "VALUES(?,?,?,?,?);",
+            (self.namespace, key, serialized, now, digest),
+        )
+        self._dirty = True
+
+    @_synchronized
+    def update(self, items: Union[Mapping[str, Any], Iterable[Tuple[str, Any]]]) -> None:
+        """
+        Sets multiple keys at once into the SQLite database, within the current transaction,
+        which save() commits. In memory mode, the keys are written by save()
+
+        Arguments:
+        ----------
+        items: Union[Mapping[str, Any], Iterable[Tuple[str, Any]]]
+           Either a mapping or an iterable of (key, value) tuples
+        """
+        if isinstance(items, Mapping):
+            items = items.items()
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        rows = []
+        for key, value in items:
+            if not isinstance(key, str):
+                raise TypeError(f"Key must be str, not {type(key)}")
+            serialized = json.dumps(value)
+            rows.append((self.namespace, key, serialized, now, _digest(serialized)))
+
+        if self._index is not None:
+            for _, key, serialized, _, digest in rows:
+                self._pending[key] = (serialized, digest)
+                self._index[key] = digest
+            return
+
+        self._cursor.executemany(
+            "INSERT OR REPLACE INTO data (namespace, key, value, datetime, fingerprint) "
+            "VALUES(?,?,?,?,?);",
+            rows,
+        )
+        self._dirty = True
+
+    @_synchronized
+    def touch(self, keys: Iterable[str]) -> None:
+        """
+        Marks keys as seen now, so that purge() counts their time to live from now on. The
+        rows are updated in chunks of `QUERY_CHUNK_SIZE` keys per query, within the current
+        transaction, which save() commits
+
+        Arguments:
+        ----------
+        keys: Iterable[str]
+           Cache keys
+        """
+        # Entries waiting for save() are written with the current time anyway
+        keys = [key for key in keys if key not in self._pending]
         now = datetime.datetime.now(datetime.timezone.utc)
-        self._cursor.execute("INSERT OR REPLACE INTO data VALUES(?,?,?);", (key, value, now))
+        for start in range(0, len(keys), QUERY_CHUNK_SIZE):
+            chunk = keys[start : start + QUERY_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            self._cursor.execute(
+                f"UPDATE data SET datetime = ? WHERE namespace = ? AND key IN ({placeholders})",
+                [now, self.namespace] + chunk,
+            )
 
+    @_synchronized
     def close(self) -> None:
         """
         Disconnects from the SQLite database
@@ -80,6 +594,7 @@ class Cache:
         self._connection.close()
         LOGGER.debug("Disconnected from database: %s", self.filename)
 
+    @_synchronized
     def __contains__(self, key: str) -> bool:
         """
         Returns True if key is in the SQLite database, False otherwise
@@ -93,9 +608,80 @@ class Cache:
         -------
         bool: True if the key is in the databse, False othwerise
         """
-        result = self._cursor.execute("SELECT key FROM data WHERE key = ?", (key,))
+        if self._index is not None:
+            return key in self._index
+
+        result = self._cursor.execute(
+            "SELECT key FROM data WHERE namespace = ? AND key = ?", (self.namespace, key)
+        )
         return bool(result.fetchone())
 
+    @_synchronized
+    def _lookup(self, column: str, keys: list[str]) -> dict[str, Any]:
+        """
+        Returns {key: column} for the keys that are in the SQLite database.
+        Lookups are run in chunks of `QUERY_CHUNK_SIZE` keys per query
+
+        Arguments:
+        ----------
+        column: str
+            Column to return
+        keys: list[str]
+            The keys to look for
+
+        Returns:
+        -------
+        dict[str, Any]: Key to column value
+        """
+        found = {}
+        for start in range(0, len(keys), QUERY_CHUNK_SIZE):
+            chunk = keys[start : start + QUERY_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            result = self._cursor.execute(
+                f"SELECT key, {column} FROM data WHERE namespace = ? AND key IN ({placeholders})",
+                [self.namespace] + chunk,
+            )
+            found.update(result.fetchall())
+
+        return found
+
+    def missing_keys(self, keys: Iterable[str]) -> list[str]:
+        """
+        Returns the keys that are not in the SQLite database, preserving their order.
+
+        Arguments:
+        ----------
+        keys: Iterable[str]
+            The keys to look for
+
+        Returns:
+        -------
+        list[str]: Keys that are not in the database
+        """
+        keys = list(keys)
+        found = self._index if self._index is not None else self._lookup("key", keys)
+        return [key for key in keys if key not in found]
+
+    def fingerprints(self, keys: Iterable[str]) -> dict[str, Optional[str]]:
+        """
+        Returns the content fingerprints of the keys that are in the SQLite database.
+        Entries written by previous releases have no fingerprint (None)
+
+        Arguments:
+        ----------
+        keys: Iterable[str]
+            The keys to look for
+
+        Returns:
+        -------
+        dict[str, Optional[str]]: Key to fingerprint
+        """
+        if self._index is not None:
+            return {key: self._index[key] for key in keys if key in self._index}
+
+        return self._lookup("fingerprint", list(keys))
+
+    @_synchronized
     def __delitem__(self, key: str) -> None:
         """
         Deletees key fromthe SQLite database
@@ -105,10 +691,21 @@ class Cache:
         key: str
            Cache key
         """
-        result = self._cursor.execute("DELETE FROM data WHERE key = ?", (key,))
-        if not result.rowcount:
+        if self._index is not None:
+            if key not in self._index:
+                raise KeyError(key)
+            del self._index[key]
+            self._pending.pop(key, None)
+
+        result = self._cursor.execute(
+            "DELETE FROM data WHERE namespace = ? AND key = ?", (self.namespace, key)
+        )
+        if result.rowcount:
+            self._dirty = True
+        elif self._index is None:
             raise KeyError(key)
 
+    @_synchronized
     def __getitem__(self, key) -> Any:
         """
         Gets the value for key as stored in the SQLite database
@@ -122,7 +719,12 @@ class Cache:
         -------
         Any: value as saved into the SQLite database
         """
-        result = self._cursor.execute("SELECT value FROM data WHERE key = ?", (key,))
+        if key in self._pending:
+            return json.loads(self._pending[key][0])
+
+        result = self._cursor.execute(
+            "SELECT value FROM data WHERE namespace = ? AND key = ?", (self.namespace, key)
+        )
         try:
             serialized = next(iter(result.fetchone()))
         except TypeError as error:
@@ -130,6 +732,7 @@ class Cache:
 
         return json.loads(serialized)
 
+    @_synchronized
     def keys(self) -> list[str]:
         """
         Returns the list of the keys as saved in the SQLite database
@@ -138,33 +741,487 @@ class Cache:
         -------
         list[str]: Keys
         """
-        result = self._cursor.execute("SELECT key FROM data")
+        if self._index is not None:
+            return list(self._index)
+
+        result = self._cursor.execute("SELECT key FROM data WHERE namespace = ?", (self.namespace,))
         return [next(iter(cols)) for cols in result.fetchall()]
 
-    def values(self) -> list[Any]:
+    @_synchronized
+    def __len__(self) -> int:
         """
-        Returns the list of the values as saved in the SQLite database
+        Returns the number of keys in the SQLite database
 
         Returns:
         -------
-        list[Any]: Values
+        int: Number of keys
         """
-        result = self._cursor.execute("SELECT value FROM data")
-        return [json.loads(next(iter(cols))) for cols in result.fetchall()]
+        if self._index is not None:
+            return len(self._index)
 
-    def items(self) -> list[Tuple]:
+        result = self._cursor.execute(
+            "SELECT COUNT(*) FROM data WHERE namespace = ?", (self.namespace,)
+        )
+        return result.fetchone()[0]
+
+    def _rows(self, columns: str, chunk_size: int) -> Iterator[tuple]:
         """
-        Returns a list of (key, value) tuples
+        Yields the rows of the namespace, fetched chunk_size at a time through a cursor of
+        their own, so that the cache can be used while iterating. Pending writes are flushed
+        beforehand
+        """
+        if chunk_size < 1:
+            raise ValueError(f"Chunk size must be positive, not {chunk_size}")
+
+        with self._lock:
+            self._flush()
+            cursor = self._connection.cursor()
+            cursor.execute(f"SELECT {columns} FROM data WHERE namespace = ?", (self.namespace,))
+        try:
+            while True:
+                with self._lock:
+                    rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            cursor.close()
+
+    def iterkeys(self, chunk_size: int = ITER_CHUNK_SIZE) -> Iterator[str]:
+        """
+        Yields the keys as saved in the SQLite database, reading chunk_size rows at a time
+
+        Arguments:
+        ----------
+        chunk_size: int
+            Rows fetched at once. Default: ITER_CHUNK_SIZE
 
         Returns:
         -------
-        list[Tuple]: (key, value)
+        Iterator[str]: Keys
+        """
+        return (key for key, in self._rows("key", chunk_size))
+
+    def itervalues(self, chunk_size: int = ITER_CHUNK_SIZE) -> Iterator[Any]:
         """
-        result = self._cursor.execute("SELECT key, value FROM data")
-        return [(key, json.loads(value)) for key, value in result.fetchall()]
+        Yields the values as saved in the SQLite database, reading and decoding chunk_size
+        rows at a time
+
+        Arguments:
+        ----------
+        chunk_size: int
+            Rows fetched at once. Default: ITER_CHUNK_SIZE
 
+        Returns:
+        -------
+        Iterator[Any]: Values
+        """
+        return (json.loads(value) for value, in self._rows("value", chunk_size))
+
+    def iteritems(self, chunk_size: int = ITER_CHUNK_SIZE) -> Iterator[Tuple]:
+        """
+        Yields (key, value) tuples as saved in the SQLite database, reading and decoding
+        chunk_size rows at a time
+
+        Arguments:
+        ----------
+        chunk_size: int
+            Rows fetched at once. Default: ITER_CHUNK_SIZE
+
+        Returns:
+        -------
+        Iterator[Tuple]: (key, value)
+        """
+        return ((key, json.loads(value)) for key, value in self._rows("key, value", chunk_size))
+
+    @_synchronized
+    def get_meta(self, key: str, default: Any = None) -> Any:
+        """
+        Gets the value for the bookkeeping key
+
+        Arguments:
+        ----------
+        key: str
+           Bookkeeping key
+        default: Any
+           Value returned if key is not set. Default: None
+
+        Returns:
+        -------
+        Any: value as saved into the SQLite database, or default
+        """
+        if key in self._staged_meta:
+            value = self._staged_meta[key]
+            return default if value is None else value
+
+        result = self._cursor.execute(
+            "SELECT value FROM meta WHERE namespace = ? AND key = ?", (self.namespace, key)
+        )
+        row = result.fetchone()
+        if row is None:
+            return default
+
+        return json.loads(next(iter(row)))
+
+    @_synchronized
+    def set_meta(self, key: str, value: Any) -> None:
+        """
+        Sets the bookkeeping key to value. The change is kept in memory and written by save(),
+        so that no write transaction is held in the meantime (e.g. during a sync), which
+        would block other connections to the same database.
+
+        Arguments:
+        ----------
+        key: str
+           Bookkeeping key
+        value: Any
+           Any JSON serializable value. None deletes the key
+        """
+        self._staged_meta[key] = value
+
+    @_synchronized
+    def purge(self, ttl: int, limit: int = PURGE_LIMIT) -> int:
+        """
+        Deletes at most limit entries of the namespace not written or touched for ttl seconds,
+        along with
+        the expired bookkeeping data. The cost of each call is bounded, so that purging a large
+        database can be spread over several calls, e.g. between syncs. Changes are committed
+        right away.
+
+        Arguments:
+        ----------
+        ttl: int
+           Time to live in seconds
+        limit: int
+           Maximum number of entries deleted. Default: PURGE_LIMIT
+
+        Returns:
+        -------
+        int: Number of deleted entries. If it equals limit, more entries might be expired
+        """
+        if ttl <= 0 or limit <= 0:
+            raise ValueError(f"TTL and limit must be positive, not {ttl} and {limit}")
+
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=ttl)
+
+        with self._connection:
+            result = self._cursor.execute(
+                "SELECT key FROM data WHERE namespace = ? AND datetime < ? "
+                "ORDER BY datetime LIMIT ?",
+                (self.namespace, cutoff, limit),
+            )
+            # Entries waiting for save() have just been written
+            keys = [row[0] for row in result.fetchall() if row[0] not in self._pending]
+            self._cursor.executemany(
+                "DELETE FROM data WHERE namespace = ? AND key = ?",
+                [(self.namespace, key) for key in keys],
+            )
+            self._cursor.execute(
+                "DELETE FROM meta WHERE namespace = ? AND datetime < ? AND key != ?",
+                (self.namespace, cutoff, GENERATION_KEY),
+            )
+            if keys:
+                self._bump_generation()
+                generation = self._read_generation()
+
+        if keys and self._index is not None:
+            for key in keys:
+                self._index.pop(key, None)
+            self._publish_index(generation, True)
+
+        LOGGER.debug("Purged %d expired entries from %s", len(keys), self.filename)
+        return len(keys)
+
+    @_synchronized
+    def namespaces(self) -> list[str]:
+        """
+        Returns the namespaces holding any data
+
+        Returns:
+        -------
+        list[str]: Namespaces
+        """
+        result = self._cursor.execute("SELECT DISTINCT namespace FROM data")
+        return [row[0] for row in result.fetchall()]
+
+    @_synchronized
+    def drop(self, namespace: Optional[str] = None) -> None:
+        """
+        Deletes the data and the bookkeeping of a namespace, e.g. of a past event. The rows
+        are looked up by the primary key index, which starts with the namespace, hence this
+        does not scan the other namespaces. Changes are committed right away, the freed space
+        is returned to the file system by compact().
+
+        Arguments:
+        ----------
+        namespace: Optional[str]
+           Namespace. None means the namespace of the cache
+        """
+        namespace = self.namespace if namespace is None else namespace
+
+        with self._connection:
+            self._cursor.execute("DELETE FROM data WHERE namespace = ?", (namespace,))
+            self._cursor.execute(
+                "DELETE FROM meta WHERE namespace = ? AND key != ?", (namespace, GENERATION_KEY)
+            )
+            # In-memory indexes of the namespace are then reloaded
+            self._bump_generation(namespace)
+            generation = self._read_generation()
+
+        if namespace == self.namespace:
+            self._pending.clear()
+            self._staged_meta.clear()
+            if self._index is not None:
+                self._index.clear()
+                self._publish_index(generation, True)
+
+        LOGGER.info("Dropped namespace %r of %s", namespace, self.filename)
+
+    @_synchronized
+    def compact(self, pages: Optional[int] = None) -> None:
+        """
+        Returns the free pages to the file system, without locking the database for long.
+        Databases created by previous releases are converted once, by a full VACUUM, to the
+        incremental auto vacuum mode
+
+        Arguments:
+        ----------
+        pages: Optional[int]
+           Maximum number of pages freed. None means all of them
+        """
+        self.save()
+
+        mode = self._cursor.execute("PRAGMA auto_vacuum;").fetchone()[0]
+        if mode != 2:
+            LOGGER.info("Converting %s to incremental auto vacuum", self.filename)
+            self._cursor.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+            self._cursor.execute("VACUUM;")
+            return
+
+        free = self._cursor.execute("PRAGMA freelist_count;").fetchone()[0]
+        if free:
+            LOGGER.debug("Freeing %s of %d pages of %s", pages or "all", free, self.filename)
+            # incremental_vacuum(0) frees all of the pages. It frees one page per step, while
+            # execute() only steps once
+            self._cursor.executescript(f"PRAGMA incremental_vacuum({int(pages or 0)});")
+
+    @_synchronized
     def save(self) -> None:
         """
         Write data do disk
         """
+        self._flush()
+        bumped = self._dirty
+        if bumped:
+            self._bump_generation()
+        generation = self._read_generation()
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        for key, value in self._staged_meta.items():
+            if value is None:
+                self._cursor.execute(
+                    "DELETE FROM meta WHERE namespace = ? AND key = ?", (self.namespace, key)
+                )
+            else:
+                self._cursor.execute(
+                    "INSERT OR REPLACE INTO meta VALUES(?,?,?,?);",
+                    (self.namespace, key, json.dumps(value), now),
+                )
+        self._staged_meta.clear()
+
         self._connection.commit()
+
+        if self._index is not None:
+            self._publish_index(generation, bumped)
+
+
+# Data of the memory caches, shared by the caches opened with the same name:
+# name -> namespace -> {"data": key -> (serialized, fingerprint, timestamp), "meta": key -> value}
+_MEMORY_STORES: dict[str, dict[str, dict[str, dict]]] = {}
+_MEMORY_STORES_LOCK = threading.Lock()
+
+
+class MemoryCache(BaseCache):
+    """
+    Process local cache, e.g. for tests. Caches opened with the same filename share the same
+    data, until the process exits.
+
+    Arguments:
+    ----------
+    filename: Optional[str]
+        Name the data is shared by. Default: False
+    reset: Optional[bool]
+        If true, deletes the data before starting. Default: False
+    namespace: Optional[str]
+        Namespace. Default: "" (default namespace)
+    """
+
+    def __init__(
+        self,
+        filename: Optional[str] = False,
+        reset: Optional[bool] = False,
+        namespace: Optional[str] = "",
+    ) -> None:
+        self.filename = str(filename or "meeting_butler")
+        self.namespace = namespace or ""
+        self._lock = threading.RLock()
+
+        with _MEMORY_STORES_LOCK:
+            if reset:
+                _MEMORY_STORES.pop(self.filename, None)
+            self._store = _MEMORY_STORES.setdefault(self.filename, {})
+        # Changes waiting for save(), None marks deletions
+        self._pending: dict[str, Optional[tuple[str, str, float]]] = {}
+        self._staged_meta: dict[str, Any] = {}
+
+    def _namespace(self, namespace: Optional[str] = None) -> dict[str, dict]:
+        namespace = self.namespace if namespace is None else namespace
+        with _MEMORY_STORES_LOCK:
+            return self._store.setdefault(namespace, {"data": {}, "meta": {}})
+
+    def _entry(self, key: str) -> Optional[tuple[str, str, float]]:
+        if key in self._pending:
+            return self._pending[key]
+        return self._namespace()["data"].get(key)
+
+    @_synchronized
+    def __setitem__(self, key: str, value: Any) -> None:
+        if not isinstance(key, str):
+            raise TypeError(f"Key must be str, not {type(key)}")
+        serialized = json.dumps(value)
+        self._pending[key] = (serialized, _digest(serialized), time.time())
+
+    @_synchronized
+    def __getitem__(self, key: str) -> Any:
+        entry = self._entry(key)
+        if entry is None:
+            raise KeyError(key)
+        return json.loads(entry[0])
+
+    @_synchronized
+    def touch(self, keys: Iterable[str]) -> None:
+        now = time.time()
+        for key in keys:
+            entry = self._entry(key)
+            if entry is not None:
+                self._pending[key] = (entry[0], entry[1], now)
+
+    @_synchronized
+    def __delitem__(self, key: str) -> None:
+        if self._entry(key) is None:
+            raise KeyError(key)
+        self._pending[key] = None
+
+    @_synchronized
+    def fingerprints(self, keys: Iterable[str]) -> dict[str, Optional[str]]:
+        found = {}
+        for key in keys:
+            entry = self._entry(key)
+            if entry is not None:
+                found[key] = entry[1]
+        return found
+
+    @_synchronized
+    def keys(self) -> list[str]:
+        keys = dict.fromkeys(self._namespace()["data"])
+        keys.update(self._pending)
+        return [key for key in keys if self._entry(key) is not None]
+
+    @_synchronized
+    def get_meta(self, key: str, default: Any = None) -> Any:
+        if key in self._staged_meta:
+            value = self._staged_meta[key]
+        else:
+            value = self._namespace()["meta"].get(key)
+        return default if value is None else json.loads(json.dumps(value))
+
+    @_synchronized
+    def set_meta(self, key: str, value: Any) -> None:
+        self._staged_meta[key] = value
+
+    @_synchronized
+    def purge(self, ttl: int, limit: int = PURGE_LIMIT) -> int:
+        if ttl <= 0 or limit <= 0:
+            raise ValueError(f"TTL and limit must be positive, not {ttl} and {limit}")
+
+        cutoff = time.time() - ttl
+        data = self._namespace()["data"]
+        expired = sorted(
+            (timestamp, key)
+            for key, (_, _, timestamp) in data.items()
+            if timestamp < cutoff and key not in self._pending
+        )[:limit]
+        for _, key in expired:
+            del data[key]
+        return len(expired)
+
+    @_synchronized
+    def namespaces(self) -> list[str]:
+        with _MEMORY_STORES_LOCK:
+            return [namespace for namespace, store in self._store.items() if store["data"]]
+
+    @_synchronized
+    def drop(self, namespace: Optional[str] = None) -> None:
+        namespace = self.namespace if namespace is None else namespace
+        with _MEMORY_STORES_LOCK:
+            self._store.pop(namespace, None)
+        if namespace == self.namespace:
+            self._pending.clear()
+            self._staged_meta.clear()
+
+    @_synchronized
+    def save(self) -> None:
+        store = self._namespace()
+        for key, entry in self._pending.items():
+            if entry is None:
+                store["data"].pop(key, None)
+            else:
+                store["data"][key] = entry
+        for key, value in self._staged_meta.items():
+            if value is None:
+                store["meta"].pop(key, None)
+            else:
+                store["meta"][key] = json.loads(json.dumps(value))
+        self._pending.clear()
+        self._staged_meta.clear()
+
+    @_synchronized
+    def rollback(self) -> None:
+        self._pending.clear()
+        self._staged_meta.clear()
+
+    def close(self) -> None:
+        pass
+
+
+def open_cache(
+    filename: Optional[os.PathLike] = False, backend: str = "sqlite", **kwargs
+) -> BaseCache:
+    """
+    Opens a cache
+
+    Arguments:
+    ----------
+    filename: Optional[os.PathLike]
+        Filename. False means the backend default
+    backend: str
+        Either "sqlite" (see Cache), "memory" (see MemoryCache) or "log" (see
+        meeting_butler.logcache.LogCache). Default: "sqlite"
+    kwargs:
+        Backend specific arguments
+
+    Returns:
+    --------
+    BaseCache: The cache
+    """
+    if backend == "sqlite":
+        return Cache(filename, **kwargs)
+    if backend == "memory":
+        return MemoryCache(filename, **kwargs)
+    if backend == "log":
+        # pylint: disable=import-outside-toplevel
+        from meeting_butler.logcache import LogCache
+
+        return LogCache(filename, **kwargs)
+
+    raise ValueError(f"Unsupported cache backend: {backend}")
@@ -0,0 +1,97 @@
+"""
+Classifies the users of a data source against the ones in the local cache
+"""
+
+import logging
+from typing import Container, Iterable, NamedTuple
+
+from meeting_butler.cache import BaseCache, fingerprint
+from meeting_butler.user import User
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Diff(NamedTuple):
+    """
+    Outcome of diff()
+
+    added: Users that are not in the cache
+    changed: Users whose data differs from the cached one
+    unchanged: Users whose data matches the cached one
+    removed: Cache keys of users that are no longer listed by the data source
+    stale: Subset of unchanged, whose cache entry predates fingerprints and should be
+        written again
+    """
+
+    added: list[User]
+    changed: list[User]
+    unchanged: list[User]
+    removed: list[str]
+    stale: list[User]
+
+
+def diff(cache: BaseCache, users: Iterable[User], removed: bool = True) -> Diff:
+    """
+    Compares users with the cache, using the content fingerprints the cache keeps for each
+    entry. Users are identified by their email address: if more than one user share the same
+    address, the last one wins.
+
+    Arguments:
+    ----------
+    cache: BaseCache
+        The cache
+    users: Iterable[User]
+        Users listed by the data source
+    removed: bool
+        If False, removed users are not looked for, which spares a scan of the cache keys.
+        Default: True
+
+    Returns:
+    --------
+    Diff: The users, by category
+    """
+    by_email = {user.email: user for user in users}
+    stored = cache.fingerprints(by_email)
+
+    result = Diff([], [], [], [], [])
+    for email, user in by_email.items():
+        try:
+            cached = stored[email]
+        except KeyError:
+            result.added.append(user)
+            continue
+
+        if cached is None:
+            # Written by a previous release: compare the values instead
+            if User.from_json(cache[email]) == user:
+                result.unchanged.append(user)
+                result.stale.append(user)
+            else:
+                result.changed.append(user)
+        elif cached == fingerprint(user.to_json()):
+            result.unchanged.append(user)
+        else:
+            result.changed.append(user)
+
+    if removed:
+        result.removed.extend(removed_keys(cache, by_email))
+
+    return result
+
+
+def removed_keys(cache: BaseCache, seen: Container[str]) -> list[str]:
+    """
+    Returns the cache keys of the users that are no longer listed by the data source
+
+    Arguments:
+    ----------
+    cache: BaseCache
+        The cache
+    seen: Container[str]
+        Email addresses of the users listed by the data source
+
+    Returns:
+    --------
+    list[str]: Cache keys
+    """
+    return [key for key in cache.keys() if key not in seen]
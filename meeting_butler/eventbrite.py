@@ -2,91 +2,411 @@
 List of methods to interact with Eventbrite APIs
 """
 
+import asyncio
+import datetime
 import logging
-from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Optional
+from urllib.parse import urlencode, urlsplit
 
-import requests
 from requests.exceptions import JSONDecodeError
 
-from meeting_butler.user import User
+from meeting_butler.cache import BaseCache
+from meeting_butler.httpclient import HTTPClient, default_client, to_thread
+from meeting_butler.user import User, UserSet
 
 LOGGER = logging.getLogger(__name__)
 
+API_HOST = "www.eventbriteapi.com"
 
-def get_registered_users(event: str, token: str) -> list[User]:
+
+def _parse_attendee(attendee: dict) -> Optional[User]:
     """
-    Retrieve a deuplicated list of registered users on Eventbrite.
+    Converts an Eventbrite attendee into a user
+
+    Arguments:
+    ----------
+    - attendee: dict
+      Eventbrite attendee object
+
+    Returns:
+    --------
+    Optional[User]: The user, None if the attendee is cancelled or malformed
+    """
+    if attendee["cancelled"]:
+        return None
+
+    try:
+        profile = attendee["profile"]
+        asn = next(
+            iter(
+                [answer["answer"] for answer in attendee["answers"] if answer["question"] == "ASN"]
+            )
+        )
+        # Remove first "AS"
+        if asn.upper().startswith("AS"):
+            asn = asn[2:]
+        try:
+            asn = int(asn)
+        except ValueError:
+            asn = None
+
+        return User(
+            name=profile["first_name"].upper(),
+            surname=profile["last_name"].upper(),
+            company=profile["company"].upper(),
+            email=profile["email"].upper(),
+            title=profile["job_title"].upper(),
+            asn=asn,
+            # Country is not stored anywhere within eventbrite
+            country="IT",
+        )
+    except (TypeError, KeyError):
+        logging.error("Malformatted object: %s", attendee)
+        return None
+
+
+def watermark_key(event: str) -> str:
+    """
+    Returns the cache bookkeeping key the high-water mark of event is stored under
 
     Arguments:
     ----------
     - event: str
       Eventbrite event ID
+
+    Returns:
+    --------
+    str: Bookkeeping key
+    """
+    return f"eventbrite:watermark:{event}"
+
+
+def get_changed_since(
+    cache: BaseCache, event: str, full_resync_every: Optional[int]
+) -> Optional[str]:
+    """
+    Returns the high-water mark to fetch the attendees changed since, i.e. the latest change
+    seen by the previous fetches
+
+    Arguments:
+    ----------
+    - cache: BaseCache
+      Cache the high-water mark is stored into
+    - event: str
+      Eventbrite event ID
+    - full_resync_every: Optional[int]
+      Seconds after which all of the attendees are fetched again, to catch whatever
+      incremental fetches missed. None or 0 means that all of the attendees are always fetched
+
+    Returns:
+    --------
+    Optional[str]: Timestamp, None if all of the attendees shall be fetched
+    """
+    watermark = cache.get_meta(watermark_key(event))
+    if not watermark or not full_resync_every:
+        return None
+
+    last_full_sync = datetime.datetime.fromisoformat(watermark["full_sync"])
+    elapsed = datetime.datetime.now(datetime.timezone.utc) - last_full_sync
+    if elapsed.total_seconds() >= full_resync_every:
+        LOGGER.info("Full resync of event %s", event)
+        return None
+
+    return watermark["changed"]
+
+
+def _store_watermark(
+    cache: BaseCache, event: str, changed: str, changed_since: Optional[str]
+) -> None:
+    """
+    Stores the high-water mark into the cache
+
+    Arguments:
+    ----------
+    - cache: BaseCache
+      Cache the high-water mark is stored into
+    - event: str
+      Eventbrite event ID
+    - changed: str
+      Latest change seen by the fetch
+    - changed_since: Optional[str]
+      High-water mark the fetch started from, None for full fetches
+    """
+    if not changed:
+        return
+
+    now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    previous = cache.get_meta(watermark_key(event), {})
+    full_sync = now if changed_since is None else previous.get("full_sync", now)
+    cache.set_meta(watermark_key(event), {"changed": changed, "full_sync": full_sync})
+
+
+def _latest_change(attendees: list[dict]) -> str:
+    """
+    Returns the latest `changed` timestamp of the attendees, cancelled ones included.
+    Timestamps share the same format, hence they are ordered as strings.
+    """
+    return max((attendee.get("changed") or "" for attendee in attendees), default="")
+
+
+def _get_page(
+    client: HTTPClient, event: str, token: str, page: int, changed_since: Optional[str] = None
+) -> tuple[list[dict], int]:
+    """
+    Fetches a single page of attendees
+
+    Arguments:
+    ----------
+    - client: HTTPClient
+      HTTP client
+    - event: str
+      Eventbrite event ID
     - token: str
       Eventbrite API token ID
+    - page: int
+      Page number, starting from 1
+    - changed_since: Optional[str]
+      If set, only the attendees changed since this timestamp are fetched
 
     Returns:
     --------
-    list[User]: Registered user
+    tuple[list[dict], int]: Attendees and total number of pages
     """
     url = f"https://www.eventbriteapi.com/v3/events/{event}/attendees/"
+    params = {"token": token, "page": page}
+    if changed_since:
+        params["changed_since"] = changed_since
+    params = urlencode(params)
+    request_url = f"{url}?{params}"
+    LOGGER.debug("Fetching data for eventbrite. Event: %s, Page: %d", event, page)
+    request = client.get(request_url)
+
+    assert request.status_code == 200, f"Erroneous HTTP status code: {request.status_code}"
+
+    try:
+        body = request.json()
+        attendees = body["attendees"]
+        pages = body["pagination"]["page_count"]
+    except (KeyError, JSONDecodeError) as error:
+        raise ValueError(f"Malformed body: f{request.text}") from error
+
+    return attendees, pages
+
+
+def get_referenced_users(
+    api_url: str, token: str, client: Optional[HTTPClient] = None, event: Optional[str] = None
+) -> list[User]:
+    """
+    Retrieves the users of the order or of the attendee a webhook refers to. Webhooks may
+    cover a whole organization, hence attendees can belong to any of its events
+
+    Arguments:
+    ----------
+    - api_url: str
+      Eventbrite API URL of an order or of an attendee, as sent by webhooks
+    - token: str
+      Eventbrite API token ID
+    - client: Optional[HTTPClient]
+      HTTP client. None means the process wide default client
+    - event: Optional[str]
+      If set, attendees of other events are discarded. None means any event
+
+    Returns:
+    --------
+    list[User]: Registered users, without the cancelled ones
+    """
+    parts = urlsplit(api_url)
+    # The token is sent along, so make sure the request goes to Eventbrite
+    if parts.scheme != "https" or parts.hostname != API_HOST:
+        raise ValueError(f"Not an Eventbrite API URL: {api_url}")
+
+    # Orders list their attendees only when asked to
+    params = urlencode({"token": token, "expand": "attendees"})
+    LOGGER.debug("Fetching data for eventbrite. URL: %s", api_url)
+    request = (client or default_client()).get(f"https://{API_HOST}{parts.path}?{params}")
+
+    assert request.status_code == 200, f"Erroneous HTTP status code: {request.status_code}"
+
+    try:
+        body = request.json()
+    except JSONDecodeError as error:
+        raise ValueError(f"Malformed body: {request.text}") from error
+    if not isinstance(body, dict):
+        raise ValueError(f"Malformed body: {request.text}")
+
+    attendees = body["attendees"] if "attendees" in body else [body]
+    if event is not None:
+        kept = [attendee for attendee in attendees if str(attendee.get("event_id")) == event]
+        if len(kept) < len(attendees):
+            LOGGER.info(
+                "Discarding %d attendees of other events: %s", len(attendees) - len(kept), api_url
+            )
+        attendees = kept
+    return UserSet(_parse_attendees(attendees)).to_list()
 
-    users = []
-    page = 1
-    while True:
-        params = urlencode({"token": token, "page": page})
-        request_url = f"{url}?{params}"
-        LOGGER.debug("Fetching data for eventbrite. Event: %s, Page: %d", event, page)
-        request = requests.get(request_url, timeout=30)
 
-        assert request.status_code == 200, f"Erroneous HTTP status code: {request.status_code}"
+def iter_registered_users(
+    event: str,
+    token: str,
+    parallelism: int = 4,
+    client: Optional[HTTPClient] = None,
+    cache: Optional[BaseCache] = None,
+    changed_since: Optional[str] = None,
+) -> Iterator[User]:
+    """
+    Yields registered users on Eventbrite, page after page, as soon as each page is fetched.
+    The first page tells how many pages there are, the remaining ones are then fetched
+    concurrently, but yielded in page order. Users are not deduplicated.
+
+    Arguments:
+    ----------
+    - event: str
+      Eventbrite event ID
+    - token: str
+      Eventbrite API token ID
+    - parallelism: int
+      Maximum number of pages fetched concurrently. Default: 4
+    - client: Optional[HTTPClient]
+      HTTP client. None means the process wide default client
+    - cache: Optional[BaseCache]
+      Cache the high-water mark is stored into once all of the users have been yielded.
+      See get_changed_since()
+    - changed_since: Optional[str]
+      If set, only the users changed since this timestamp are yielded
 
+    Yields:
+    -------
+    User: Registered user
+    """
+    if parallelism < 1:
+        raise ValueError(f"Parallelism must be positive, not {parallelism}")
+
+    client = client or default_client()
+
+    attendees, pages = _get_page(client, event, token, 1, changed_since)
+    changed = max(changed_since or "", _latest_change(attendees))
+    yield from _parse_attendees(attendees)
+
+    if pages > 1:
+        executor = ThreadPoolExecutor(max_workers=min(parallelism, pages - 1))
         try:
-            body = request.json()
-            attendees = body["attendees"]
-            pages = body["pagination"]["page_count"]
-        except (KeyError, JSONDecodeError) as error:
-            raise ValueError(f"Malformed body: f{request.text}") from error
-
-        for attendee in attendees:
-            if attendee["cancelled"]:
-                continue
-
-            try:
-                user = {
-                    "name": attendee["profile"]["first_name"].upper(),
-                    "surname": attendee["profile"]["last_name"].upper(),
-                    "company": attendee["profile"]["company"].upper(),
-                    "email": attendee["profile"]["email"].upper(),
-                    "title": attendee["profile"]["job_title"].upper(),
-                    # Country is not stored anywhere within eventbrite
-                    "country": "IT",
-                }
-
-                asn = next(
-                    iter(
-                        [
-                            answer["answer"]
-                            for answer in attendee["answers"]
-                            if answer["question"] == "ASN"
-                        ]
-                    )
+            # map() yields in submission order, regardless of completion order
+            for attendees, _ in executor.map(
+                lambda page: _get_page(client, event, token, page, changed_since),
+                range(2, pages + 1),
+            ):
+                changed = max(changed, _latest_change(attendees))
+                yield from _parse_attendees(attendees)
+        finally:
+            # Do not keep on fetching if the consumer stops early
+            executor.shutdown(cancel_futures=True)
+
+    if cache is not None:
+        _store_watermark(cache, event, changed, changed_since)
+
+
+def get_registered_users(
+    event: str, token: str, parallelism: int = 4, client: Optional[HTTPClient] = None
+) -> list[User]:
+    """
+    Retrieve a deuplicated list of registered users on Eventbrite. See iter_registered_users()
+
+    Arguments:
+    ----------
+    - event: str
+      Eventbrite event ID
+    - token: str
+      Eventbrite API token ID
+    - parallelism: int
+      Maximum number of pages fetched concurrently. Default: 4
+    - client: Optional[HTTPClient]
+      HTTP client. None means the process wide default client
+
+    Returns:
+    --------
+    list[User]: Registered user
+    """
+    return UserSet(iter_registered_users(event, token, parallelism, client)).to_list()
+
+
+def _parse_attendees(attendees: list[dict]) -> Iterator[User]:
+    """
+    Yields the users out of the attendees of a page
+
+    Arguments:
+    ----------
+    - attendees: list[dict]
+      Eventbrite attendee objects
+
+    Yields:
+    -------
+    User: Registered user
+    """
+    for attendee in attendees:
+        user = _parse_attendee(attendee)
+        if user:
+            yield user
+
+
+async def async_get_registered_users(
+    event: str,
+    token: str,
+    parallelism: int = 4,
+    client: Optional[HTTPClient] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    cache: Optional[BaseCache] = None,
+    changed_since: Optional[str] = None,
+) -> list[User]:
+    """
+    Asynchronous variant of get_registered_users(). See iter_registered_users()
+
+    Arguments:
+    ----------
+    - event: str
+      Eventbrite event ID
+    - token: str
+      Eventbrite API token ID
+    - parallelism: int
+      Maximum number of pages fetched concurrently. Default: 4
+    - client: Optional[HTTPClient]
+      HTTP client. None means the process wide default client
+    - semaphore: Optional[asyncio.Semaphore]
+      Additional semaphore every request has to acquire, e.g. shared with other tasks
+    - cache: Optional[BaseCache]
+      Cache the high-water mark is stored into. See get_changed_since()
+    - changed_since: Optional[str]
+      If set, only the users changed since this timestamp are returned
+
+    Returns:
+    --------
+    list[User]: Registered user
+    """
+    if parallelism < 1:
+        raise ValueError(f"Parallelism must be positive, not {parallelism}")
+
+    client = client or default_client()
+    semaphores = [asyncio.Semaphore(parallelism)] + ([semaphore] if semaphore else [])
+
+    attendees, pages = await to_thread(
+        _get_page, client, event, token, 1, changed_since, semaphores=semaphores
+    )
+
+    # gather() returns the results in submission order, regardless of completion order
+    results = [attendees] + [
+        attendees
+        for attendees, _ in await asyncio.gather(
+            *(
+                to_thread(
+                    _get_page, client, event, token, page, changed_since, semaphores=semaphores
                 )
-                # Remove first "AS"
-                if asn.upper().startswith("AS"):
-                    asn = asn[2:]
-                try:
-                    user["asn"] = int(asn)
-                except ValueError:
-                    user["asn"] = None
-            except (TypeError, KeyError):
-                logging.error("Malformatted object: %s", attendee)
-                continue
-
-            if user not in users:
-                users.append(user)
-
-        if page >= pages:
-            break
-        page += 1
-
-    return users
+                for page in range(2, pages + 1)
+            )
+        )
+    ]
+
+    if cache is not None:
+        changed = max([changed_since or ""] + [_latest_change(attendees) for attendees in results])
+        _store_watermark(cache, event, changed, changed_since)
+
+    return UserSet(user for attendees in results for user in _parse_attendees(attendees)).to_list()
@@ -2,70 +2,184 @@
 List of methods to interact with Formbuilder APIs
 """
 
+import asyncio
+import codecs
 import csv
 import logging
+from typing import Iterator, Optional
 
 import requests
-from requests.exceptions import JSONDecodeError
 
-from meeting_butler.user import User
+from meeting_butler.cache import BaseCache
+from meeting_butler.httpclient import (
+    HTTPClient,
+    conditional_headers,
+    default_client,
+    to_thread,
+    update_validators,
+)
+from meeting_butler.user import User, UserSet
 
 LOGGER = logging.getLogger(__name__)
 
 
-def get_registered_users(url: str) -> list[User]:
+def iter_registered_users(
+    url: str, client: Optional[HTTPClient] = None, cache: Optional[BaseCache] = None
+) -> Iterator[User]:
     """
-    Retrieve a deuplicated list of registered users on Eventbrite.
+    Yields registered users on 123FormBuilder as soon as their rows are downloaded.
+    The body is streamed and decoded incrementally, so that memory usage does not depend
+    on the size of the export. Users are not deduplicated.
 
     Arguments:
     ----------
     - url: str
       URL pointing to the Google doc share as CSV
+    - client: Optional[HTTPClient]
+      HTTP client. None means the process wide default client
+    - cache: Optional[BaseCache]
+      Cache the HTTP validators are kept into. None disables conditional requests
 
-    Returns:
-    --------
-    list[User]: Registered user
+    Yields:
+    -------
+    User: Registered user
+
+    Raises:
+    -------
+    NotModified: if the data did not change since the previous request
     """
-    users = []
     LOGGER.debug("Fetching data for 123FormBuilder. URL: %s", url)
-    request = requests.get(url, timeout=30)
+    request = (client or default_client()).conditional_get(url, cache, stream=True)
+
+    yield from _parse(request)
+
 
-    assert request.status_code == 200, f"Erroneous HTTP status code: {request.status_code}"
+def _parse(request: requests.Response) -> Iterator[User]:
+    """
+    Yields the users listed by the streamed CSV export
+
+    Arguments:
+    ----------
+    - request: requests.Response
+      Streamed response
 
+    Yields:
+    -------
+    User: Registered user
+    """
     try:
-        content = request.content.decode("utf-8")
-        attendees = csv.reader(content.splitlines(), delimiter=",")
-    except (KeyError, JSONDecodeError) as error:
-        raise ValueError(f"Malformed body: f{request.text}") from error
+        assert request.status_code == 200, f"Erroneous HTTP status code: {request.status_code}"
 
-    for attendee in attendees:
-        try:
-            user = {
-                "name": attendee[2].upper(),
-                "surname": attendee[3].upper(),
-                "company": attendee[4].upper(),
-                "title": attendee[5].upper(),
-                "email": attendee[6].upper(),
-                "country": "IT",
-            }
-
-            if not user["company"]:
-                # Empty company name
-                user["company"] = f"{user['name']} {user['surname']}"
+        # iterdecode() relies on an incremental decoder, so multibyte characters split
+        # across chunks are handled
+        lines = codecs.iterdecode(request.iter_lines(), "utf-8")
+        attendees = csv.reader(lines, delimiter=",")
 
-            asn = attendee[9]
-            # Remove first "AS"
-            if asn.upper().startswith("AS"):
-                asn = asn[2:]
+        for attendee in attendees:
             try:
-                user["asn"] = int(asn)
-            except ValueError:
-                user["asn"] = None
-        except (TypeError, KeyError):
-            logging.error("Malformatted row: %s", attendee)
-            continue
+                name = attendee[2].upper()
+                surname = attendee[3].upper()
+                # Empty company name
+                company = attendee[4].upper() or f"{name} {surname}"
+
+                asn = attendee[9]
+                # Remove first "AS"
+                if asn.upper().startswith("AS"):
+                    asn = asn[2:]
+                try:
+                    asn = int(asn)
+                except ValueError:
+                    asn = None
+
+                user = User(
+                    name=name,
+                    surname=surname,
+                    company=company,
+                    title=attendee[5].upper(),
+                    email=attendee[6].upper(),
+                    asn=asn,
+                    country="IT",
+                )
+            except (TypeError, KeyError):
+                logging.error("Malformatted row: %s", attendee)
+                continue
+
+            yield user
+    except (UnicodeDecodeError, csv.Error) as error:
+        raise ValueError(f"Malformed body: {error}") from error
+    finally:
+        request.close()
+
+
+def get_registered_users(
+    url: str, client: Optional[HTTPClient] = None, cache: Optional[BaseCache] = None
+) -> list[User]:
+    """
+    Retrieve a deuplicated list of registered users on 123FormBuilder.
+
+    Arguments:
+    ----------
+    - url: str
+      URL pointing to the Google doc share as CSV
+    - client: Optional[HTTPClient]
+      HTTP client. None means the process wide default client
+    - cache: Optional[BaseCache]
+      Cache the HTTP validators are kept into. None disables conditional requests
+
+    Returns:
+    --------
+    list[User]: Registered user
+
+    Raises:
+    -------
+    NotModified: if the data did not change since the previous request
+    """
+    return UserSet(iter_registered_users(url, client, cache)).to_list()
+
+
+async def async_get_registered_users(
+    url: str,
+    client: Optional[HTTPClient] = None,
+    cache: Optional[BaseCache] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> list[User]:
+    """
+    Asynchronous variant of get_registered_users().
+    The download and the parsing are run in a worker thread, while the cache is only
+    accessed from the event loop thread.
+
+    Arguments:
+    ----------
+    - url: str
+      URL pointing to the Google doc share as CSV
+    - client: Optional[HTTPClient]
+      HTTP client. None means the process wide default client
+    - cache: Optional[BaseCache]
+      Cache the HTTP validators are kept into. None disables conditional requests
+    - semaphore: Optional[asyncio.Semaphore]
+      Semaphore the request has to acquire, e.g. shared with other tasks
+
+    Returns:
+    --------
+    list[User]: Registered user
+
+    Raises:
+    -------
+    NotModified: if the data did not change since the previous request
+    """
+    client = client or default_client()
+    headers = conditional_headers(url, cache) if cache is not None else {}
 
-        if user not in users:
-            users.append(user)
+    LOGGER.debug("Fetching data for 123FormBuilder. URL: %s", url)
+    request = await to_thread(
+        client.get, url, headers=headers, semaphores=[semaphore] if semaphore else [], stream=True
+    )
+
+    if cache is not None:
+        try:
+            update_validators(url, cache, request)
+        except Exception:
+            request.close()
+            raise
 
-    return users
+    return await to_thread(lambda: UserSet(_parse(request)).to_list())
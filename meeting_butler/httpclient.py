@@ -0,0 +1,288 @@
+"""
+Shared HTTP client keeping persistent, pooled connections
+"""
+
+import asyncio
+import logging
+import threading
+from contextlib import AsyncExitStack
+from typing import Any, Callable, Iterable, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from meeting_butler.cache import BaseCache
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    "Accept-Encoding": "gzip, deflate",
+    "Connection": "keep-alive",
+}
+
+
+class NotModified(Exception):
+    """
+    Raised when the server reports that the resource did not change since the last request
+    """
+
+
+def validators_key(url: str) -> str:
+    """
+    Returns the cache bookkeeping key the HTTP validators for url are stored under
+
+    Arguments:
+    ----------
+    url: str
+        URL
+
+    Returns:
+    --------
+    str: Bookkeeping key
+    """
+    return f"validators:{url}"
+
+
+def conditional_headers(url: str, cache: BaseCache) -> dict:
+    """
+    Returns the If-None-Match/If-Modified-Since headers built from the validators of the
+    previous response for url
+
+    Arguments:
+    ----------
+    url: str
+        URL
+    cache: BaseCache
+        Cache the validators are stored into
+
+    Returns:
+    --------
+    dict: HTTP headers
+    """
+    validators = cache.get_meta(validators_key(url), {})
+
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+
+    return headers
+
+
+def update_validators(url: str, cache: BaseCache, response: requests.Response) -> None:
+    """
+    Stores the validators of response into the cache
+
+    Arguments:
+    ----------
+    url: str
+        URL
+    cache: BaseCache
+        Cache the validators are stored into
+    response: requests.Response
+        Response to the conditional request
+
+    Raises:
+    -------
+    NotModified: if the server replied with 304
+    """
+    if response.status_code == 304:
+        LOGGER.debug("Not modified: %s", url)
+        raise NotModified(url)
+
+    if response.status_code == 200:
+        validators = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        cache.set_meta(validators_key(url), validators if any(validators.values()) else None)
+
+
+class HTTPClient:
+    """
+    Owns one persistent requests.Session per host, so that connections are kept alive and
+    reused across requests and sync cycles.
+
+    Arguments:
+    ----------
+    pool_size: int
+        Maximum number of connections kept open per host. Default: 10
+    timeout: float
+        Timeout in seconds applied to requests that do not set their own. Default: 30
+    """
+
+    def __init__(self, pool_size: int = 10, timeout: float = 30) -> None:
+        if pool_size < 1:
+            raise ValueError(f"Pool size must be positive, not {pool_size}")
+
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._sessions: dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs) -> None:
+        self.close()
+
+    def session(self, url: str) -> requests.Session:
+        """
+        Returns the session for the host url points to, creating it if needed
+
+        Arguments:
+        ----------
+        url: str
+            Any URL on the host
+
+        Returns:
+        --------
+        requests.Session: The session
+        """
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+
+        with self._lock:
+            try:
+                return self._sessions[host]
+            except KeyError:
+                pass
+
+            session = requests.Session()
+            session.headers.update(DEFAULT_HEADERS)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount(f"{host}/", adapter)
+            self._sessions[host] = session
+            LOGGER.debug("Created HTTP session for %s", host)
+
+            return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Sends an HTTP request through the session for the host url points to
+
+        Arguments:
+        ----------
+        method: str
+            HTTP method
+        url: str
+            URL
+        kwargs:
+            Any argument accepted by requests.Session.request
+
+        Returns:
+        --------
+        requests.Response: The response
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session(url).request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a GET request. See request()
+        """
+        return self.request("GET", url, **kwargs)
+
+    def conditional_get(
+        self, url: str, cache: Optional[BaseCache] = None, **kwargs
+    ) -> requests.Response:
+        """
+        Sends a GET request carrying the ETag/Last-Modified validators of the previous
+        response, which are kept in the cache bookkeeping data. New validators are stored
+        into the cache, and become persistent when the cache is saved.
+
+        Arguments:
+        ----------
+        url: str
+            URL
+        cache: Optional[BaseCache]
+            Cache the validators are stored into. None means a plain GET request
+        kwargs:
+            Any argument accepted by requests.Session.request
+
+        Returns:
+        --------
+        requests.Response: The response
+
+        Raises:
+        -------
+        NotModified: if the server replied with 304
+        """
+        if cache is None:
+            return self.get(url, **kwargs)
+
+        headers = dict(kwargs.pop("headers", None) or {})
+        headers.update(conditional_headers(url, cache))
+
+        response = self.get(url, headers=headers, **kwargs)
+        try:
+            update_validators(url, cache, response)
+        except NotModified:
+            # Streamed responses are only released once read or closed
+            response.close()
+            raise
+
+        return response
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a POST request. See request()
+        """
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        """
+        Closes all of the sessions
+        """
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_DEFAULT_CLIENT: Optional[HTTPClient] = None
+_DEFAULT_CLIENT_LOCK = threading.Lock()
+
+
+def default_client() -> HTTPClient:
+    """
+    Returns the process wide client used when callers do not provide their own
+
+    Returns:
+    --------
+    HTTPClient: The client
+    """
+    global _DEFAULT_CLIENT  # pylint: disable=global-statement
+
+    with _DEFAULT_CLIENT_LOCK:
+        if _DEFAULT_CLIENT is None:
+            _DEFAULT_CLIENT = HTTPClient()
+        return _DEFAULT_CLIENT
+
+
+async def to_thread(
+    func: Callable, *args, semaphores: Iterable[asyncio.Semaphore] = (), **kwargs
+) -> Any:
+    """
+    Runs a blocking call (e.g. an HTTP request) in a worker thread, once all of the
+    semaphores have been acquired
+
+    Arguments:
+    ----------
+    func: Callable
+        The blocking function
+    args, kwargs:
+        Arguments passed to func
+    semaphores: Iterable[asyncio.Semaphore]
+        Semaphores limiting the concurrency. Default: none
+
+    Returns:
+    --------
+    Any: Whatever func returns
+    """
+    async with AsyncExitStack() as stack:
+        for semaphore in semaphores:
+            await stack.enter_async_context(semaphore)
+        return await asyncio.to_thread(func, *args, **kwargs)
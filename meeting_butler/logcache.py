@@ -0,0 +1,496 @@
+"""
+Cache backend storing the data into an append-only log, read through a memory map
+"""
+
+import contextlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from tempfile import gettempdir
+from typing import Any, Iterable, Iterator, NamedTuple, Optional
+
+from meeting_butler.cache import PURGE_LIMIT, BaseCache, _digest, _synchronized
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+LOGGER = logging.getLogger(__name__)
+
+MAGIC = b"MBLOG1\n"
+
+# crc32, operation, timestamp, key length, value length, fingerprint
+HEADER = struct.Struct("<IBdII16s")
+
+SET, DELETE, SET_META, DELETE_META, TOUCH = 1, 2, 3, 4, 5
+
+# The log is compacted once dead records take more space than the live ones
+GARBAGE_RATIO = 1.0
+
+
+class _Entry(NamedTuple):
+    offset: int
+    length: int
+    fingerprint: str
+    timestamp: float
+    # Size of the whole record, accounted as garbage once the entry is replaced
+    size: int
+
+
+def _record(
+    operation: int,
+    namespace: str,
+    key: str,
+    value: bytes = b"",
+    digest: str = "",
+    timestamp: Optional[float] = None,
+) -> bytes:
+    """
+    Encodes a log record, timestamped now unless timestamp is given
+    """
+    # Namespaces and keys are separated by NUL, which neither is expected to contain
+    encoded_key = f"{namespace}\0{key}".encode("utf-8")
+    body = HEADER.pack(
+        0,
+        operation,
+        time.time() if timestamp is None else timestamp,
+        len(encoded_key),
+        len(value),
+        bytes.fromhex(digest) if digest else bytes(16),
+    )[4:]
+    body += encoded_key + value
+    return struct.pack("<I", zlib.crc32(body)) + body
+
+
+class _Log:
+    """
+    Log file and its hash index, shared by the caches opened on the same file within the
+    process
+
+    Arguments:
+    ----------
+    path: str
+        Log file path
+    fsync: bool
+        If true, appends are flushed to the disk before returning
+    """
+
+    def __init__(self, path: str, fsync: bool) -> None:
+        self.path = path
+        self.fsync = fsync
+        self.lock = threading.RLock()
+        # namespace -> key -> entry
+        self.index: dict[str, dict[str, _Entry]] = {}
+        # namespace -> key -> (value, record size)
+        self.meta: dict[str, dict[str, tuple[Any, int]]] = {}
+        self.garbage = 0
+        self.size = 0
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._inode = None
+        self._open()
+
+    def _open(self) -> None:
+        self._file = open(self.path, "a+b")  # pylint: disable=consider-using-with
+        self._file.seek(0, os.SEEK_END)
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+            self._file.flush()
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        self.index.clear()
+        self.meta.clear()
+        self.garbage = 0
+        self.size = len(MAGIC)
+        self._remap()
+        if self._map[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a cache log: {self.path}")
+        self._load()
+
+    def _remap(self) -> None:
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        """
+        Closes the log file
+        """
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def refresh(self, repair: bool = False) -> None:
+        """
+        Catches up with the records appended, or the compaction run, by other processes.
+        See _load() about repair
+        """
+        stat = os.stat(self.path)
+        if stat.st_ino != self._inode:
+            # Any lock held is on the replaced file, hence the new one is not repaired
+            self.close()
+            self._open()
+        elif stat.st_size > self.size:
+            self._remap()
+            self._load(repair)
+
+    def _load(self, repair: bool = False) -> None:
+        """
+        Indexes the records from the current size on, up to the first incomplete one. That
+        might be a record another process is still appending, or a torn one left by a crash:
+        the two can only be told apart while holding the lock writers take, hence repair, i.e.
+        cutting the incomplete record away, must only be asked for while holding it
+        """
+        end = len(self._map)
+        offset = self.size
+        while offset + HEADER.size <= end:
+            crc, operation, timestamp, key_length, value_length, digest = HEADER.unpack_from(
+                self._map, offset
+            )
+            start = offset + HEADER.size
+            stop = start + key_length + value_length
+            if stop > end or zlib.crc32(self._map[offset + 4 : stop]) != crc:
+                break
+            namespace, _, key = (
+                self._map[start : start + key_length].decode("utf-8").partition("\0")
+            )
+            self._apply(
+                operation, namespace, key, start + key_length, value_length, digest, timestamp
+            )
+            offset = stop
+
+        if offset < end and repair:
+            LOGGER.warning("Discarding %d bytes of torn records from %s", end - offset, self.path)
+            self._file.truncate(offset)
+            self._remap()
+        self.size = offset
+
+    def _apply(
+        self,
+        operation: int,
+        namespace: str,
+        key: str,
+        offset: int,
+        length: int,
+        digest: bytes,
+        timestamp: float,
+    ) -> None:
+        size = offset + length - self._record_start(offset, namespace, key)
+        if operation == TOUCH:
+            # Only the timestamp is kept, compact() writes it into the live record
+            entries = self.index.setdefault(namespace, {})
+            if key in entries:
+                entries[key] = entries[key]._replace(timestamp=timestamp)
+            self.garbage += size
+        elif operation in (SET, DELETE):
+            previous = self.index.setdefault(namespace, {}).pop(key, None)
+            if previous is not None:
+                self.garbage += previous.size
+            if operation == SET:
+                self.index[namespace][key] = _Entry(offset, length, digest.hex(), timestamp, size)
+            else:
+                self.garbage += size
+        else:
+            previous = self.meta.setdefault(namespace, {}).pop(key, None)
+            if previous is not None:
+                self.garbage += previous[1]
+            if operation == SET_META:
+                value = json.loads(self._map[offset : offset + length])
+                self.meta[namespace][key] = (value, size)
+            else:
+                self.garbage += size
+
+    @staticmethod
+    def _record_start(value_offset: int, namespace: str, key: str) -> int:
+        return value_offset - len(f"{namespace}\0{key}".encode("utf-8")) - HEADER.size
+
+    def read(self, entry: _Entry) -> bytes:
+        """
+        Returns the value of entry
+        """
+        if entry.offset + entry.length > len(self._map):
+            self._remap()
+        return self._map[entry.offset : entry.offset + entry.length]
+
+    @contextlib.contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """
+        Keeps other processes from writing to the log, when the platform allows to, after
+        catching up with their changes. Records left incomplete by writers that crashed are
+        cut away
+        """
+        while True:
+            handle = self._file
+            if fcntl:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            self.refresh(repair=True)
+            # The log has been replaced by a compaction, the lock went with the old file
+            if handle is self._file:
+                break
+        try:
+            yield
+        finally:
+            if fcntl and self._file is handle:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    def append(self, records: list[bytes]) -> None:
+        """
+        Appends records to the log and indexes them
+        """
+        if not records:
+            return
+
+        with self._exclusive():
+            self._file.seek(0, os.SEEK_END)
+            self._file.write(b"".join(records))
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._remap()
+            self._load()
+
+    def compact(self) -> None:
+        """
+        Rewrites the live records into a new log, which then replaces the current one
+        """
+        before = self.size
+        temporary = f"{self.path}.compact"
+        with self._exclusive():
+            with open(temporary, "wb") as output:
+                output.write(MAGIC)
+                # Live records are copied with the timestamp of their last touch
+                for namespace, entries in self.index.items():
+                    for key, entry in entries.items():
+                        output.write(
+                            _record(
+                                SET,
+                                namespace,
+                                key,
+                                self.read(entry),
+                                entry.fingerprint,
+                                entry.timestamp,
+                            )
+                        )
+                for namespace, values in self.meta.items():
+                    for key, (value, _) in values.items():
+                        output.write(
+                            _record(SET_META, namespace, key, json.dumps(value).encode("utf-8"))
+                        )
+                output.flush()
+                os.fsync(output.fileno())
+            os.replace(temporary, self.path)
+        self.close()
+        self._open()
+        LOGGER.info("Compacted %s from %d to %d bytes", self.path, before, self.size)
+
+
+_LOGS: dict[str, _Log] = {}
+_LOGS_LOCK = threading.Lock()
+
+
+class LogCache(BaseCache):
+    """
+    Cache backed by an append-only log. Writes are appended in a single batch by save(), and
+    indexed by an in-memory hash table, which is shared by the caches opened on the same file
+    within the process. Values are read from a memory map of the log, hence lookups never
+    issue a system call. Dead records are reclaimed by compact(), which rewrites the log.
+
+    Arguments:
+    ----------
+    filename: Optional[os.PathLike]
+        Filename. If False, a file named meeting_butler.log is created in the temp directory
+        Default: False
+    reset: Optional[bool]
+        If true, deletes the log before starting. Default: False
+    namespace: Optional[str]
+        Namespace. Default: "" (default namespace)
+    fsync: Optional[bool]
+        If true, save() returns once the data is on the disk. Default: True
+    """
+
+    def __init__(
+        self,
+        filename: Optional[os.PathLike] = False,
+        reset: Optional[bool] = False,
+        namespace: Optional[str] = "",
+        fsync: Optional[bool] = True,
+    ) -> None:
+        self.filename = os.path.abspath(
+            filename or os.path.join(gettempdir(), "meeting_butler.log")
+        )
+        self.namespace = namespace or ""
+        self._lock = threading.RLock()
+        # Changes waiting for save(), None marks deletions
+        self._pending: dict[str, Optional[tuple[bytes, str]]] = {}
+        # Keys seen since the last save(), whose timestamp is refreshed by it
+        self._touched: dict[str, None] = {}
+        self._staged_meta: dict[str, Any] = {}
+
+        with _LOGS_LOCK:
+            log = _LOGS.pop(self.filename, None) if reset else _LOGS.get(self.filename)
+            if reset:
+                if log:
+                    log.close()
+                log = None
+                try:
+                    os.unlink(self.filename)
+                except FileNotFoundError:
+                    pass
+            if log is None:
+                log = _LOGS[self.filename] = _Log(self.filename, bool(fsync))
+            else:
+                with log.lock:
+                    log.refresh()
+        self._log = log
+
+    def _entries(self, namespace: Optional[str] = None) -> dict[str, _Entry]:
+        return self._log.index.get(self.namespace if namespace is None else namespace, {})
+
+    @_synchronized
+    def __setitem__(self, key: str, value: Any) -> None:
+        if not isinstance(key, str):
+            raise TypeError(f"Key must be str, not {type(key)}")
+        serialized = json.dumps(value)
+        self._pending[key] = (serialized.encode("utf-8"), _digest(serialized))
+
+    @_synchronized
+    def __getitem__(self, key: str) -> Any:
+        if key in self._pending:
+            pending = self._pending[key]
+            if pending is None:
+                raise KeyError(key)
+            return json.loads(pending[0])
+
+        with self._log.lock:
+            entry = self._entries().get(key)
+            if entry is None:
+                raise KeyError(key)
+            return json.loads(self._log.read(entry))
+
+    @_synchronized
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self._pending[key] = None
+
+    @_synchronized
+    def touch(self, keys: Iterable[str]) -> None:
+        self._touched.update(dict.fromkeys(keys))
+
+    @_synchronized
+    def fingerprints(self, keys: Iterable[str]) -> dict[str, Optional[str]]:
+        found = {}
+        with self._log.lock:
+            entries = self._entries()
+            for key in keys:
+                if key in self._pending:
+                    if self._pending[key] is not None:
+                        found[key] = self._pending[key][1]
+                elif key in entries:
+                    found[key] = entries[key].fingerprint
+        return found
+
+    @_synchronized
+    def keys(self) -> list[str]:
+        with self._log.lock:
+            keys = dict.fromkeys(self._entries())
+        keys.update(self._pending)
+        return [key for key in keys if self._pending.get(key, True) is not None]
+
+    @_synchronized
+    def get_meta(self, key: str, default: Any = None) -> Any:
+        if key in self._staged_meta:
+            value = self._staged_meta[key]
+        else:
+            with self._log.lock:
+                value = self._log.meta.get(self.namespace, {}).get(key, (None,))[0]
+        return default if value is None else json.loads(json.dumps(value))
+
+    @_synchronized
+    def set_meta(self, key: str, value: Any) -> None:
+        self._staged_meta[key] = value
+
+    @_synchronized
+    def purge(self, ttl: int, limit: int = PURGE_LIMIT) -> int:
+        if ttl <= 0 or limit <= 0:
+            raise ValueError(f"TTL and limit must be positive, not {ttl} and {limit}")
+
+        cutoff = time.time() - ttl
+        with self._log.lock:
+            expired = sorted(
+                (entry.timestamp, key)
+                for key, entry in self._entries().items()
+                if entry.timestamp < cutoff and key not in self._pending
+            )[:limit]
+            self._log.append([_record(DELETE, self.namespace, key) for _, key in expired])
+        return len(expired)
+
+    @_synchronized
+    def namespaces(self) -> list[str]:
+        with self._log.lock:
+            return [namespace for namespace, entries in self._log.index.items() if entries]
+
+    @_synchronized
+    def drop(self, namespace: Optional[str] = None) -> None:
+        namespace = self.namespace if namespace is None else namespace
+        with self._log.lock:
+            records = [_record(DELETE, namespace, key) for key in self._entries(namespace)]
+            records += [
+                _record(DELETE_META, namespace, key) for key in self._log.meta.get(namespace, {})
+            ]
+            self._log.append(records)
+        if namespace == self.namespace:
+            self.rollback()
+
+    @_synchronized
+    def compact(self, pages: Optional[int] = None) -> None:
+        """
+        Rewrites the log once dead records take more space than the live ones. The log is
+        rewritten as a whole, hence pages is not used
+        """
+        self.save()
+        with self._log.lock:
+            if self._log.garbage > GARBAGE_RATIO * (self._log.size - self._log.garbage):
+                self._log.compact()
+
+    @_synchronized
+    def save(self) -> None:
+        records = []
+        for key, pending in self._pending.items():
+            if pending is None:
+                records.append(_record(DELETE, self.namespace, key))
+            else:
+                records.append(_record(SET, self.namespace, key, *pending))
+        # Written records are timestamped anyway, unknown keys are ignored when indexed
+        records += [
+            _record(TOUCH, self.namespace, key) for key in self._touched if key not in self._pending
+        ]
+        for key, value in self._staged_meta.items():
+            if value is None:
+                records.append(_record(DELETE_META, self.namespace, key))
+            else:
+                records.append(
+                    _record(SET_META, self.namespace, key, json.dumps(value).encode("utf-8"))
+                )
+
+        with self._log.lock:
+            self._log.append(records)
+        self.rollback()
+
+    @_synchronized
+    def rollback(self) -> None:
+        self._pending.clear()
+        self._touched.clear()
+        self._staged_meta.clear()
+
+    def close(self) -> None:
+        # The log stays open, so that the next cache opened on the same file reuses its index
+        pass
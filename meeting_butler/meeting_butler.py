@@ -2,13 +2,17 @@
 Methods implementing the application logic
 """
 
+import asyncio
 import logging
 import os
-import re
-from typing import Optional
+from typing import Mapping, Optional
 
 from meeting_butler import eventbrite, formbuilder, meetingtool, pretino
-from meeting_butler.cache import Cache
+from meeting_butler.cache import PURGE_LIMIT, BaseCache, open_cache
+from meeting_butler.diff import Diff, diff, removed_keys
+from meeting_butler.httpclient import HTTPClient, NotModified, validators_key
+from meeting_butler.pipeline import Pipeline
+from meeting_butler.rules import Rules
 from meeting_butler.user import User
 
 LOGGER = logging.getLogger(__name__)
@@ -21,9 +25,16 @@ def sync(
     data_source: str = "pretino",
     cache_filename: Optional[os.PathLike] = False,
     email_regex: str = False,
+    cache_settings: Optional[dict] = None,
+    meetingtool_settings: Optional[dict] = None,
+    client: Optional[HTTPClient] = None,
+    queue_size: int = 1000,
+    rules: Optional[Rules] = None,
 ) -> list[User]:
     """
-    Synchronizes meetingtool users with Eventbrite users
+    Synchronizes meetingtool users with the data source users.
+    Users are streamed through a pipeline (see meeting_butler.pipeline), so that the
+    registration starts while the data source is still being downloaded.
 
     Arguments:
     ----------
@@ -41,42 +52,430 @@ def sync(
     email_regex: str
         Regex. If not false, email addresses not matching with it are discarded
         Default False
+    cache_settings: Optional[dict]
+        Dictionary with extra arguments for the local cache (e.g. backend, wal)
+        Default: None
+    meetingtool_settings: Optional[dict]
+        Dictionary with extra arguments for the meetingtool import
+        (e.g. batch_size, rate_limit, max_inflight)
+        Default: None
+    client: Optional[HTTPClient]
+        HTTP client shared by the data source and meetingtool. None means the process wide
+        default client
+        Default: None
+    queue_size: int
+        Capacity of the queues between the pipeline stages
+        Default: 1000
+    rules: Optional[Rules]
+        Rules the users are rewritten and filtered by. email_regex can be part of them
+        Default: None
 
     Returns:
     --------
-    list[User]: List of newly added users
+    list[User]: List of newly registered or updated users
     """
     LOGGER.info("Sync started")
 
-    new_users = []
-
-    if data_source == "eventbrite":
-        source_users = eventbrite.get_registered_users(
-            source_settings["event"], source_settings["token"]
-        )
-    elif data_source == "formbuilder":
-        source_users = formbuilder.get_registered_users(source_settings["url"])
-    elif data_source == "pretino":
-        source_users = pretino.get_registered_users(
-            source_settings["url"], source_settings["token"]
-        )
-    else:
-        raise RuntimeError(f"Unsupported data source: {data_source}")
-
-    with Cache(cache_filename) as cache:
-        for user in source_users:
-            if email_regex and not re.search(email_regex, user["email"], re.IGNORECASE):
-                continue
-            if user["email"] not in cache:
-                new_users.append(user)
-
-        LOGGER.info("Found %d new users", len(new_users))
-        LOGGER.debug("New users: %s", new_users)
-
-        meetingtool.register_users(meetingtool_hostname, meetingtool_token, new_users)
-        for new_user in new_users:
-            cache[new_user["email"]] = new_user
+    with open_cache(cache_filename, **(cache_settings or {})) as cache:
+        # Incremental fetches only list part of the users
+        complete = True
+
+        if data_source == "eventbrite":
+            changed_since = eventbrite.get_changed_since(
+                cache, source_settings["event"], source_settings.get("full_resync_every")
+            )
+            complete = changed_since is None
+            source_users = eventbrite.iter_registered_users(
+                source_settings["event"],
+                source_settings["token"],
+                source_settings.get("parallelism", 4),
+                client,
+                cache,
+                changed_since,
+            )
+        elif data_source == "formbuilder":
+            source_users = formbuilder.iter_registered_users(source_settings["url"], client, cache)
+        elif data_source == "pretino":
+            source_users = pretino.iter_registered_users(
+                source_settings["url"], source_settings["token"], client, cache
+            )
+        else:
+            raise RuntimeError(f"Unsupported data source: {data_source}")
+
+        with meetingtool.Importer(
+            meetingtool_hostname, meetingtool_token, client=client, **(meetingtool_settings or {})
+        ) as importer:
+            try:
+                delta, new_users, registered_users = Pipeline(
+                    cache, importer, _rules(rules, email_regex), queue_size
+                ).run(source_users, removed=complete)
+            except NotModified:
+                LOGGER.info("Sync completed: source data did not change")
+                return []
+            except meetingtool.RegistrationFailed as error:
+                _salvage(cache, source_settings, error)
+                raise
+
+        _report(delta)
+        _commit(cache, source_settings, delta, new_users, registered_users)
 
     LOGGER.info("Sync completed")
 
-    return new_users
+    return registered_users
+
+
+async def async_sync(
+    meetingtool_hostname: str,
+    meetingtool_token: str,
+    source_settings: Optional[dict],
+    data_source: str = "pretino",
+    cache_filename: Optional[os.PathLike] = False,
+    email_regex: str = False,
+    cache_settings: Optional[dict] = None,
+    meetingtool_settings: Optional[dict] = None,
+    client: Optional[HTTPClient] = None,
+    concurrency: int = 8,
+    rules: Optional[Rules] = None,
+) -> list[User]:
+    """
+    Asynchronous variant of sync(). HTTP requests are run in worker threads, so that slow
+    upstreams do not block the event loop.
+
+    Arguments:
+    ----------
+    See sync()
+    concurrency: int
+        Maximum number of HTTP requests in flight at any time, across the data source and
+        meetingtool. Default: 8
+
+    Returns:
+    --------
+    list[User]: List of newly registered or updated users
+    """
+    if concurrency < 1:
+        raise ValueError(f"Concurrency must be positive, not {concurrency}")
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    LOGGER.info("Sync started")
+
+    with open_cache(cache_filename, **(cache_settings or {})) as cache:
+        # Incremental fetches only list part of the users
+        complete = True
+
+        try:
+            if data_source == "eventbrite":
+                changed_since = eventbrite.get_changed_since(
+                    cache, source_settings["event"], source_settings.get("full_resync_every")
+                )
+                complete = changed_since is None
+                source_users = await eventbrite.async_get_registered_users(
+                    source_settings["event"],
+                    source_settings["token"],
+                    source_settings.get("parallelism", 4),
+                    client,
+                    semaphore,
+                    cache,
+                    changed_since,
+                )
+            elif data_source == "formbuilder":
+                source_users = await formbuilder.async_get_registered_users(
+                    source_settings["url"], client, cache, semaphore
+                )
+            elif data_source == "pretino":
+                source_users = await pretino.async_get_registered_users(
+                    source_settings["url"],
+                    source_settings["token"],
+                    client,
+                    cache,
+                    semaphore=semaphore,
+                )
+            else:
+                raise RuntimeError(f"Unsupported data source: {data_source}")
+        except NotModified:
+            LOGGER.info("Sync completed: source data did not change")
+            return []
+
+        delta, new_users = _plan(cache, source_users, _rules(rules, email_regex), complete)
+
+        try:
+            registered_users = await meetingtool.async_register_users(
+                meetingtool_hostname,
+                meetingtool_token,
+                new_users,
+                client=client,
+                semaphore=semaphore,
+                **(meetingtool_settings or {}),
+            )
+        except meetingtool.RegistrationFailed as error:
+            _salvage(cache, source_settings, error)
+            raise
+
+        _commit(cache, source_settings, delta, new_users, registered_users)
+
+    LOGGER.info("Sync completed")
+
+    return registered_users
+
+
+def push(
+    meetingtool_hostname: str,
+    meetingtool_token: str,
+    users: list[User],
+    cache_filename: Optional[os.PathLike] = False,
+    email_regex: str = False,
+    cache_settings: Optional[dict] = None,
+    meetingtool_settings: Optional[dict] = None,
+    client: Optional[HTTPClient] = None,
+    rules: Optional[Rules] = None,
+) -> list[User]:
+    """
+    Registers the users pushed by a data source (e.g. by a webhook), if they are new or
+    changed. Unlike sync(), users are a subset of the data source ones, hence removed users
+    are not looked for.
+
+    Arguments:
+    ----------
+    meetingtool_hostname: str
+        Meetingtool instance hostname
+    meetingtool_token: str
+        Meetingtool API token
+    users: list[User]
+        Users pushed by the data source
+    cache_filename: Optional[os.PathLike]
+        File name and path to the local cache. False means cache.db
+        Default: False
+    email_regex: str
+        Regex. If not false, email addresses not matching with it are discarded
+        Default False
+    cache_settings: Optional[dict]
+        Dictionary with extra arguments for the local cache (e.g. backend, wal)
+        Default: None
+    meetingtool_settings: Optional[dict]
+        Dictionary with extra arguments for the meetingtool import
+        (e.g. batch_size, rate_limit, max_inflight)
+        Default: None
+    client: Optional[HTTPClient]
+        HTTP client. None means the process wide default client
+        Default: None
+    rules: Optional[Rules]
+        Rules the users are rewritten and filtered by. email_regex can be part of them
+        Default: None
+
+    Returns:
+    --------
+    list[User]: List of newly registered or updated users
+    """
+    with open_cache(cache_filename, **(cache_settings or {})) as cache:
+        delta, new_users = _plan(cache, users, _rules(rules, email_regex), removed=False)
+
+        try:
+            registered_users = meetingtool.register_users(
+                meetingtool_hostname,
+                meetingtool_token,
+                new_users,
+                client=client,
+                **(meetingtool_settings or {}),
+            )
+        except meetingtool.RegistrationFailed as error:
+            _salvage(cache, {}, error)
+            raise
+
+        _commit(cache, {}, delta, new_users, registered_users)
+
+    return registered_users
+
+
+def maintain(
+    cache_filename: Optional[os.PathLike] = False,
+    ttls: Optional[Mapping[str, Optional[int]]] = None,
+    cache_settings: Optional[dict] = None,
+    purge_limit: int = PURGE_LIMIT,
+    vacuum_pages: Optional[int] = 1000,
+) -> int:
+    """
+    Runs the maintenance of the local cache: purges the expired entries and returns the free
+    space to the file system. Both steps are bounded, so that running them between syncs does
+    not hold the database for long.
+
+    Arguments:
+    ----------
+    cache_filename: Optional[os.PathLike]
+        File name and path to the local cache. False means cache.db
+        Default: False
+    ttls: Optional[Mapping[str, Optional[int]]]
+        Namespace to seconds after which users that have not been written are purged. None
+        disables purging
+        Default: None
+    cache_settings: Optional[dict]
+        Dictionary with extra arguments for the local cache (e.g. backend, wal)
+        Default: None
+    purge_limit: int
+        Maximum number of users purged per run. Default: PURGE_LIMIT
+    vacuum_pages: Optional[int]
+        Maximum number of free pages returned to the file system per run. None means all
+        Default: 1000
+
+    Returns:
+    --------
+    int: Number of purged users
+    """
+    purged = 0
+    for namespace, ttl in (ttls or {}).items():
+        if ttl:
+            with open_cache(
+                cache_filename, **dict(cache_settings or {}, namespace=namespace)
+            ) as cache:
+                purged += cache.purge(ttl, purge_limit)
+
+    with open_cache(cache_filename, **(cache_settings or {})) as cache:
+        cache.compact(vacuum_pages)
+
+    if purged:
+        LOGGER.info("Purged %d expired users", purged)
+
+    return purged
+
+
+def _rules(rules: Optional[Rules], email_regex: str) -> Rules:
+    """
+    Returns the rules to apply, made of either rules or email_regex
+
+    Arguments:
+    ----------
+    rules: Optional[Rules]
+        Rules
+    email_regex: str
+        Regex. If not false, email addresses not matching with it are discarded
+
+    Returns:
+    --------
+    Rules: The rules
+    """
+    if rules is not None and email_regex:
+        raise ValueError("Either rules or email_regex can be set, add email_regex to the rules")
+
+    return rules if rules is not None else Rules(email_regex=email_regex or None)
+
+
+def _plan(
+    cache: BaseCache, source_users: list[User], rules: Rules, removed: bool = True
+) -> tuple[Diff, list[User]]:
+    """
+    Compares the users of the data source with the cache
+
+    Arguments:
+    ----------
+    cache: BaseCache
+        The cache
+    source_users: list[User]
+        Users listed by the data source
+    rules: Rules
+        Rules the users are rewritten and filtered by before being compared
+    removed: bool
+        If False, removed users are not looked for. Default: True
+
+    Returns:
+    --------
+    tuple[Diff, list[User]]: The diff and the users that shall be registered
+    """
+    delta = diff(cache, rules.filter(source_users), removed=False)
+    if removed:
+        # Users discarded by the rules are still listed by the data source
+        delta.removed.extend(removed_keys(cache, {user.email for user in source_users}))
+    _report(delta)
+
+    new_users = delta.added + delta.changed
+
+    LOGGER.debug("Users to register: %s", new_users)
+
+    return delta, new_users
+
+
+def _report(delta: Diff) -> None:
+    """
+    Logs the outcome of the comparison with the cache
+
+    Arguments:
+    ----------
+    delta: Diff
+        The diff
+    """
+    LOGGER.info(
+        "Found %d new, %d changed, %d unchanged and %d removed users",
+        len(delta.added),
+        len(delta.changed),
+        len(delta.unchanged),
+        len(delta.removed),
+    )
+    LOGGER.debug("Removed users: %s", delta.removed)
+
+
+def _commit(
+    cache: BaseCache,
+    source_settings: dict,
+    delta: Diff,
+    new_users: list[User],
+    registered_users: list[User],
+) -> None:
+    """
+    Stores the outcome of the registration into the cache
+
+    Arguments:
+    ----------
+    cache: BaseCache
+        The cache
+    source_settings: dict
+        Dictionary with source specific settings
+    delta: Diff
+        The diff
+    new_users: list[User]
+        Users that were meant to be registered
+    registered_users: list[User]
+        Users that have been registered
+    """
+    if len(registered_users) != len(new_users):
+        _retry_later(cache, source_settings)
+
+    cache.update((user.email, user.to_json()) for user in registered_users + delta.stale)
+    # Users still listed by the source do not expire
+    cache.touch(user.email for user in delta.unchanged)
+
+
+def _retry_later(cache: BaseCache, source_settings: dict) -> None:
+    """
+    Makes sure that the next sync fetches the data again and retries
+
+    Arguments:
+    ----------
+    cache: BaseCache
+        The cache
+    source_settings: dict
+        Dictionary with source specific settings
+    """
+    if "url" in source_settings:
+        cache.set_meta(validators_key(source_settings["url"]), None)
+    if "event" in source_settings:
+        cache.set_meta(eventbrite.watermark_key(source_settings["event"]), None)
+
+
+def _salvage(
+    cache: BaseCache, source_settings: dict, error: meetingtool.RegistrationFailed
+) -> None:
+    """
+    Stores the users registered before meetingtool failed, which the failure rolls back
+    otherwise, so that the next sync does not import them again
+
+    Arguments:
+    ----------
+    cache: BaseCache
+        The cache
+    source_settings: dict
+        Dictionary with source specific settings
+    error: meetingtool.RegistrationFailed
+        The failure
+    """
+    LOGGER.error("Import failed, caching the %d users registered so far", len(error.registered))
+    _retry_later(cache, source_settings)
+    cache.update((user.email, user.to_json()) for user in error.registered)
+    cache.save()
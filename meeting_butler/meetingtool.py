@@ -2,20 +2,316 @@
 Methods to interact with NIX.CZ's meetingtool
 """
 
+import asyncio
 import json
 import logging
-from time import sleep
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Union
 
-import requests
+from requests.exceptions import JSONDecodeError
 
+from meeting_butler.httpclient import HTTPClient, default_client, to_thread
+from meeting_butler.ratelimit import TokenBucket
 from meeting_butler.user import User
 
 LOGGER = logging.getLogger(__name__)
 
+# Statuses meaning that meetingtool rejected the content of the batch, rather than failed
+REJECTED_STATUSES = (400, 422)
 
-def register_users(hostname: str, token: str, users: list[User]) -> None:
+
+class _Aborted(RuntimeError):
+    """
+    Raised by the batches skipped because another one failed
+    """
+
+
+class RegistrationFailed(RuntimeError):
+    """
+    Raised when meetingtool fails, rather than rejects some records. Batches imported before
+    the failure stay imported, hence they are listed, so that they can be cached anyway.
+
+    Arguments:
+    ----------
+    message: str
+        Error message
+    registered: list[User]
+        Users that have been successfully registered nonetheless
+    """
+
+    def __init__(self, message: str, registered: list[User]) -> None:
+        super().__init__(message)
+        self.registered = registered
+
+
+def _collect(outcomes: list[Union[list[User], BaseException]]) -> list[User]:
+    """
+    Returns the users registered by the batches, in submission order
+
+    Arguments:
+    ----------
+    outcomes: list[Union[list[User], BaseException]]
+        Registered users or exception of each batch
+
+    Returns:
+    --------
+    list[User]: Users that have been successfully registered
+
+    Raises:
+    -------
+    RegistrationFailed: if any batch failed, carrying the users registered by the others
+    """
+    registered = []
+    errors = []
+    for outcome in outcomes:
+        if isinstance(outcome, RegistrationFailed):
+            registered += outcome.registered
+        if isinstance(outcome, BaseException):
+            errors.append(outcome)
+        else:
+            registered += outcome
+
+    # Batches aborted because of a failure are not the cause of it
+    error = next((error for error in errors if not isinstance(error, _Aborted)), None)
+    error = error or next(iter(errors), None)
+
+    if error is not None:
+        raise RegistrationFailed(str(error), registered) from error
+
+    return registered
+
+
+def _serialize(user: User) -> dict:
+    """
+    Converts user to the record format expected by meetingtool
+
+    Arguments:
+    ----------
+    user: User
+        The user
+
+    Returns:
+    --------
+    dict: meetingtool registration record
+    """
+    return {
+        "firstName": user.name,
+        "lastName": user.surname,
+        "company": user.company,
+        # Email address has to be lowercase
+        "mail": user.email.lower(),
+        "jobTitle": user.title,
+        "asn": user.asn,
+        "countryCode": user.country,
+        "companyCountryCode": user.country,
+    }
+
+
+def _import(
+    client: HTTPClient,
+    url: str,
+    headers: dict,
+    users: list[User],
+    bucket: Optional[TokenBucket],
+) -> list[User]:
+    """
+    Imports users in a single request. If meetingtool rejects the content of the batch, the
+    batch is split in half and each half is imported on its own, until the offending records
+    are isolated. Any other failure (e.g. meetingtool being down) is raised right away.
+
+    Arguments:
+    ----------
+    client: HTTPClient
+        HTTP client
+    url: str
+        Import API endpoint
+    headers: dict
+        HTTP headers
+    users: list[Users]
+        List of users that shall be registered
+    bucket: Optional[TokenBucket]
+        Rate limiter every request has to be granted by. None means no limit
+
+    Returns:
+    --------
+    list[User]: Users that have been successfully registered
+
+    Raises:
+    -------
+    RegistrationFailed: if meetingtool failed for any other reason than the content of the
+        batch
+    """
+    data = [_serialize(user) for user in users]
+
+    if bucket:
+        bucket.acquire()
+
+    LOGGER.debug("Importing the following users: %s", data)
+    response = client.post(url, data=json.dumps(data), headers=headers)
+
+    status = response.status_code
+    if status == 200:
+        return users
+
+    try:
+        error = response.json()
+    except JSONDecodeError:
+        error = response.text
+
+    if status not in REJECTED_STATUSES:
+        raise RegistrationFailed(f"Unable to save users: Status: {status}. Error: {error}", [])
+
+    if len(users) == 1:
+        LOGGER.error("Unable to save user %s: Status: %d. Error: %s", users[0], status, error)
+        return []
+
+    LOGGER.debug("Batch of %d users rejected. Splitting it", len(users))
+    half = len(users) // 2
+    registered = _import(client, url, headers, users[:half], bucket)
+    try:
+        return registered + _import(client, url, headers, users[half:], bucket)
+    except RegistrationFailed as failure:
+        failure.registered = registered + failure.registered
+        raise
+
+
+def _import_batch(failed: threading.Event, *args) -> list[User]:
+    """
+    Imports a batch, see _import(), unless another batch failed already. Failures are
+    recorded into failed, so that the remaining batches are not sent to a failing meetingtool
+    """
+    if failed.is_set():
+        raise _Aborted("Import aborted: a previous batch failed")
+    try:
+        return _import(*args)
+    except Exception:
+        failed.set()
+        raise
+
+
+class Importer:
+    """
+    Imports users into meetingtool in the background.
+    Batches are imported concurrently by a pool of at most `max_inflight` threads, while the
+    overall request rate is capped by a token bucket. At most `max_inflight` further batches
+    can be waiting for a thread: submit() blocks when that limit is reached.
+
+    Arguments:
+    ----------
+    hostname: str
+        Instance hostname
+    token: str
+        API auth token
+    batch_size: int
+        Maximum number of users imported per request. Default: 50
+    rate_limit: Optional[float]
+        Maximum number of requests per second. None means no limit. Default: 10
+    max_inflight: int
+        Maximum number of concurrent requests. Default: 4
+    client: Optional[HTTPClient]
+        HTTP client. None means the process wide default client
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        token: str,
+        batch_size: int = 50,
+        rate_limit: Optional[float] = 10,
+        max_inflight: int = 4,
+        client: Optional[HTTPClient] = None,
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError(f"Batch size must be positive, not {batch_size}")
+        if max_inflight < 1:
+            raise ValueError(f"Max in-flight requests must be positive, not {max_inflight}")
+
+        self.url = f"https://{hostname}/api/registrations/import/"
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.batch_size = batch_size
+        self.client = client or default_client()
+        self._bucket = TokenBucket(rate_limit) if rate_limit else None
+        self._executor = ThreadPoolExecutor(max_workers=max_inflight)
+        self._slots = threading.BoundedSemaphore(2 * max_inflight)
+        self._futures: list[Future] = []
+        self._failed = threading.Event()
+        self._submitted = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs) -> None:
+        self.close()
+
+    def _run(self, batch: list[User]) -> list[User]:
+        try:
+            return _import_batch(
+                self._failed, self.client, self.url, self.headers, batch, self._bucket
+            )
+        finally:
+            self._slots.release()
+
+    def submit(self, users: list[User]) -> None:
+        """
+        Queues users for import
+
+        Arguments:
+        ----------
+        users: list[Users]
+            List of users that shall be registered
+        """
+        for start in range(0, len(users), self.batch_size):
+            batch = users[start : start + self.batch_size]
+            self._slots.acquire()
+            self._futures.append(self._executor.submit(self._run, batch))
+            self._submitted += len(batch)
+
+    def results(self) -> list[User]:
+        """
+        Waits for all of the queued users to be imported
+
+        Returns:
+        --------
+        list[User]: Users that have been successfully registered, in submission order
+
+        Raises:
+        -------
+        RegistrationFailed: if any batch failed, carrying the users registered by the others
+        """
+        outcomes: list[Union[list[User], BaseException]] = []
+        for future in self._futures:
+            try:
+                outcomes.append(future.result())
+            except Exception as error:  # pylint: disable=broad-except
+                outcomes.append(error)
+        registered = _collect(outcomes)
+
+        if len(registered) != self._submitted:
+            LOGGER.error("Unable to import %d users", self._submitted - len(registered))
+
+        return registered
+
+    def close(self) -> None:
+        """
+        Stops the import, dropping the batches that did not start yet
+        """
+        for future in self._futures:
+            future.cancel()
+        self._executor.shutdown()
+
+
+def register_users(
+    hostname: str,
+    token: str,
+    users: list[User],
+    batch_size: int = 50,
+    rate_limit: Optional[float] = 10,
+    max_inflight: int = 4,
+    client: Optional[HTTPClient] = None,
+) -> list[User]:
     """
-    Register users on meetingtool
+    Register users on meetingtool. See Importer
 
     Arguments:
     ----------
@@ -25,33 +321,98 @@ def register_users(hostname: str, token: str, users: list[User]) -> None:
         API auth token
     users: list[Users]
         List of users that shall be registered
+    batch_size: int
+        Maximum number of users imported per request. Default: 50
+    rate_limit: Optional[float]
+        Maximum number of requests per second. None means no limit. Default: 10
+    max_inflight: int
+        Maximum number of concurrent requests. Default: 4
+    client: Optional[HTTPClient]
+        HTTP client. None means the process wide default client
+
+    Returns:
+    --------
+    list[User]: Users that have been successfully registered
+
+    Raises:
+    -------
+    RegistrationFailed: if meetingtool failed, carrying the users registered nonetheless
+    """
+    with Importer(hostname, token, batch_size, rate_limit, max_inflight, client) as importer:
+        LOGGER.info("Importing: %d users", len(users))
+        importer.submit(users)
+        return importer.results()
+
+
+async def async_register_users(
+    hostname: str,
+    token: str,
+    users: list[User],
+    batch_size: int = 50,
+    rate_limit: Optional[float] = 10,
+    max_inflight: int = 4,
+    client: Optional[HTTPClient] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> list[User]:
+    """
+    Asynchronous variant of register_users()
+
+    Arguments:
+    ----------
+    hostname: str
+        Instance hostname
+    token: str
+        API auth token
+    users: list[Users]
+        List of users that shall be registered
+    batch_size: int
+        Maximum number of users imported per request. Default: 50
+    rate_limit: Optional[float]
+        Maximum number of requests per second. None means no limit. Default: 10
+    max_inflight: int
+        Maximum number of concurrent batches. Default: 4
+    client: Optional[HTTPClient]
+        HTTP client. None means the process wide default client
+    semaphore: Optional[asyncio.Semaphore]
+        Additional semaphore every batch has to acquire, e.g. shared with other tasks
+
+    Returns:
+    --------
+    list[User]: Users that have been successfully registered
+
+    Raises:
+    -------
+    RegistrationFailed: if meetingtool failed, carrying the users registered nonetheless
     """
     url = f"https://{hostname}/api/registrations/import/"
     headers = {"Authorization": f"Bearer {token}"}
 
+    if batch_size < 1:
+        raise ValueError(f"Batch size must be positive, not {batch_size}")
+    if max_inflight < 1:
+        raise ValueError(f"Max in-flight requests must be positive, not {max_inflight}")
+
+    client = client or default_client()
+    bucket = TokenBucket(rate_limit) if rate_limit else None
+    batches = [users[start : start + batch_size] for start in range(0, len(users), batch_size)]
+    semaphores = [asyncio.Semaphore(max_inflight)] + ([semaphore] if semaphore else [])
+    failed = threading.Event()
+
     LOGGER.info("Importing: %d users", len(users))
 
-    for user in users:
-        data = [
-            {
-                "firstName": user["name"],
-                "lastName": user["surname"],
-                "company": user["company"],
-                # Email address has to be lowercase
-                "mail": user["email"].lower(),
-                "jobTitle": user["title"],
-                "asn": user["asn"],
-                "countryCode": user["country"],
-                "companyCountryCode": user["country"],
-            }
-        ]
-
-        LOGGER.debug("Importing the following users: %s", data)
-        response = requests.post(url, data=json.dumps(data), headers=headers, timeout=30)
-
-        status = response.status_code
-        if status != 200:
-            error = response.json()
-            raise RuntimeError(f"Unable to save user: Status: {status}. Error: {error}")
-
-        sleep(0.1)
+    # gather() returns the results in submission order, so that the outcome is deterministic
+    outcomes = await asyncio.gather(
+        *(
+            to_thread(
+                _import_batch, failed, client, url, headers, batch, bucket, semaphores=semaphores
+            )
+            for batch in batches
+        ),
+        return_exceptions=True,
+    )
+    registered = _collect(outcomes)
+
+    if len(registered) != len(users):
+        LOGGER.error("Unable to import %d users", len(users) - len(registered))
+
+    return registered
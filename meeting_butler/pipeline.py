@@ -0,0 +1,193 @@
+"""
+Streaming sync pipeline: fetch -> normalize/dedupe -> cache check -> register.
+Stages run concurrently and are joined by bounded queues, so that the first users are
+registered while the data source is still being downloaded.
+"""
+
+import logging
+import queue
+import threading
+from typing import Any, Iterable, Iterator, Optional
+
+from meeting_butler.cache import BaseCache
+from meeting_butler.diff import Diff, diff, removed_keys
+from meeting_butler.meetingtool import Importer
+from meeting_butler.rules import Rules
+from meeting_butler.user import User, UserSet
+
+LOGGER = logging.getLogger(__name__)
+
+# Marks the end of a stream
+_DONE = object()
+# How often (seconds) blocked stages check whether the pipeline is being torn down
+_POLL_INTERVAL = 0.1
+
+
+class _Failure:
+    """
+    Carries an exception raised by a stage to the next one
+    """
+
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+def _put(output: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    """
+    Puts item into the output queue, waiting for room unless the pipeline is being stopped.
+    Returns False if the item has been dropped.
+    """
+    while not stop.is_set():
+        try:
+            output.put(item, timeout=_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _pump(items: Iterable, output: queue.Queue, stop: threading.Event) -> None:
+    """
+    Thread body: moves items into the output queue, followed by the end of stream marker
+    """
+    try:
+        for item in items:
+            if not _put(output, item, stop):
+                return
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        _put(output, _Failure(error), stop)
+        return
+    _put(output, _DONE, stop)
+
+
+def _drain(source: queue.Queue, stop: threading.Event) -> Iterator:
+    """
+    Yields the items of the source queue, up to the end of stream marker or until the
+    pipeline is being stopped. Exceptions raised by the previous stage are raised again.
+    """
+    while not stop.is_set():
+        try:
+            item = source.get(timeout=_POLL_INTERVAL)
+        except queue.Empty:
+            continue
+        if item is _DONE:
+            return
+        if isinstance(item, _Failure):
+            raise item.error
+        yield item
+
+
+def _chunks(source: queue.Queue, size: int, stop: threading.Event) -> Iterator[list]:
+    """
+    Yields lists of up to size items from the source queue. A shorter list is yielded as
+    soon as the queue is empty, rather than waiting for more items to arrive.
+    """
+    items = _drain(source, stop)
+    for item in items:
+        chunk = [item]
+        while len(chunk) < size and not source.empty():
+            try:
+                chunk.append(next(items))
+            except StopIteration:
+                break
+        yield chunk
+
+
+class Pipeline:
+    """
+    Runs the users of a data source through the cache check and registers the new or
+    changed ones.
+
+    Arguments:
+    ----------
+    cache: BaseCache
+        The cache
+    importer: Importer
+        meetingtool importer
+    rules: Optional[Rules]
+        Rules the users are rewritten and filtered by before the cache check. None means
+        no rules
+    queue_size: int
+        Capacity of the queues between stages. Default: 1000
+    """
+
+    def __init__(
+        self,
+        cache: BaseCache,
+        importer: Importer,
+        rules: Optional[Rules] = None,
+        queue_size: int = 1000,
+    ) -> None:
+        if queue_size < 1:
+            raise ValueError(f"Queue size must be positive, not {queue_size}")
+
+        self.cache = cache
+        self.importer = importer
+        self.rules = rules or Rules()
+        self.queue_size = queue_size
+
+    def run(
+        self, source: Iterable[User], removed: bool = True
+    ) -> tuple[Diff, list[User], list[User]]:
+        """
+        Runs the pipeline
+
+        Arguments:
+        ----------
+        source: Iterable[User]
+            Users listed by the data source. It is consumed in a separate thread
+        removed: bool
+            If False, e.g. because source only lists part of the users, removed users are not
+            looked for. Default: True
+
+        Returns:
+        --------
+        tuple[Diff, list[User], list[User]]: The diff, the users that were meant to be
+            registered and the ones that have been registered
+        """
+        fetched = queue.Queue(maxsize=self.queue_size)
+        unique = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        seen = set()
+
+        def dedupe(users: Iterable[User]) -> Iterator[User]:
+            known = UserSet()
+            for user in users:
+                if known.add(user):
+                    seen.add(user.email)
+                    yield user
+
+        threads = [
+            threading.Thread(target=_pump, args=(source, fetched, stop), daemon=True),
+            threading.Thread(
+                target=_pump, args=(dedupe(_drain(fetched, stop)), unique, stop), daemon=True
+            ),
+        ]
+        for thread in threads:
+            thread.start()
+
+        delta = Diff([], [], [], [], [])
+        new_users = []
+        try:
+            for chunk in _chunks(unique, self.importer.batch_size, stop):
+                # Rewrites come first, so that users are compared as they are registered
+                result = diff(self.cache, self.rules.filter(chunk), removed=False)
+                for total, partial in zip(delta, result):
+                    total.extend(partial)
+
+                users = result.added + result.changed
+
+                LOGGER.debug("Users to register: %s", users)
+                self.importer.submit(users)
+                new_users += users
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        if removed:
+            delta.removed.extend(removed_keys(self.cache, seen))
+
+        return delta, new_users, self.importer.results()
@@ -2,72 +2,256 @@
 List of methods to interact with the Pretino API
 """
 
+# pylint: disable=too-few-public-methods, no-self-argument
+
+import asyncio
 import logging
+from typing import Any, Iterator, Optional
 
 import requests
-from pydantic import TypeAdapter
-from requests.exceptions import JSONDecodeError
+from pydantic import (
+    BaseModel,
+    TypeAdapter,
+    ValidationError,
+    field_validator,
+    model_validator,
+)
 
-from meeting_butler.user import User
+from meeting_butler.cache import BaseCache
+from meeting_butler.httpclient import (
+    HTTPClient,
+    conditional_headers,
+    default_client,
+    to_thread,
+    update_validators,
+)
+from meeting_butler.user import User, UserSet
 
 LOGGER = logging.getLogger(__name__)
 
 
-def get_registered_users(url: str, api_key: str) -> list[User]:
+class Attendee(BaseModel):
+    """
+    Pretino attendee. Normalizes the data as expected by meetingtool while validating it.
+    """
+
+    name: str
+    surname: str
+    company: str
+    job_title: str
+    email: str
+    # There might be attendees without an ASN
+    asn: Optional[int]
+
+    @field_validator("name", "surname", "company", "job_title", "email")
+    def _upper(cls, value: str) -> str:
+        return value.upper()
+
+    @field_validator("asn", mode="before")
+    def _asn(cls, value: Any) -> Optional[int]:
+        if not isinstance(value, str):
+            return value
+        # Remove first "AS"
+        if value.upper().startswith("AS"):
+            value = value[2:]
+        try:
+            return int(value)
+        except ValueError:
+            return None
+
+    @model_validator(mode="after")
+    def _company(self) -> "Attendee":
+        if not self.company:
+            # Empty company name
+            self.company = f"{self.name} {self.surname}"
+        return self
+
+    def to_user(self) -> User:
+        """
+        Returns the attendee as a user
+
+        Returns:
+        --------
+        User: The user
+        """
+        return User(
+            name=self.name,
+            surname=self.surname,
+            company=self.company,
+            email=self.email,
+            title=self.job_title,
+            asn=self.asn,
+            country="IT",
+        )
+
+
+# Compiled once. Records are validated one by one, so that a malformed record does not
+# invalidate the whole document
+DOCUMENT = TypeAdapter(list[dict])
+
+
+def iter_registered_users(
+    url: str,
+    api_key: str,
+    client: Optional[HTTPClient] = None,
+    cache: Optional[BaseCache] = None,
+    errors: Optional[list[ValidationError]] = None,
+) -> Iterator[User]:
+    """
+    Yields registered users on Pretino. Users are not deduplicated.
+
+    Arguments:
+    ----------
+    - url: str
+      Pretino orders API URL
+    - api_key: str
+      Pretino API key
+    - client: Optional[HTTPClient]
+      HTTP client. None means the process wide default client
+    - cache: Optional[BaseCache]
+      Cache the HTTP validators are kept into. None disables conditional requests
+    - errors: Optional[list[ValidationError]]
+      If not None, the validation errors of the malformed records are appended to it
+
+    Yields:
+    -------
+    User: Registered user
+
+    Raises:
+    -------
+    NotModified: if the data did not change since the previous request
+    """
+    LOGGER.debug("Fetching data for Pretino. URL: %s", url)
+    request = (client or default_client()).conditional_get(
+        url, cache, headers={"x-pretino-key": api_key}
+    )
+
+    yield from _parse(request, errors)
+
+
+def get_registered_users(
+    url: str,
+    api_key: str,
+    client: Optional[HTTPClient] = None,
+    cache: Optional[BaseCache] = None,
+    errors: Optional[list[ValidationError]] = None,
+) -> list[User]:
     """
-    Retrieve a deuplicated list of registered users on Eventbrite.
+    Retrieve a deuplicated list of registered users on Pretino.
 
     Arguments:
     ----------
     - url: str
-      URL pointing to the Google doc share as CSV
+      Pretino orders API URL
+    - api_key: str
+      Pretino API key
+    - client: Optional[HTTPClient]
+      HTTP client. None means the process wide default client
+    - cache: Optional[BaseCache]
+      Cache the HTTP validators are kept into. None disables conditional requests
+    - errors: Optional[list[ValidationError]]
+      If not None, the validation errors of the malformed records are appended to it
 
     Returns:
     --------
     list[User]: Registered user
+
+    Raises:
+    -------
+    NotModified: if the data did not change since the previous request
     """
-    users = []
-    LOGGER.debug("Fetching data for Pretino. URL: %s", url)
-    request = requests.get(url, timeout=30, headers={"x-pretino-key": api_key})
+    return UserSet(iter_registered_users(url, api_key, client, cache, errors)).to_list()
 
+
+def _parse(
+    request: requests.Response, errors: Optional[list[ValidationError]] = None
+) -> Iterator[User]:
+    """
+    Yields the users listed by the response
+
+    Arguments:
+    ----------
+    - request: requests.Response
+      Response
+    - errors: Optional[list[ValidationError]]
+      If not None, the validation errors of the malformed records are appended to it
+
+    Yields:
+    -------
+    User: Registered user
+    """
     assert request.status_code == 200, f"Erroneous HTTP status code: {request.status_code}"
 
     try:
-        attendees = request.json()
         # Check that response is a list of dictionaries
-        validator = TypeAdapter(list[dict])
-        validator.validate_python(request.json())
-    except (KeyError, JSONDecodeError) as error:
+        attendees = DOCUMENT.validate_json(request.content)
+    except ValidationError as error:
         raise ValueError(f"Malformed body: f{request.text}") from error
 
+    malformed = 0
     for attendee in attendees:
         try:
-            user = {
-                "name": attendee["name"].upper(),
-                "surname": attendee["surname"].upper(),
-                "company": attendee["company"].upper(),
-                "title": attendee["job_title"].upper(),
-                "email": attendee["email"].upper(),
-                "country": "IT",
-            }
-
-            if not user["company"]:
-                # Empty company name
-                user["company"] = f'{user["name"]} {user["surname"]}'
-
-            asn = attendee["asn"]
-            # Remove first "AS"
-            if asn.upper().startswith("AS"):
-                asn = asn[2:]
-            try:
-                user["asn"] = int(asn)
-            except ValueError:
-                user["asn"] = None
-        except (TypeError, KeyError):
-            logging.error("Malformatted row: %s", attendee)
+            user = Attendee.model_validate(attendee).to_user()
+        except ValidationError as error:
+            malformed += 1
+            LOGGER.debug("Malformatted row: %s. Error: %s", attendee, error)
+            if errors is not None:
+                errors.append(error)
             continue
 
-        if user not in users:
-            users.append(user)
+        yield user
+
+    if malformed:
+        LOGGER.warning("Discarded %d malformed records out of %d", malformed, len(attendees))
+
+
+async def async_get_registered_users(
+    url: str,
+    api_key: str,
+    client: Optional[HTTPClient] = None,
+    cache: Optional[BaseCache] = None,
+    errors: Optional[list[ValidationError]] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> list[User]:
+    """
+    Asynchronous variant of get_registered_users().
+    The download and the parsing are run in a worker thread, while the cache is only
+    accessed from the event loop thread.
+
+    Arguments:
+    ----------
+    - url: str
+      Pretino orders API URL
+    - api_key: str
+      Pretino API key
+    - client: Optional[HTTPClient]
+      HTTP client. None means the process wide default client
+    - cache: Optional[BaseCache]
+      Cache the HTTP validators are kept into. None disables conditional requests
+    - errors: Optional[list[ValidationError]]
+      If not None, the validation errors of the malformed records are appended to it
+    - semaphore: Optional[asyncio.Semaphore]
+      Semaphore the request has to acquire, e.g. shared with other tasks
+
+    Returns:
+    --------
+    list[User]: Registered user
+
+    Raises:
+    -------
+    NotModified: if the data did not change since the previous request
+    """
+    client = client or default_client()
+    headers = {"x-pretino-key": api_key}
+    if cache is not None:
+        headers.update(conditional_headers(url, cache))
+
+    LOGGER.debug("Fetching data for Pretino. URL: %s", url)
+    request = await to_thread(
+        client.get, url, headers=headers, semaphores=[semaphore] if semaphore else []
+    )
+
+    if cache is not None:
+        update_validators(url, cache, request)
 
-    return users
+    return await to_thread(lambda: UserSet(_parse(request, errors)).to_list())
@@ -0,0 +1,54 @@
+"""
+Rate limiting primitives
+"""
+
+import threading
+from time import monotonic, sleep
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket rate limiter.
+
+    Arguments:
+    ----------
+    rate: float
+        Tokens added to the bucket per second
+    capacity: Optional[float]
+        Maximum number of tokens the bucket can hold, that is the allowed burst.
+        Default: same as rate, but at least 1
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive, not {rate}")
+
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self._tokens = self.capacity
+        self._timestamp = monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """
+        Takes tokens from the bucket, blocking until they are available
+
+        Arguments:
+        ----------
+        tokens: float
+            Number of tokens to take. Default: 1
+        """
+        while True:
+            with self._lock:
+                now = monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._timestamp) * self.rate
+                )
+                self._timestamp = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+
+            sleep(wait)
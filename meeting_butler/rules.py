@@ -0,0 +1,185 @@
+"""
+Rules deciding which users are registered, and how their data is rewritten beforehand
+"""
+
+import logging
+import re
+from bisect import bisect_right
+from typing import Iterable, Optional, Union
+
+from meeting_butler.user import User
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _parse_ranges(ranges: Iterable[Union[int, str]]) -> tuple[list[int], list[int]]:
+    """
+    Parses and merges ASN ranges
+
+    Arguments:
+    ----------
+    ranges: Iterable[Union[int, str]]
+        Single ASNs or ranges like "64496-64511". The "AS" prefix is optional
+
+    Returns:
+    --------
+    tuple[list[int], list[int]]: Sorted starts and ends of the merged ranges
+    """
+    parsed = []
+    for item in ranges:
+        first, _, last = str(item).upper().replace("AS", "").partition("-")
+        try:
+            start = int(first)
+            end = int(last) if last else start
+        except ValueError as error:
+            raise ValueError(f"Invalid ASN range: {item}") from error
+        if start > end:
+            raise ValueError(f"Invalid ASN range: {item}")
+        parsed.append((start, end))
+
+    starts: list[int] = []
+    ends: list[int] = []
+    for start, end in sorted(parsed):
+        if ends and start <= ends[-1] + 1:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+
+    return starts, ends
+
+
+class Rules:
+    """
+    Compiled selection and rewrite rules. Everything is compiled once, so that each user is
+    evaluated by a handful of set and dictionary lookups. Rewrites are applied first, then the
+    user has to pass every configured filter. All of the comparisons are case insensitive.
+
+    Arguments:
+    ----------
+    allowed_domains: Iterable[str]
+        If not empty, only email addresses within these domains, or their subdomains, pass
+    denied_domains: Iterable[str]
+        Email addresses within these domains, or their subdomains, do not pass
+    allowed_asns: Iterable[Union[int, str]]
+        If not empty, only users whose ASN is within these ASNs or ranges (e.g.
+        "64496-64511") pass. Users without an ASN do not
+    blocked_companies: Iterable[str]
+        Users of these companies do not pass
+    rewrites: Optional[dict[str, dict[str, str]]]
+        Values replaced field by field, e.g. {"company": {"ITNOG SRL": "ITNOG"}}. Email
+        addresses identify users, hence they cannot be rewritten
+    email_regex: Optional[str]
+        If set, only email addresses matching it pass
+    """
+
+    def __init__(
+        self,
+        allowed_domains: Iterable[str] = (),
+        denied_domains: Iterable[str] = (),
+        allowed_asns: Iterable[Union[int, str]] = (),
+        blocked_companies: Iterable[str] = (),
+        rewrites: Optional[dict[str, dict[str, str]]] = None,
+        email_regex: Optional[str] = None,
+    ) -> None:
+        self.allowed_domains = frozenset(domain.upper().strip(".") for domain in allowed_domains)
+        self.denied_domains = frozenset(domain.upper().strip(".") for domain in denied_domains)
+        self._asn_starts, self._asn_ends = _parse_ranges(allowed_asns)
+        self.blocked_companies = frozenset(company.upper() for company in blocked_companies)
+        self.rewrites = {}
+        for field, mapping in (rewrites or {}).items():
+            if field not in User._fields or field == "email":
+                raise ValueError(f"Field cannot be rewritten: {field}")
+            self.rewrites[field] = {
+                str(old).upper(): new.upper() if isinstance(new, str) else new
+                for old, new in mapping.items()
+            }
+        self.email_regex = re.compile(email_regex, re.IGNORECASE) if email_regex else None
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.allowed_domains
+            or self.denied_domains
+            or self._asn_starts
+            or self.blocked_companies
+            or self.rewrites
+            or self.email_regex
+        )
+
+    def _asn_allowed(self, asn: Optional[int]) -> bool:
+        if asn is None:
+            return False
+        index = bisect_right(self._asn_starts, asn) - 1
+        return index >= 0 and asn <= self._asn_ends[index]
+
+    def apply(self, user: User) -> Optional[User]:
+        """
+        Applies the rules to user
+
+        Arguments:
+        ----------
+        user: User
+            The user
+
+        Returns:
+        --------
+        Optional[User]: The rewritten user, None if it does not pass the filters
+        """
+        if self.rewrites:
+            changes = {}
+            for field, mapping in self.rewrites.items():
+                value = getattr(user, field)
+                key = value.upper() if isinstance(value, str) else str(value)
+                if key in mapping:
+                    changes[field] = mapping[key]
+            if changes:
+                user = user._replace(**changes)
+
+        if self.allowed_domains or self.denied_domains:
+            domain = user.email.rpartition("@")[2].upper()
+            # The domain and its parents, e.g. A.B.C, B.C and C
+            parents = [domain]
+            while "." in domain:
+                domain = domain.partition(".")[2]
+                parents.append(domain)
+            if self.denied_domains and not self.denied_domains.isdisjoint(parents):
+                return None
+            if self.allowed_domains and self.allowed_domains.isdisjoint(parents):
+                return None
+
+        if self._asn_starts and not self._asn_allowed(user.asn):
+            return None
+
+        if self.blocked_companies and user.company.upper() in self.blocked_companies:
+            return None
+
+        if self.email_regex and not self.email_regex.search(user.email):
+            return None
+
+        return user
+
+    def filter(self, users: Iterable[User]) -> list[User]:
+        """
+        Applies the rules to users
+
+        Arguments:
+        ----------
+        users: Iterable[User]
+            The users
+
+        Returns:
+        --------
+        list[User]: The rewritten users that pass the filters
+        """
+        if not self:
+            return list(users)
+
+        result = []
+        for user in users:
+            rewritten = self.apply(user)
+            if rewritten is not None:
+                result.append(rewritten)
+            else:
+                LOGGER.debug("Discarded by the rules: %s", user)
+
+        return result
@@ -0,0 +1,167 @@
+"""
+Runs several sync jobs concurrently, each one at its own interval
+"""
+
+import logging
+import random
+import threading
+from time import monotonic
+from typing import Any, Callable, NamedTuple, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Job(NamedTuple):
+    """
+    A periodic job
+
+    name: Job name, used for logging
+    interval: Seconds between two runs
+    run: Function to run. If it returns a sized object (e.g. the list of registered users),
+         its length is the activity the interval adapts to
+    min_interval: Shortest interval the job is sped up to when active. None means interval
+    max_interval: Longest interval the job is slowed down to when idle. None means interval
+    jitter: Maximum number of seconds randomly added to each run time
+    """
+
+    name: str
+    interval: float
+    run: Callable[[], Any]
+    min_interval: Optional[float] = None
+    max_interval: Optional[float] = None
+    jitter: float = 0
+
+
+def next_interval(job: Job, interval: float, activity: int) -> float:
+    """
+    Adapts the interval to the activity of the last run: the interval is halved when the
+    run found something to do, and doubled otherwise, within the job bounds
+
+    Arguments:
+    ----------
+    job: Job
+        The job
+    interval: float
+        Current interval
+    activity: int
+        Number of items (e.g. new users) processed by the last run
+
+    Returns:
+    --------
+    float: Next interval
+    """
+    lower = job.min_interval or job.interval
+    upper = job.max_interval or job.interval
+
+    interval = interval / 2 if activity else interval * 2
+    return min(max(interval, lower), upper)
+
+
+def next_deadline(deadline: float, interval: float, now: float) -> tuple[float, int]:
+    """
+    Returns the first deadline after now, on the grid of `interval` seconds starting at
+    deadline. Deadlines do not depend on how long the runs take, so the schedule does not
+    drift, and deadlines missed while a run was still going on are skipped.
+
+    Arguments:
+    ----------
+    deadline: float
+        Deadline of the last run
+    interval: float
+        Seconds between two runs
+    now: float
+        Current time
+
+    Returns:
+    --------
+    tuple[float, int]: Next deadline and number of skipped deadlines
+    """
+    deadline += interval
+    if deadline > now:
+        return deadline, 0
+
+    skipped = int((now - deadline) // interval) + 1
+    return deadline + skipped * interval, skipped
+
+
+class Scheduler:
+    """
+    Runs each job in its own thread, on a fixed grid of deadlines. A job raising an exception
+    is logged and run again at the next deadline, without affecting the other jobs.
+    The interval of a job adapts between its min_interval and max_interval to the activity
+    of the last runs (see next_interval()).
+
+    Arguments:
+    ----------
+    jobs: list[Job]
+        Jobs to run
+    """
+
+    def __init__(self, jobs: list[Job]) -> None:
+        if not jobs:
+            raise ValueError("No jobs to run")
+        names = [job.name for job in jobs]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicated job names: {names}")
+        for job in jobs:
+            lower = job.min_interval or job.interval
+            upper = job.max_interval or job.interval
+            if not 0 < lower <= job.interval <= upper:
+                raise ValueError(
+                    f"Job {job.name}: invalid intervals {lower}/{job.interval}/{upper}"
+                )
+            if job.jitter < 0:
+                raise ValueError(f"Job {job.name}: jitter must not be negative, not {job.jitter}")
+
+        self.jobs = jobs
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def _loop(self, job: Job) -> None:
+        interval = job.interval
+        deadline = monotonic()
+
+        while not self._stop.is_set():
+            LOGGER.debug("Running job: %s", job.name)
+            activity = 0
+            try:
+                result = job.run()
+                activity = len(result) if hasattr(result, "__len__") else 0
+            except Exception:  # pylint: disable=broad-exception-caught
+                LOGGER.exception("Job %s failed", job.name)
+
+            interval = next_interval(job, interval, activity)
+            deadline, skipped = next_deadline(deadline, interval, monotonic())
+            if skipped:
+                LOGGER.warning("Job %s overran, skipped %d runs", job.name, skipped)
+
+            # Jitter is not accumulated into the deadline, so it does not drift either
+            delay = deadline + random.uniform(0, job.jitter) - monotonic()
+            LOGGER.debug("Job %s: next run in %.1f seconds", job.name, delay)
+            self._stop.wait(max(delay, 0))
+
+    def start(self) -> None:
+        """
+        Starts the jobs
+        """
+        for job in self.jobs:
+            thread = threading.Thread(target=self._loop, args=(job,), name=job.name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        """
+        Stops the jobs, waiting for the running ones to complete
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads.clear()
+
+    def run(self) -> None:
+        """
+        Starts the jobs and blocks until stop() is called
+        """
+        self.start()
+        self._stop.wait()
+        self.stop()
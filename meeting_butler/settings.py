@@ -5,28 +5,100 @@ Methods to read user related settings
 # pylint: disable=too-few-public-methods, no-name-in-module
 
 import pathlib
-from typing import Literal, Optional
+from typing import Literal, Optional, Union
 
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class RulesSettings(BaseModel):
+    """
+    Defines the rules users are filtered and rewritten by. See meeting_butler.rules.Rules
+    """
+
+    allowed_domains: list[str] = []
+    denied_domains: list[str] = []
+    allowed_asns: list[Union[int, str]] = []
+    blocked_companies: list[str] = []
+    rewrites: dict[str, dict[str, Union[int, str]]] = {}
+
+
+class JobSettings(BaseModel):
+    """
+    Defines a sync job. Settings that are not set are inherited from the application wide
+    ones.
+    """
+
+    name: str
+    sync_every: Optional[int] = None
+    sync_min_interval: Optional[int] = None
+    sync_max_interval: Optional[int] = None
+    sync_jitter: Optional[float] = None
+    data_source: Literal["eventbrite", "formbuilder", "pretino"]
+    email_regex: Optional[str] = None
+    rules: Optional[RulesSettings] = None
+    cache_namespace: Optional[str] = None
+    cache_ttl: Optional[int] = None
+    meetingtool_hostname: Optional[str] = None
+    meetingtool_token: Optional[str] = None
+    eventbrite_event: Optional[str] = None
+    eventbrite_token: Optional[str] = None
+    eventbrite_parallelism: Optional[int] = None
+    eventbrite_full_resync_every: Optional[int] = None
+    formbuilder_url: Optional[str] = None
+    pretino_url: Optional[str] = None
+    pretino_token: Optional[str] = None
+
+
 class Settings(BaseSettings):
     """
     Defines application wide settings inherited from ENV.
     """
 
-    sync_every: Optional[str] = 3600
+    sync_every: Optional[int] = 3600
+    # Bounds of the adaptive interval. If unset, sync_every
+    sync_min_interval: Optional[int] = None
+    sync_max_interval: Optional[int] = None
+    sync_jitter: Optional[float] = 0
     debug: Optional[bool] = True
+    sync_async: Optional[bool] = False
+    sync_concurrency: Optional[int] = 8
+    sync_queue_size: Optional[int] = 1000
+    http_pool_size: Optional[int] = 10
+    http_timeout: Optional[float] = 30
 
     meetingtool_hostname: str
     meetingtool_token: str
+    meetingtool_batch_size: Optional[int] = 50
+    meetingtool_rate_limit: Optional[float] = 10
+    meetingtool_max_inflight: Optional[int] = 4
     cache_filename: pathlib.Path
+    cache_backend: Optional[Literal["sqlite", "memory", "log"]] = "sqlite"
+    cache_wal: Optional[bool] = False
+    cache_synchronous: Optional[Literal["OFF", "NORMAL", "FULL", "EXTRA"]] = None
+    cache_memory: Optional[bool] = False
+    # Seconds after which users that the source stopped listing are purged. If unset, never
+    cache_ttl: Optional[int] = None
+    # If unset, one per data source and event
+    cache_namespace: Optional[str] = None
+    cache_maintenance_every: Optional[int] = 3600
+    cache_purge_limit: Optional[int] = 1000
+    cache_vacuum_pages: Optional[int] = 1000
     data_source: Optional[Literal["eventbrite", "formbuilder", "pretino"]] = "pretino"
     eventbrite_event: Optional[str] = ""
     eventbrite_token: Optional[str] = ""
+    eventbrite_parallelism: Optional[int] = 4
+    eventbrite_full_resync_every: Optional[int] = 86400
+    # If set, Eventbrite webhooks are received on this port
+    eventbrite_webhook_port: Optional[int] = None
+    eventbrite_webhook_address: Optional[str] = "0.0.0.0"
+    eventbrite_webhook_secret: Optional[str] = ""
     formbuilder_url: Optional[str] = ""
     pretino_url: Optional[str] = ""
     pretino_token: Optional[str] = ""
+    rules: Optional[RulesSettings] = None
+    # If empty, a single job is defined by the settings above
+    jobs: Optional[list[JobSettings]] = []
 
     model_config = SettingsConfigDict(
         env_prefix="meeting-butler_",
@@ -2,17 +2,135 @@
 Defines user object
 """
 
-from typing import Optional, TypedDict
+import sys
+from typing import Any, Iterable, Iterator, NamedTuple, Optional, Union
 
 
-class User(TypedDict):
-    """User data structure"""
-
+class _UserFields(NamedTuple):
     name: str
-    surename: str
+    surname: str
     company: str
     email: str
     title: str
     # There might be users without an ASN
     asn: Optional[int]
     country: str
+
+
+class User(_UserFields):
+    """
+    User data structure.
+
+    Users are immutable tuples: they are compact, hashable and compared field by field.
+    Country codes are interned, as they are shared by most of the users.
+    """
+
+    __slots__ = ()
+
+    def __new__(
+        cls,
+        name: str,
+        surname: str,
+        company: str,
+        email: str,
+        title: str,
+        asn: Optional[int] = None,
+        country: str = "IT",
+    ) -> "User":
+        return super().__new__(cls, name, surname, company, email, title, asn, sys.intern(country))
+
+    def to_dict(self) -> dict:
+        """
+        Returns the user as a dictionary
+
+        Returns:
+        --------
+        dict: Field name to value
+        """
+        return self._asdict()
+
+    def to_json(self) -> list:
+        """
+        Returns the compact JSON serializable form of the user, as stored in the cache
+
+        Returns:
+        --------
+        list: Field values
+        """
+        return list(self)
+
+    @classmethod
+    def from_json(cls, value: Union[list, dict]) -> "User":
+        """
+        Builds a user out of its JSON serializable form
+
+        Arguments:
+        ----------
+        value: Union[list, dict]
+            Either the output of to_json() or, as stored by previous releases, of to_dict()
+
+        Returns:
+        --------
+        User: The user
+        """
+        if isinstance(value, dict):
+            return cls(**{field: value[field] for field in cls._fields})
+        return cls(*value)
+
+
+class UserSet:
+    """
+    Insertion ordered, deduplicated collection of users.
+
+    Users are indexed on their content, which includes their identity (the email address),
+    so that membership checks are O(1) while users sharing the same email address but
+    carrying different data are still kept apart, as a plain list would.
+
+    Arguments:
+    ----------
+    users: Iterable[User]
+        Initial users. Default: empty
+    """
+
+    def __init__(self, users: Iterable[User] = ()) -> None:
+        # dict keeps the insertion order, which set does not
+        self._users: dict[User, None] = {}
+        for user in users:
+            self.add(user)
+
+    def add(self, user: User) -> bool:
+        """
+        Adds user to the set, unless an identical one is already present
+
+        Arguments:
+        ----------
+        user: User
+            The user
+
+        Returns:
+        --------
+        bool: True if the user has been added, False if it was a duplicate
+        """
+        if user in self._users:
+            return False
+        self._users[user] = None
+        return True
+
+    def __contains__(self, user: Any) -> bool:
+        return user in self._users
+
+    def __iter__(self) -> Iterator[User]:
+        return iter(self._users)
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def to_list(self) -> list[User]:
+        """
+        Returns the users in first-seen order
+
+        Returns:
+        --------
+        list[User]: Users
+        """
+        return list(self._users)
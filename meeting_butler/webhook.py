@@ -0,0 +1,136 @@
+"""
+HTTP listener receiving Eventbrite webhooks, so that new and updated attendees are
+registered within seconds instead of at the next sync
+"""
+
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional
+
+from meeting_butler import eventbrite
+from meeting_butler.httpclient import HTTPClient
+from meeting_butler.user import User
+
+LOGGER = logging.getLogger(__name__)
+
+# Webhook actions referring to attendees that might have to be registered
+ACTIONS = {"order.placed", "order.updated", "attendee.updated"}
+
+# Webhook payloads are tiny, anything larger is not from Eventbrite
+MAX_BODY_SIZE = 64 * 1024
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "WebhookServer"
+
+    def do_POST(self) -> None:  # pylint: disable=invalid-name
+        """
+        Handles a webhook delivery. Eventbrite retries deliveries not acknowledged with 200.
+        """
+        if self.server.secret and self.path.rstrip("/") != f"/{self.server.secret}":
+            self._reply(404)
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if not 0 < length <= MAX_BODY_SIZE:
+                raise ValueError(f"Invalid body size: {length}")
+            payload = json.loads(self.rfile.read(length))
+            action = payload["config"]["action"]
+            api_url = payload["api_url"]
+        except (ValueError, KeyError, TypeError) as error:
+            LOGGER.warning("Malformed webhook: %s", error)
+            self._reply(400)
+            return
+
+        if action not in ACTIONS:
+            # E.g. the test delivery sent when the webhook is created
+            LOGGER.debug("Ignoring webhook action: %s", action)
+            self._reply(200)
+            return
+
+        try:
+            users = eventbrite.get_referenced_users(
+                api_url, self.server.token, self.server.client, self.server.event
+            )
+            LOGGER.info("Webhook %s: %d users", action, len(users))
+            if users:
+                self.server.callback(users)
+        except Exception:  # pylint: disable=broad-exception-caught
+            LOGGER.exception("Unable to handle webhook %s: %s", action, api_url)
+            self._reply(500)
+            return
+
+        self._reply(200)
+
+    def _reply(self, status: int) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args) -> None:  # pylint: disable=redefined-builtin
+        LOGGER.debug(format, *args)
+
+
+class WebhookServer(ThreadingHTTPServer):
+    """
+    Receives Eventbrite webhooks. The order or attendee each webhook refers to is fetched,
+    and its users are handed over to callback. Deliveries are handled concurrently, one
+    thread each.
+
+    Arguments:
+    ----------
+    address: tuple[str, int]
+        Address and port to listen on
+    token: str
+        Eventbrite API token ID
+    callback: Callable[[list[User]], Any]
+        Function the users are handed over to, e.g. meeting_butler.push()
+    client: Optional[HTTPClient]
+        HTTP client. None means the process wide default client
+    secret: Optional[str]
+        If set, webhooks are only accepted on the /<secret> path, which has to be part of
+        the URL configured on Eventbrite
+    event: Optional[str]
+        Eventbrite event ID. Attendees of other events, e.g. delivered by organization wide
+        webhooks, are discarded. None means any event
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        token: str,
+        callback: Callable[[list[User]], Any],
+        client: Optional[HTTPClient] = None,
+        secret: Optional[str] = None,
+        event: Optional[str] = None,
+    ) -> None:
+        super().__init__(address, _Handler)
+        self.token = token
+        self.callback = callback
+        self.client = client
+        self.secret = secret
+        self.event = event
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """
+        Starts serving in a background thread
+        """
+        LOGGER.info("Listening for webhooks on %s:%d", *self.server_address[:2])
+        self._thread = threading.Thread(target=self.serve_forever, name="webhook", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops serving and closes the socket
+        """
+        if self._thread:
+            self.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server_close()
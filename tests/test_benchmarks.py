@@ -0,0 +1,32 @@
+import tempfile
+import unittest
+
+from benchmarks.server import BenchmarkServer
+from benchmarks.suite import Suite, compare
+
+
+class TestBenchmarks(unittest.TestCase):
+    def setUp(self):
+        self.server = BenchmarkServer()
+        self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_suite(self):
+        with tempfile.TemporaryDirectory() as directory:
+            suite = Suite(self.server, directory, "sqlite", repeat=1)
+            results = suite.run(60)
+            suite.client.close()
+
+        self.assertIn("sync:eventbrite@60", results)
+        self.assertIn("latency_p95_ms", results["meetingtool:import@60"])
+        # Every sync registered all of the attendees
+        self.assertEqual(self.server.imported, 3 * 2 * 60 + 2 * 60)
+        self.assertListEqual(compare(results, results, 0), [])
+
+    def test_compare(self):
+        baseline = {"sync@1": {"throughput": 100, "peak_mib": 10}}
+        results = {"sync@1": {"throughput": 85, "peak_mib": 11}, "new@1": {}}
+        self.assertListEqual(compare(results, baseline, 0.2), [])
+        self.assertEqual(len(compare(results, baseline, 0.05)), 2)
@@ -1,7 +1,10 @@
+import datetime
 import os
+import sqlite3
+import tempfile
 import unittest
 
-from meeting_butler.cache import Cache
+from meeting_butler.cache import BaseCache, Cache, fingerprint, open_cache
 
 
 class TestCache(unittest.TestCase):
@@ -36,3 +39,307 @@ class TestCache(unittest.TestCase):
         del self.cache["1"]
         with self.assertRaises(KeyError):
             del self.cache["->WRONG<-"]
+
+    def test_missing_keys(self):
+        self.cache["1"] = 1
+        self.cache["3"] = 3
+        self.assertListEqual(self.cache.missing_keys(["3", "2", "1", "4"]), ["2", "4"])
+        self.assertListEqual(self.cache.missing_keys([]), [])
+
+        keys = [str(key) for key in range(1200)]
+        self.assertListEqual(self.cache.missing_keys(keys), keys[:1] + keys[2:3] + keys[4:])
+
+    def test_iterators(self):
+        self.cache.update({str(key): {"value": key} for key in range(25)})
+        self.assertEqual(len(self.cache), 25)
+        self.assertListEqual(sorted(self.cache, key=int), [str(key) for key in range(25)])
+
+        items = self.cache.iteritems(chunk_size=4)
+        self.assertEqual(next(items), ("0", {"value": 0}))
+        # The cache stays usable while iterating
+        self.cache["25"] = {"value": 25}
+        self.assertEqual(self.cache["1"], {"value": 1})
+        self.assertEqual(len(list(items)), 25)
+
+        self.assertListEqual(
+            sorted(value["value"] for value in self.cache.itervalues(chunk_size=7)), list(range(26))
+        )
+        with self.assertRaises(ValueError):
+            list(self.cache.iterkeys(chunk_size=0))
+
+    def test_update(self):
+        self.cache.update({"1": {"1": 1}, "2": {"3": 4}})
+        self.cache.update([("2", {"2": 2}), ("3", {"3": 3})])
+        self.assertListEqual(
+            sorted(self.cache.items()), [("1", {"1": 1}), ("2", {"2": 2}), ("3", {"3": 3})]
+        )
+        with self.assertRaises(TypeError):
+            self.cache.update([(1, 2)])
+
+    def test_fingerprints(self):
+        self.cache["1"] = {"2": 3}
+        self.cache.update({"2": {"3": 4}})
+        self.assertDictEqual(
+            self.cache.fingerprints(["1", "2", "3"]),
+            {"1": fingerprint({"2": 3}), "2": fingerprint({"3": 4})},
+        )
+        self.assertNotEqual(fingerprint({"2": 3}), fingerprint({"3": 4}))
+
+    def test_meta(self):
+        self.assertIsNone(self.cache.get_meta("1"))
+        self.assertEqual(self.cache.get_meta("1", {}), {})
+        self.cache.set_meta("1", {"2": 3})
+        self.assertEqual(self.cache.get_meta("1"), {"2": 3})
+        self.assertNotIn("1", self.cache)
+        self.cache.set_meta("1", None)
+        self.assertIsNone(self.cache.get_meta("1"))
+
+    def test_meta_staged(self):
+        self.cache.set_meta("1", {"2": 3})
+        with Cache(self.cache.filename) as other:
+            self.assertIsNone(other.get_meta("1"))
+        self.cache.save()
+        with Cache(self.cache.filename) as other:
+            self.assertEqual(other.get_meta("1"), {"2": 3})
+
+    def test_rollback_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with Cache(self.cache.filename) as cache:
+                cache["1"] = {"2": 3}
+                cache.update({"2": {"3": 4}})
+                raise RuntimeError()
+        self.assertNotIn("1", self.cache)
+        self.assertNotIn("2", self.cache)
+
+
+class TestCacheWAL(unittest.TestCase):
+    def test_wal(self):
+        cache = Cache(reset=True, wal=True, synchronous="NORMAL")
+        try:
+            cache.update({"1": {"2": 3}})
+            self.assertEqual(cache["1"], {"2": 3})
+            mode = cache._cursor.execute("PRAGMA journal_mode;").fetchone()[0]
+            self.assertEqual(mode, "wal")
+            # Incremental vacuum is set before WAL creates the database
+            self.assertEqual(cache._cursor.execute("PRAGMA auto_vacuum;").fetchone()[0], 2)
+        finally:
+            cache.close()
+            os.unlink(cache.filename)
+
+        with self.assertRaises(ValueError):
+            Cache(cache.filename, synchronous="SOMETIMES")
+
+
+class TestCacheMemory(unittest.TestCase):
+    def setUp(self):
+        cache = Cache(reset=True)
+        cache.close()
+        self.filename = cache.filename
+
+    def tearDown(self):
+        os.unlink(self.filename)
+
+    def test_memory(self):
+        with Cache(self.filename, memory=True) as cache:
+            cache["1"] = {"2": 3}
+            cache.update({"2": {"3": 4}})
+            self.assertIn("1", cache)
+            self.assertEqual(cache["1"], {"2": 3})
+            self.assertEqual(cache.missing_keys(["1", "3"]), ["3"])
+            self.assertEqual(cache.fingerprints(["2", "3"]), {"2": fingerprint({"3": 4})})
+            # Writes are buffered until save()
+            with Cache(self.filename) as other:
+                self.assertNotIn("1", other)
+
+        with Cache(self.filename) as cache:
+            self.assertEqual(cache["2"], {"3": 4})
+
+    def test_shared_index(self):
+        with Cache(self.filename, memory=True) as cache:
+            cache["1"] = {"2": 3}
+
+        with Cache(self.filename, memory=True) as cache:
+            # Answered by the index, without hitting the database
+            cache._cursor = None
+            self.assertIn("1", cache)
+            cache._cursor = cache._connection.cursor()
+
+        # Written by somebody else: the index is reloaded
+        with Cache(self.filename) as cache:
+            cache["3"] = {"4": 5}
+            del cache["1"]
+
+        with Cache(self.filename, memory=True) as cache:
+            self.assertEqual(cache.keys(), ["3"])
+
+    def test_rollback(self):
+        with self.assertRaises(RuntimeError):
+            with Cache(self.filename, memory=True) as cache:
+                cache["1"] = {"2": 3}
+                raise RuntimeError()
+
+        with Cache(self.filename, memory=True) as cache:
+            self.assertNotIn("1", cache)
+
+
+class TestCacheLifecycle(unittest.TestCase):
+    def setUp(self):
+        self.cache = Cache(reset=True)
+
+    def tearDown(self):
+        self.cache.close()
+        os.unlink(self.cache.filename)
+
+    def age(self, table, key, seconds):
+        then = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=seconds)
+        self.cache._cursor.execute(f"UPDATE {table} SET datetime = ? WHERE key = ?", (then, key))
+
+    def test_purge(self):
+        self.cache.update({str(index): {"index": index} for index in range(5)})
+        self.cache.set_meta("4", {"old": True})
+        self.cache.save()
+        for index in range(4):
+            self.age("data", str(index), 7200)
+        self.age("meta", "4", 7200)
+        self.cache.save()
+
+        self.assertEqual(self.cache.purge(3600, limit=3), 3)
+        self.assertEqual(self.cache.purge(3600, limit=3), 1)
+        self.assertEqual(self.cache.purge(3600, limit=3), 0)
+        self.assertEqual(self.cache.keys(), ["4"])
+        self.assertIsNone(self.cache.get_meta("4"))
+
+    def test_touch(self):
+        self.cache.update({"1": {"1": 1}, "2": {"2": 2}})
+        self.cache.save()
+        self.age("data", "1", 7200)
+        self.age("data", "2", 7200)
+        self.cache.save()
+
+        # Seen again, hence not expired
+        self.cache.touch(["1", "3"])
+        self.cache.save()
+        self.assertEqual(self.cache.purge(3600), 1)
+        self.assertEqual(self.cache.keys(), ["1"])
+        self.assertEqual(self.cache["1"], {"1": 1})
+
+    def test_compact(self):
+        self.cache.update({str(index): {"padding": "x" * 1000} for index in range(200)})
+        for index in range(200):
+            del self.cache[str(index)]
+        self.cache.save()
+        size = os.path.getsize(self.cache.filename)
+
+        self.cache.compact(pages=10)
+        self.assertLess(os.path.getsize(self.cache.filename), size)
+        self.cache.compact()
+        self.assertEqual(self.cache._cursor.execute("PRAGMA freelist_count;").fetchone()[0], 0)
+
+    def test_compact_legacy(self):
+        self.cache.close()
+        os.unlink(self.cache.filename)
+        connection = sqlite3.connect(self.cache.filename)
+        connection.execute("CREATE TABLE data (key TEXT PRIMARY KEY, value JSON, datetime TEXT);")
+        connection.close()
+
+        self.cache = Cache(self.cache.filename)
+        self.cache.compact()
+        self.assertEqual(self.cache._cursor.execute("PRAGMA auto_vacuum;").fetchone()[0], 2)
+
+
+class TestCacheNamespaces(unittest.TestCase):
+    def setUp(self):
+        cache = Cache(reset=True)
+        cache.close()
+        self.filename = cache.filename
+
+    def tearDown(self):
+        os.unlink(self.filename)
+
+    def test_isolation(self):
+        with Cache(self.filename, namespace="a") as cache:
+            cache["1"] = {"event": "a"}
+            cache.set_meta("1", {"event": "a"})
+        with Cache(self.filename, namespace="b") as cache:
+            self.assertNotIn("1", cache)
+            self.assertIsNone(cache.get_meta("1"))
+            cache["1"] = {"event": "b"}
+            self.assertEqual(cache.keys(), ["1"])
+            self.assertEqual(sorted(cache.namespaces()), ["a", "b"])
+
+        with Cache(self.filename, namespace="a") as cache:
+            self.assertEqual(cache["1"], {"event": "a"})
+            cache.drop("b")
+
+        with Cache(self.filename, namespace="b", memory=True) as cache:
+            self.assertNotIn("1", cache)
+            self.assertEqual(cache.namespaces(), ["a"])
+
+    def test_migration(self):
+        os.unlink(self.filename)
+        connection = sqlite3.connect(self.filename)
+        connection.execute("CREATE TABLE data (key TEXT PRIMARY KEY, value JSON, datetime TEXT);")
+        connection.execute("INSERT INTO data VALUES ('1', '{\"2\": 3}', NULL);")
+        connection.commit()
+        connection.close()
+
+        with Cache(self.filename) as cache:
+            self.assertEqual(cache["1"], {"2": 3})
+            self.assertEqual(cache.fingerprints(["1"]), {"1": None})
+        with Cache(self.filename, namespace="a") as cache:
+            self.assertNotIn("1", cache)
+
+
+class TestBackends(unittest.TestCase):
+    """
+    Behaviour shared by all of the cache backends
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "cache")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def open(self, backend, **kwargs):
+        return open_cache(self.filename, backend, **kwargs)
+
+    def test_contract(self):
+        for backend in ("sqlite", "memory", "log"):
+            with self.subTest(backend=backend):
+                with self.open(backend, reset=True, namespace="a") as cache:
+                    self.assertIsInstance(cache, BaseCache)
+                    cache.update({"1": {"2": 3}, "2": {"3": 4}})
+                    cache.set_meta("1", {"2": 3})
+                    del cache["2"]
+                    self.assertEqual(cache["1"], {"2": 3})
+                    self.assertEqual(cache.fingerprints(["1", "2"]), {"1": fingerprint({"2": 3})})
+                    self.assertEqual(cache.missing_keys(["1", "2"]), ["2"])
+                    cache.touch(["1", "2"])
+
+                with self.open(backend, namespace="a") as cache:
+                    self.assertEqual(cache.items(), [("1", {"2": 3})])
+                    self.assertEqual(list(cache.iteritems(chunk_size=1)), [("1", {"2": 3})])
+                    self.assertEqual((len(cache), list(cache)), (1, ["1"]))
+                    self.assertEqual(cache.get_meta("1"), {"2": 3})
+
+                with self.open(backend, namespace="b") as cache:
+                    self.assertNotIn("1", cache)
+                    cache["1"] = 1
+                self.assertEqual(sorted(self.open(backend).namespaces()), ["a", "b"])
+
+                with self.assertRaises(RuntimeError):
+                    with self.open(backend, namespace="a") as cache:
+                        cache["3"] = 3
+                        raise RuntimeError()
+                with self.open(backend, namespace="a") as cache:
+                    self.assertNotIn("3", cache)
+                    cache.drop("b")
+                    self.assertEqual(cache.namespaces(), ["a"])
+                    self.assertEqual(cache.purge(3600), 0)
+                    cache.compact()
+
+    def test_unsupported(self):
+        with self.assertRaises(ValueError):
+            self.open("redis")
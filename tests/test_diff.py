@@ -0,0 +1,60 @@
+import os
+import unittest
+
+from meeting_butler.cache import Cache
+from meeting_butler.diff import diff
+from meeting_butler.user import User
+
+USER = User(
+    name="MARCO",
+    surname="MARZETTI",
+    company="ITNOG",
+    email="MARCO@ITNOG.IT",
+    title="KODAMAS TAMER",
+    asn=64496,
+    country="IT",
+)
+
+
+class TestDiff(unittest.TestCase):
+    def setUp(self):
+        self.cache = Cache(reset=True)
+
+    def tearDown(self):
+        self.cache.close()
+        os.unlink(self.cache.filename)
+
+    def test_diff(self):
+        unchanged = USER._replace(email="UNCHANGED@ITNOG.IT")
+        changed = USER._replace(email="CHANGED@ITNOG.IT")
+        removed = USER._replace(email="REMOVED@ITNOG.IT")
+        self.cache.update((user.email, user.to_json()) for user in (unchanged, changed, removed))
+
+        added = USER._replace(email="ADDED@ITNOG.IT")
+        changed = changed._replace(asn=None)
+        result = diff(self.cache, [added, changed, unchanged])
+
+        self.assertListEqual(result.added, [added])
+        self.assertListEqual(result.changed, [changed])
+        self.assertListEqual(result.unchanged, [unchanged])
+        self.assertListEqual(result.removed, ["REMOVED@ITNOG.IT"])
+        self.assertListEqual(result.stale, [])
+
+        self.assertListEqual(diff(self.cache, [], removed=False).removed, [])
+
+    def test_duplicated_email(self):
+        other = USER._replace(company="NAMEX")
+        result = diff(self.cache, [USER, other])
+        self.assertListEqual(result.added, [other])
+
+    def test_legacy_entries(self):
+        # As stored by previous releases
+        self.cache[USER.email] = USER.to_dict()
+        self.cache[USER.email.lower()] = USER.to_dict()
+        self.cache._cursor.execute("UPDATE data SET fingerprint = NULL")
+
+        result = diff(self.cache, [USER, USER._replace(email=USER.email.lower(), asn=None)])
+
+        self.assertListEqual(result.unchanged, [USER])
+        self.assertListEqual(result.stale, [USER])
+        self.assertListEqual(result.changed, [USER._replace(email=USER.email.lower(), asn=None)])
@@ -1,9 +1,18 @@
 import copy
+import datetime
+import json
 import unittest
 
 import responses
 
-from meeting_butler.eventbrite import get_registered_users
+from meeting_butler.cache import Cache
+from meeting_butler.eventbrite import (
+    get_changed_since,
+    get_registered_users,
+    iter_registered_users,
+    watermark_key,
+)
+from meeting_butler.user import User
 
 RESPONSE = {
     "method": responses.GET,
@@ -93,14 +102,64 @@ class TestCase(unittest.TestCase):
         self.assertListEqual(
             list(registered_users),
             [
-                {
-                    "name": "MARCO",
-                    "surname": "MARZETTI",
-                    "company": "ITNOG",
-                    "email": "MARCO@ITNOG.IT",
-                    "title": "KODAMAS TAMER",
-                    "asn": 64496,
-                    "country": "IT",
-                }
+                User(
+                    name="MARCO",
+                    surname="MARZETTI",
+                    company="ITNOG",
+                    email="MARCO@ITNOG.IT",
+                    title="KODAMAS TAMER",
+                    asn=64496,
+                    country="IT",
+                )
             ],
         )
+
+    @responses.activate
+    def test_multiple_pages(self):
+        for page in range(1, 6):
+            response = copy.copy(RESPONSE)
+            body = json.loads(RESPONSE["body"])
+            body["pagination"]["page_count"] = 5
+            body["attendees"][0]["profile"]["email"] = f"user{page}@itnog.it"
+            response["body"] = json.dumps(body)
+            response["url"] = response["url"].replace("page=1", f"page={page}")
+            responses.add(**response)
+
+        registered_users = get_registered_users("EVENT", "TOKEN", parallelism=3)
+        self.assertListEqual(
+            [user.email for user in registered_users],
+            [f"USER{page}@ITNOG.IT" for page in range(1, 6)],
+        )
+        self.assertEqual(len(responses.calls), 5)
+
+    @responses.activate
+    def test_changed_since(self):
+        body = json.loads(RESPONSE["body"])
+        body["attendees"][0]["changed"] = "2023-05-01T10:00:00Z"
+        body["attendees"][1]["changed"] = "2023-05-02T10:00:00Z"
+        responses.add(**dict(RESPONSE, body=json.dumps(body)))
+
+        with Cache(":memory:") as cache:
+            self.assertIsNone(get_changed_since(cache, "EVENT", 3600))
+            self.assertEqual(len(list(iter_registered_users("EVENT", "TOKEN", cache=cache))), 1)
+            # Cancelled attendees count as changes too
+            self.assertEqual(get_changed_since(cache, "EVENT", 3600), "2023-05-02T10:00:00Z")
+            self.assertIsNone(get_changed_since(cache, "EVENT", 0))
+
+            responses.add(
+                responses.GET,
+                f"{RESPONSE['url']}&changed_since=2023-05-02T10%3A00%3A00Z",
+                json={"pagination": {"page_count": 1}, "attendees": []},
+            )
+            users = iter_registered_users(
+                "EVENT", "TOKEN", cache=cache, changed_since="2023-05-02T10:00:00Z"
+            )
+            self.assertListEqual(list(users), [])
+            self.assertEqual(get_changed_since(cache, "EVENT", 3600), "2023-05-02T10:00:00Z")
+
+            # Time for a full resync
+            watermark = cache.get_meta(watermark_key("EVENT"))
+            last_full_sync = datetime.datetime.fromisoformat(watermark["full_sync"])
+            watermark["full_sync"] = (last_full_sync - datetime.timedelta(hours=2)).isoformat()
+            cache.set_meta(watermark_key("EVENT"), watermark)
+            self.assertIsNone(get_changed_since(cache, "EVENT", 3600))
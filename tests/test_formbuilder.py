@@ -0,0 +1,72 @@
+import copy
+import unittest
+
+import responses
+
+from meeting_butler.formbuilder import get_registered_users
+from meeting_butler.user import User
+
+URL = "http://www.example.com/formbuilder/users.csv"
+
+RESPONSE = {
+    "method": responses.GET,
+    "url": URL,
+    "body": (
+        "1,2024-05-20,Marco,Marzetti,ITNOG,Kodamas Tamer,marco@itnog.it,,,AS64496\r\n"
+        "2,2024-05-21,Nicolò,Rossi,,Fa cose e vede gente,nicolo@itnog.it,,,n/a\r\n"
+        "1,2024-05-20,Marco,Marzetti,ITNOG,Kodamas Tamer,marco@itnog.it,,,AS64496\r\n"
+    ).encode("utf-8"),
+    "status": 200,
+    "content_type": "text/csv",
+}
+
+
+class TestCase(unittest.TestCase):
+    @responses.activate
+    def test_wrong_http_status(self):
+        response = copy.copy(RESPONSE)
+        response["status"] = 404
+        responses.add(**response)
+
+        with self.assertRaises(AssertionError):
+            registered_users = get_registered_users(URL)
+            list(registered_users)
+
+    @responses.activate
+    def test_non_utf8_body(self):
+        response = copy.copy(RESPONSE)
+        response["body"] = "2,2024-05-21,Nicolò,Rossi,,,nicolo@itnog.it,,,\r\n".encode("latin-1")
+        responses.add(**response)
+
+        with self.assertRaises(ValueError):
+            registered_users = get_registered_users(URL)
+            list(registered_users)
+
+    @responses.activate
+    def test_succesful_request(self):
+        responses.add(**RESPONSE)
+
+        registered_users = get_registered_users(URL)
+        self.assertListEqual(
+            list(registered_users),
+            [
+                User(
+                    name="MARCO",
+                    surname="MARZETTI",
+                    company="ITNOG",
+                    email="MARCO@ITNOG.IT",
+                    title="KODAMAS TAMER",
+                    asn=64496,
+                    country="IT",
+                ),
+                User(
+                    name="NICOLÒ",
+                    surname="ROSSI",
+                    company="NICOLÒ ROSSI",
+                    email="NICOLO@ITNOG.IT",
+                    title="FA COSE E VEDE GENTE",
+                    asn=None,
+                    country="IT",
+                ),
+            ],
+        )
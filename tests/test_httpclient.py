@@ -0,0 +1,60 @@
+import os
+import unittest
+from unittest import mock
+
+import requests
+import responses
+
+from meeting_butler.cache import Cache
+from meeting_butler.httpclient import HTTPClient, NotModified, validators_key
+
+
+class TestHTTPClient(unittest.TestCase):
+    def setUp(self):
+        self.client = HTTPClient(pool_size=2, timeout=5)
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_sessions_per_host(self):
+        first = self.client.session("https://www.example.com/foo")
+        self.assertIs(first, self.client.session("https://www.example.com/bar?baz=1"))
+        self.assertIsNot(first, self.client.session("https://api.example.com/foo"))
+        self.assertIsNot(first, self.client.session("http://www.example.com/foo"))
+
+    @responses.activate
+    def test_request(self):
+        responses.add(responses.GET, "https://www.example.com/foo", body="bar")
+
+        response = self.client.get("https://www.example.com/foo")
+
+        self.assertEqual(response.text, "bar")
+        self.assertIn("gzip", responses.calls[0].request.headers["Accept-Encoding"])
+
+    def test_wrong_pool_size(self):
+        with self.assertRaises(ValueError):
+            HTTPClient(pool_size=0)
+
+    @responses.activate
+    def test_conditional_get(self):
+        url = "https://www.example.com/users.csv"
+        responses.add(responses.GET, url, body="foo", headers={"ETag": '"v1"'})
+        responses.add(responses.GET, url, status=304)
+
+        cache = Cache(reset=True)
+        try:
+            self.assertEqual(self.client.conditional_get(url, cache).text, "foo")
+            self.assertDictEqual(
+                cache.get_meta(validators_key(url)), {"etag": '"v1"', "last_modified": None}
+            )
+
+            with mock.patch.object(requests.Response, "close", autospec=True) as close:
+                with self.assertRaises(NotModified):
+                    self.client.conditional_get(url, cache, stream=True)
+            # The streamed response is released
+            close.assert_called_once()
+            self.assertEqual(responses.calls[1].request.headers["If-None-Match"], '"v1"')
+            self.assertNotIn("If-Modified-Since", responses.calls[1].request.headers)
+        finally:
+            cache.close()
+            os.unlink(cache.filename)
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import time
+import unittest
+
+from meeting_butler import logcache
+from meeting_butler.cache import fingerprint
+from meeting_butler.logcache import SET, LogCache
+
+
+class TestLogCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "cache.log")
+        self.cache = LogCache(self.filename, reset=True, fsync=False)
+
+    def tearDown(self):
+        logcache._LOGS.pop(self.filename)
+        self.directory.cleanup()
+
+    def reload(self):
+        """
+        Forgets the shared index, as if the process had been restarted
+        """
+        logcache._LOGS.pop(self.filename).close()
+        return LogCache(self.filename, fsync=False)
+
+    def test_persistence(self):
+        self.cache["1"] = {"2": 3}
+        self.cache.set_meta("1", {"2": 3})
+        self.assertEqual(os.path.getsize(self.filename), len(logcache.MAGIC))
+        self.cache.save()
+
+        cache = self.reload()
+        self.assertEqual(cache["1"], {"2": 3})
+        self.assertEqual(cache.get_meta("1"), {"2": 3})
+
+    def test_torn_tail(self):
+        self.cache["1"] = 1
+        self.cache.save()
+        self.cache["2"] = 2
+        self.cache.save()
+        torn = os.path.getsize(self.filename) - 1
+        with open(self.filename, "r+b") as log:
+            log.truncate(torn)
+
+        # Might be another process appending, hence the record is only skipped
+        cache = self.reload()
+        self.assertEqual(cache.keys(), ["1"])
+        self.assertEqual(os.path.getsize(self.filename), torn)
+
+        # Writers hold the lock, hence the record is torn and cut away
+        with self.assertLogs(logcache.LOGGER, "WARNING"):
+            cache["3"] = 3
+            cache.save()
+        self.assertEqual(self.reload().keys(), ["1", "3"])
+
+    def test_partial_append(self):
+        record = logcache._record(SET, "", "1", b"1", fingerprint(1))
+        with open(self.filename, "ab") as log:
+            log.write(record[:10])
+            log.flush()
+            # Another process is halfway through appending
+            cache = self.reload()
+            self.assertNotIn("1", cache)
+            log.write(record[10:])
+
+        self.assertEqual(os.path.getsize(self.filename), len(logcache.MAGIC) + len(record))
+        cache = LogCache(self.filename, fsync=False)
+        self.assertEqual(cache["1"], 1)
+
+    def test_compact(self):
+        for value in range(10):
+            self.cache["1"] = value
+            self.cache.save()
+        self.cache["2"] = 2
+        self.cache.save()
+        size = os.path.getsize(self.filename)
+
+        self.cache.compact()
+        self.assertLess(os.path.getsize(self.filename), size)
+        self.assertEqual(self.cache.items(), [("1", 9), ("2", 2)])
+        self.assertEqual(self.reload().items(), [("1", 9), ("2", 2)])
+
+    def test_purge(self):
+        self.cache.update({"1": 1, "2": 2})
+        self.cache.save()
+        self.assertEqual(self.cache.purge(3600), 0)
+        time.sleep(0.2)
+        self.cache["2"] = 2
+        self.cache.save()
+        with self.assertRaises(ValueError):
+            self.cache.purge(0)
+
+        cutoff = logcache._LOGS[self.filename].index[""]["2"].timestamp
+        self.assertEqual(self.cache.purge(time.time() - cutoff + 0.1), 1)
+        self.assertEqual(self.reload().keys(), ["2"])
+
+    def test_touch(self):
+        self.cache.update({"1": 1, "2": 2})
+        self.cache.save()
+        time.sleep(0.2)
+        self.cache.touch(["2", "3"])
+        self.cache.save()
+        self.assertNotIn("3", self.cache)
+
+        # The timestamp of the touch outlives the compaction
+        logcache._LOGS[self.filename].compact()
+        cache = self.reload()
+        cutoff = cache._log.index[""]["2"].timestamp
+        self.assertEqual(cache.purge(time.time() - cutoff + 0.1), 1)
+        self.assertEqual(self.reload().items(), [("2", 2)])
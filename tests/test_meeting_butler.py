@@ -0,0 +1,188 @@
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+
+import responses
+
+from meeting_butler.__main__ import _namespace, _source_settings, _webhook_job
+from meeting_butler.cache import Cache
+from meeting_butler.httpclient import validators_key
+from meeting_butler.meeting_butler import async_sync, sync
+from meeting_butler.meetingtool import RegistrationFailed
+from meeting_butler.pretino import Attendee
+from meeting_butler.settings import JobSettings, Settings
+
+PRETINO_URL = "http://www.example.com/pretino/orders/"
+IMPORT_URL = "https://meetingtool.example.com/api/registrations/import/"
+
+ATTENDEES = [
+    {
+        "name": "PC",
+        "surname": "Principal",
+        "company": "South Park Elementary School",
+        "asn": "AS0",
+        "job_title": "School Principal",
+        "email": "pcprincipal@example.com",
+    },
+    {
+        "name": "Strong",
+        "surname": "Woman",
+        "company": "South Park Elementary School",
+        "asn": "AS65535",
+        "job_title": "Teacher",
+        "email": "strongwoman@example.com",
+    },
+]
+
+
+class TestSync(unittest.TestCase):
+    def setUp(self):
+        handle, self.filename = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        os.unlink(self.filename)
+
+    def tearDown(self):
+        os.unlink(self.filename)
+
+    def run_sync(self, runner):
+        return runner(
+            "meetingtool.example.com",
+            "TOKEN",
+            {"url": PRETINO_URL, "token": "TOKEN"},
+            "pretino",
+            self.filename,
+            meetingtool_settings={"rate_limit": None},
+        )
+
+    def check(self, runner):
+        responses.add(responses.GET, PRETINO_URL, json=ATTENDEES, headers={"ETag": '"v1"'})
+        responses.add(responses.POST, IMPORT_URL, json={})
+
+        registered = runner()
+        self.assertEqual(
+            [user.email for user in registered],
+            [
+                "PCPRINCIPAL@EXAMPLE.COM",
+                "STRONGWOMAN@EXAMPLE.COM",
+            ],
+        )
+        self.assertEqual(len(json.loads(responses.calls[1].request.body)), 2)
+
+        # Nothing changed
+        self.assertListEqual(runner(), [])
+        self.assertEqual(len(responses.calls), 3)
+        self.assertEqual(responses.calls[2].request.headers["If-None-Match"], '"v1"')
+
+        # One user updated their profile
+        attendees = [dict(ATTENDEES[0], company="Hell"), ATTENDEES[1]]
+        responses.replace(responses.GET, PRETINO_URL, json=attendees, headers={"ETag": '"v2"'})
+        registered = runner()
+        self.assertEqual([user.company for user in registered], ["HELL"])
+
+        with Cache(self.filename) as cache:
+            self.assertEqual(cache["PCPRINCIPAL@EXAMPLE.COM"][2], "HELL")
+
+    @responses.activate
+    def test_sync(self):
+        self.check(lambda: self.run_sync(sync))
+
+    @responses.activate
+    def test_async_sync(self):
+        self.check(lambda: asyncio.run(self.run_sync(async_sync)))
+
+    def check_failure(self, runner):
+        responses.add(responses.GET, PRETINO_URL, json=ATTENDEES, headers={"ETag": '"v1"'})
+        responses.add(responses.POST, IMPORT_URL, json={})
+        responses.add(responses.POST, IMPORT_URL, status=503)
+
+        with self.assertRaises(RegistrationFailed):
+            runner(
+                "meetingtool.example.com",
+                "TOKEN",
+                {"url": PRETINO_URL, "token": "TOKEN"},
+                "pretino",
+                self.filename,
+                meetingtool_settings={"rate_limit": None, "batch_size": 1, "max_inflight": 1},
+            )
+
+        # The user imported before the failure is kept, the source is fetched again
+        with Cache(self.filename) as cache:
+            self.assertListEqual(list(cache.keys()), ["PCPRINCIPAL@EXAMPLE.COM"])
+            self.assertIsNone(cache.get_meta(validators_key(PRETINO_URL)))
+
+    @responses.activate
+    def test_sync_failure(self):
+        self.check_failure(sync)
+
+    @responses.activate
+    def test_async_sync_failure(self):
+        self.check_failure(lambda *args, **kwargs: asyncio.run(async_sync(*args, **kwargs)))
+
+    @responses.activate
+    def test_upgrade(self):
+        # Cache written by a release predating namespaces
+        connection = sqlite3.connect(self.filename)
+        connection.execute("CREATE TABLE data (key TEXT PRIMARY KEY, value JSON, datetime TEXT);")
+        for attendee in ATTENDEES:
+            user = Attendee.model_validate(attendee).to_user()
+            connection.execute(
+                "INSERT INTO data VALUES (?, ?, NULL);", (user.email, json.dumps(user.to_dict()))
+            )
+        connection.commit()
+        connection.close()
+        responses.add(responses.GET, PRETINO_URL, json=ATTENDEES)
+
+        job = JobSettings(name="pretino", data_source="pretino", pretino_url=PRETINO_URL)
+        registered = sync(
+            "meetingtool.example.com",
+            "TOKEN",
+            {"url": PRETINO_URL, "token": "TOKEN"},
+            "pretino",
+            self.filename,
+            cache_settings={"namespace": _namespace(job, partitioned=False)},
+        )
+
+        # The users cached before the upgrade are not registered again
+        self.assertListEqual(registered, [])
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(_namespace(job, partitioned=True), f"pretino:{PRETINO_URL}")
+
+
+class TestWebhookJob(unittest.TestCase):
+    def settings(self, jobs, **kwargs):
+        return Settings(
+            meetingtool_hostname="meetingtool.example.com",
+            meetingtool_token="TOKEN",
+            cache_filename="cache.db",
+            jobs=jobs,
+            **kwargs,
+        )
+
+    def test_webhook_job(self):
+        default_job = JobSettings(name="pretino", data_source="pretino")
+        self.assertIs(_webhook_job(self.settings([]), default_job), default_job)
+
+        pretino = JobSettings(name="pretino", data_source="pretino", pretino_url=PRETINO_URL)
+        event = JobSettings(name="event", data_source="eventbrite", eventbrite_event="1")
+        job = _webhook_job(self.settings([pretino, event]), default_job)
+        # The webhook shares the cache namespace of the Eventbrite job
+        self.assertEqual(_namespace(job, partitioned=True), "eventbrite:1")
+
+        with self.assertRaises(ValueError):
+            _webhook_job(self.settings([pretino]), default_job)
+        with self.assertRaises(ValueError):
+            _webhook_job(self.settings([event, event]), default_job)
+
+    def test_inherited(self):
+        event = JobSettings(name="event", data_source="eventbrite", eventbrite_event="1")
+        settings = self.settings([event], eventbrite_event="2", eventbrite_token="SECRET")
+        job = _webhook_job(settings, None)
+
+        # Settings the job does not set are inherited
+        self.assertDictEqual(
+            _source_settings(job),
+            {"token": "SECRET", "event": "1", "parallelism": 4, "full_resync_every": 86400},
+        )
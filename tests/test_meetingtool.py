@@ -0,0 +1,83 @@
+import json
+import unittest
+
+import responses
+
+from meeting_butler.meetingtool import RegistrationFailed, register_users
+from meeting_butler.user import User
+
+URL = "https://meetingtool.example.com/api/registrations/import/"
+
+
+def make_user(index):
+    return User(
+        name="NAME",
+        surname="SURNAME",
+        company="COMPANY",
+        email=f"USER{index}@EXAMPLE.COM",
+        title="TITLE",
+        asn=64496,
+        country="IT",
+    )
+
+
+def import_callback(request):
+    records = json.loads(request.body)
+    if any(record["mail"] == "user3@example.com" for record in records):
+        return (400, {}, json.dumps({"error": "invalid"}))
+    return (200, {}, json.dumps({}))
+
+
+class TestCase(unittest.TestCase):
+    @responses.activate
+    def test_batches(self):
+        responses.add_callback(responses.POST, URL, callback=import_callback)
+        users = [make_user(index) for index in range(5)]
+
+        registered = register_users(
+            "meetingtool.example.com", "TOKEN", users, batch_size=2, rate_limit=None
+        )
+
+        self.assertListEqual(registered, users[:3] + users[4:])
+        # [0, 1], [2, 3] rejected, [2], [3] rejected, [4]
+        self.assertEqual(len(responses.calls), 5)
+        self.assertEqual(responses.calls[0].request.headers["Authorization"], "Bearer TOKEN")
+
+    @responses.activate
+    def test_unauthorized(self):
+        responses.add(responses.POST, URL, status=401, json={"detail": "unauthorized"})
+
+        with self.assertRaises(RuntimeError):
+            register_users("meetingtool.example.com", "TOKEN", [make_user(0)])
+
+    @responses.activate
+    def test_unavailable(self):
+        responses.add(responses.POST, URL, status=503, body="Service Unavailable")
+        users = [make_user(index) for index in range(200)]
+
+        with self.assertRaises(RuntimeError):
+            register_users(
+                "meetingtool.example.com", "TOKEN", users, max_inflight=1, rate_limit=None
+            )
+        # Failures are not mistaken for rejected records, hence batches are not split
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_partial_failure(self):
+        responses.add(responses.POST, URL, json={})
+        responses.add(responses.POST, URL, status=503, body="Service Unavailable")
+        users = [make_user(index) for index in range(6)]
+
+        with self.assertRaises(RegistrationFailed) as context:
+            register_users(
+                "meetingtool.example.com", "TOKEN", users, 2, max_inflight=1, rate_limit=None
+            )
+        # The first batch was imported before meetingtool failed
+        self.assertListEqual(context.exception.registered, users[:2])
+        self.assertEqual(len(responses.calls), 2)
+
+    def test_wrong_batch_size(self):
+        with self.assertRaises(ValueError):
+            register_users("meetingtool.example.com", "TOKEN", [], batch_size=0)
+        with self.assertRaises(ValueError):
+            register_users("meetingtool.example.com", "TOKEN", [], max_inflight=0)
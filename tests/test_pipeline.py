@@ -0,0 +1,72 @@
+import os
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from meeting_butler.cache import Cache
+from meeting_butler.pipeline import Pipeline
+from meeting_butler.rules import Rules
+from meeting_butler.user import User
+
+USER = User(
+    name="MARCO",
+    surname="MARZETTI",
+    company="ITNOG",
+    email="MARCO@ITNOG.IT",
+    title="KODAMAS TAMER",
+    asn=64496,
+    country="IT",
+)
+
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.cache = Cache(reset=True)
+        self.importer = MagicMock(batch_size=2)
+        self.submitted = []
+        self.importer.submit.side_effect = self.submitted.extend
+        self.importer.results.side_effect = lambda: list(self.submitted)
+
+    def tearDown(self):
+        self.cache.close()
+        os.unlink(self.cache.filename)
+
+    def test_run(self):
+        cached = USER._replace(email="CACHED@ITNOG.IT")
+        removed = USER._replace(email="REMOVED@ITNOG.IT")
+        self.cache.update((user.email, user.to_json()) for user in (cached, removed))
+
+        source = [USER._replace(email=f"USER{index}@ITNOG.IT") for index in range(5)]
+        source += [cached, source[0], USER._replace(email="USER@EXAMPLE.COM")]
+
+        delta, new_users, registered = Pipeline(
+            self.cache, self.importer, Rules(email_regex="@itnog"), queue_size=1
+        ).run(iter(source))
+
+        self.assertListEqual(new_users, source[:5])
+        self.assertListEqual(registered, source[:5])
+        self.assertListEqual(delta.unchanged, [cached])
+        self.assertListEqual(delta.removed, ["REMOVED@ITNOG.IT"])
+        # Users discarded by the rules are not compared with the cache
+        self.assertEqual(len(delta.added), 5)
+
+    def test_registration_starts_while_fetching(self):
+        registering = threading.Event()
+        self.importer.submit.side_effect = lambda users: registering.set()
+
+        def source():
+            yield USER
+            # Blocks until the first user has been handed over to the importer
+            self.assertTrue(registering.wait(timeout=5))
+            yield USER._replace(email="OTHER@ITNOG.IT")
+
+        delta, _, _ = Pipeline(self.cache, self.importer).run(source())
+        self.assertEqual(len(delta.added), 2)
+
+    def test_source_failure(self):
+        def source():
+            yield USER
+            raise ValueError("Malformed body")
+
+        with self.assertRaises(ValueError):
+            Pipeline(self.cache, self.importer).run(source())
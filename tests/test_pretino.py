@@ -1,9 +1,11 @@
 import copy
+import json
 import unittest
 
 import responses
 
 from meeting_butler.pretino import get_registered_users
+from meeting_butler.user import User
 
 RESPONSE = {
     "method": responses.GET,
@@ -86,23 +88,53 @@ class TestCase(unittest.TestCase):
         self.assertListEqual(
             list(registered_users),
             [
-                {
-                    "name": "PC",
-                    "surname": "PRINCIPAL",
-                    "company": "SOUTH PARK ELEMENTARY SCHOOL",
-                    "email": "PCPRINCIPAL@EXAMPLE.COM",
-                    "title": "SCHOOL PRINCIPAL",
-                    "asn": 0,
-                    "country": "IT",
-                },
-                {
-                    "name": "STRONG",
-                    "surname": "WOMAN",
-                    "company": "SOUTH PARK ELEMENTARY SCHOOL",
-                    "email": "STRONGWOMAN@EXAMPLE.COM",
-                    "title": "TEACHER",
-                    "asn": 65535,
-                    "country": "IT",
-                },
+                User(
+                    name="PC",
+                    surname="PRINCIPAL",
+                    company="SOUTH PARK ELEMENTARY SCHOOL",
+                    email="PCPRINCIPAL@EXAMPLE.COM",
+                    title="SCHOOL PRINCIPAL",
+                    asn=0,
+                    country="IT",
+                ),
+                User(
+                    name="STRONG",
+                    surname="WOMAN",
+                    company="SOUTH PARK ELEMENTARY SCHOOL",
+                    email="STRONGWOMAN@EXAMPLE.COM",
+                    title="TEACHER",
+                    asn=65535,
+                    country="IT",
+                ),
+            ],
+        )
+
+    @responses.activate
+    def test_malformed_records(self):
+        response = copy.copy(RESPONSE)
+        body = json.loads(RESPONSE["body"])
+        del body[0]["email"]
+        body[1]["company"] = ""
+        body[1]["asn"] = None
+        response["body"] = json.dumps(body)
+        responses.add(**response)
+
+        errors = []
+        registered_users = get_registered_users(
+            "http://www.example.com/pretino/orders/", "TOKEN", errors=errors
+        )
+        self.assertEqual(len(errors), 1)
+        self.assertListEqual(
+            list(registered_users),
+            [
+                User(
+                    name="STRONG",
+                    surname="WOMAN",
+                    company="STRONG WOMAN",
+                    email="STRONGWOMAN@EXAMPLE.COM",
+                    title="TEACHER",
+                    asn=None,
+                    country="IT",
+                ),
             ],
         )
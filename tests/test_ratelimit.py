@@ -0,0 +1,26 @@
+import unittest
+from unittest.mock import patch
+
+from meeting_butler.ratelimit import TokenBucket
+
+
+class TestTokenBucket(unittest.TestCase):
+    @patch("meeting_butler.ratelimit.sleep")
+    @patch("meeting_butler.ratelimit.monotonic")
+    def test_acquire(self, monotonic, sleep):
+        clock = [0.0]
+        monotonic.side_effect = lambda: clock[0]
+        sleep.side_effect = lambda seconds: clock.__setitem__(0, clock[0] + seconds)
+
+        bucket = TokenBucket(rate=2, capacity=2)
+        bucket.acquire()
+        bucket.acquire()
+        sleep.assert_not_called()
+
+        bucket.acquire()
+        sleep.assert_called_once_with(0.5)
+        self.assertEqual(clock[0], 0.5)
+
+    def test_wrong_rate(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(0)
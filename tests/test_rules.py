@@ -0,0 +1,66 @@
+import unittest
+
+from meeting_butler.rules import Rules
+from meeting_butler.user import User
+
+USER = User(
+    name="MARCO",
+    surname="MARZETTI",
+    company="ITNOG SRL",
+    email="MARCO@MAIL.ITNOG.IT",
+    title="KODAMAS TAMER",
+    asn=64500,
+    country="IT",
+)
+
+
+class TestRules(unittest.TestCase):
+    def test_no_rules(self):
+        self.assertFalse(Rules())
+        self.assertEqual(Rules().apply(USER), USER)
+
+    def test_domains(self):
+        self.assertEqual(Rules(allowed_domains=["itnog.it"]).apply(USER), USER)
+        self.assertEqual(Rules(allowed_domains=["MAIL.ITNOG.IT"]).apply(USER), USER)
+        self.assertIsNone(Rules(allowed_domains=["example.com"]).apply(USER))
+        self.assertIsNone(Rules(allowed_domains=["nog.it"]).apply(USER))
+        self.assertIsNone(Rules(denied_domains=["it"]).apply(USER))
+        self.assertIsNone(
+            Rules(allowed_domains=["itnog.it"], denied_domains=["mail.itnog.it"]).apply(USER)
+        )
+
+    def test_asns(self):
+        rules = Rules(allowed_asns=["AS64496-AS64499", "64501-64510", 64500, 65000])
+        self.assertEqual(rules.apply(USER), USER)
+        self.assertIsNone(rules.apply(USER._replace(asn=64511)))
+        self.assertIsNone(rules.apply(USER._replace(asn=1)))
+        self.assertIsNone(rules.apply(USER._replace(asn=None)))
+        self.assertEqual(rules.apply(USER._replace(asn=65000)), USER._replace(asn=65000))
+
+        with self.assertRaises(ValueError):
+            Rules(allowed_asns=["64510-64500"])
+        with self.assertRaises(ValueError):
+            Rules(allowed_asns=["foo"])
+
+    def test_companies(self):
+        self.assertIsNone(Rules(blocked_companies=["itnog srl"]).apply(USER))
+        self.assertEqual(Rules(blocked_companies=["itnog"]).apply(USER), USER)
+
+    def test_rewrites(self):
+        rules = Rules(
+            rewrites={"company": {"itnog srl": "itnog"}, "asn": {"64500": 64496}},
+            blocked_companies=["ITNOG SRL"],
+        )
+        # Filters apply to the rewritten user
+        self.assertEqual(rules.apply(USER), USER._replace(company="ITNOG", asn=64496))
+
+        with self.assertRaises(ValueError):
+            Rules(rewrites={"email": {"A": "B"}})
+
+    def test_email_regex(self):
+        self.assertEqual(Rules(email_regex="@mail\\.itnog").apply(USER), USER)
+        self.assertIsNone(Rules(email_regex="^foo@").apply(USER))
+
+    def test_filter(self):
+        other = USER._replace(email="FOO@EXAMPLE.COM")
+        self.assertListEqual(Rules(denied_domains=["example.com"]).filter([USER, other]), [USER])
@@ -0,0 +1,67 @@
+import threading
+import unittest
+
+from meeting_butler.scheduler import Job, Scheduler, next_deadline, next_interval
+
+
+class TestScheduler(unittest.TestCase):
+    def test_run(self):
+        runs = {"a": 0, "b": 0}
+        done = threading.Event()
+
+        def run(name):
+            runs[name] += 1
+            if runs["a"] >= 3 and runs["b"] >= 3:
+                done.set()
+
+        def fail():
+            raise RuntimeError("failed")
+
+        scheduler = Scheduler(
+            [
+                Job("a", 0.01, lambda: run("a")),
+                Job("b", 0.01, lambda: run("b")),
+                Job("c", 0.01, fail),
+            ]
+        )
+        scheduler.start()
+        self.assertTrue(done.wait(5))
+        scheduler.stop()
+
+        self.assertGreaterEqual(runs["a"], 3)
+        self.assertGreaterEqual(runs["b"], 3)
+
+    def test_duplicated_names(self):
+        with self.assertRaises(ValueError):
+            Scheduler([Job("a", 1, lambda: None), Job("a", 1, lambda: None)])
+
+    def test_no_jobs(self):
+        with self.assertRaises(ValueError):
+            Scheduler([])
+
+
+class TestIntervals(unittest.TestCase):
+    def test_next_interval(self):
+        job = Job("a", 60, lambda: None, min_interval=10, max_interval=300)
+        self.assertEqual(next_interval(job, 60, 5), 30)
+        self.assertEqual(next_interval(job, 15, 5), 10)
+        self.assertEqual(next_interval(job, 60, 0), 120)
+        self.assertEqual(next_interval(job, 200, 0), 300)
+
+    def test_fixed_interval(self):
+        job = Job("a", 60, lambda: None)
+        self.assertEqual(next_interval(job, 60, 5), 60)
+        self.assertEqual(next_interval(job, 60, 0), 60)
+
+    def test_next_deadline(self):
+        # The run took less than the interval: no drift
+        self.assertEqual(next_deadline(100, 10, 105), (110, 0))
+        # The run took 25 seconds: two deadlines are skipped
+        self.assertEqual(next_deadline(100, 10, 125), (130, 2))
+        self.assertEqual(next_deadline(100, 10, 110), (120, 1))
+
+    def test_invalid_intervals(self):
+        with self.assertRaises(ValueError):
+            Scheduler([Job("a", 60, lambda: None, min_interval=120)])
+        with self.assertRaises(ValueError):
+            Scheduler([Job("a", 60, lambda: None, jitter=-1)])
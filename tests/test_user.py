@@ -0,0 +1,51 @@
+import json
+import sys
+import unittest
+
+from meeting_butler.user import User, UserSet
+
+USER = User(
+    name="MARCO",
+    surname="MARZETTI",
+    company="ITNOG",
+    email="MARCO@ITNOG.IT",
+    title="KODAMAS TAMER",
+    asn=64496,
+    country="IT",
+)
+
+
+class TestUser(unittest.TestCase):
+    def test_json(self):
+        serialized = json.dumps(USER.to_json())
+        self.assertEqual(User.from_json(json.loads(serialized)), USER)
+        self.assertEqual(User.from_json(USER.to_dict()), USER)
+
+    def test_country_is_interned(self):
+        user = User.from_json(json.loads(json.dumps(USER.to_json())))
+        self.assertIs(user.country, sys.intern("IT"))
+
+    def test_equality(self):
+        self.assertEqual(USER, USER._replace())
+        self.assertEqual(hash(USER), hash(USER._replace()))
+        self.assertNotEqual(USER, USER._replace(asn=None))
+
+
+class TestUserSet(unittest.TestCase):
+    def test_deduplication(self):
+        users = UserSet()
+        self.assertTrue(users.add(USER))
+        self.assertFalse(users.add(USER._replace()))
+        self.assertIn(USER._replace(), users)
+        self.assertEqual(len(users), 1)
+
+    def test_same_email_different_content(self):
+        other = USER._replace(company="NAMEX")
+        users = UserSet([USER, other, USER])
+        self.assertListEqual(users.to_list(), [USER, other])
+
+    def test_ordering(self):
+        first = USER._replace(email="A@ITNOG.IT")
+        second = USER._replace(email="B@ITNOG.IT")
+        users = UserSet([second, first, second])
+        self.assertListEqual(list(users), [second, first])
@@ -0,0 +1,140 @@
+import json
+import os
+import tempfile
+import unittest
+import urllib.error
+import urllib.request
+from functools import partial
+
+import responses
+
+from meeting_butler.meeting_butler import push
+from meeting_butler.user import User
+from meeting_butler.webhook import WebhookServer
+
+ORDER_URL = "https://www.eventbriteapi.com/v3/orders/1234/"
+IMPORT_URL = "https://meetingtool.example.com/api/registrations/import/"
+
+ATTENDEE = {
+    "event_id": "1",
+    "cancelled": False,
+    "profile": {
+        "first_name": "Marco",
+        "last_name": "Marzetti",
+        "company": "ITNOG",
+        "email": "marco@itnog.it",
+        "job_title": "Kodamas Tamer",
+    },
+    "answers": [{"question": "ASN", "answer": "AS64496"}],
+}
+
+USER = User(
+    name="MARCO",
+    surname="MARZETTI",
+    company="ITNOG",
+    email="MARCO@ITNOG.IT",
+    title="KODAMAS TAMER",
+    asn=64496,
+    country="IT",
+)
+
+
+class TestWebhook(unittest.TestCase):
+    def setUp(self):
+        self.received = []
+        self.server = WebhookServer(
+            ("127.0.0.1", 0), "TOKEN", self.callback, secret="SECRET", event="1"
+        )
+        self.server.start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/SECRET"
+
+        self.mock = responses.RequestsMock(assert_all_requests_are_fired=False)
+        self.mock.start()
+
+    def tearDown(self):
+        self.mock.stop()
+        self.mock.reset()
+        self.server.stop()
+
+    def callback(self, users):
+        self.received += users
+
+    def send(self, payload, url=None):
+        # Stands in for Eventbrite. urllib is not intercepted by responses
+        request = urllib.request.Request(
+            url or self.url,
+            data=json.dumps(payload).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                return response.status
+        except urllib.error.HTTPError as error:
+            return error.code
+
+    def test_order_placed(self):
+        self.mock.add(
+            responses.GET,
+            f"{ORDER_URL}?token=TOKEN&expand=attendees",
+            json={"id": "1234", "attendees": [ATTENDEE, dict(ATTENDEE, cancelled=True)]},
+        )
+
+        status = self.send({"config": {"action": "order.placed"}, "api_url": ORDER_URL})
+        self.assertEqual(status, 200)
+        self.assertListEqual(self.received, [USER])
+
+    def test_other_event(self):
+        other = dict(ATTENDEE, event_id="2", profile=dict(ATTENDEE["profile"], email="a@b.it"))
+        self.mock.add(
+            responses.GET,
+            f"{ORDER_URL}?token=TOKEN&expand=attendees",
+            json={"id": "1234", "attendees": [other, ATTENDEE]},
+        )
+
+        status = self.send({"config": {"action": "order.placed"}, "api_url": ORDER_URL})
+        self.assertEqual(status, 200)
+        self.assertListEqual(self.received, [USER])
+
+    def test_ignored(self):
+        self.assertEqual(self.send({"config": {"action": "test"}, "api_url": ORDER_URL}), 200)
+        self.assertEqual(self.send({"config": {}}), 400)
+        self.assertEqual(
+            self.send({"config": {"action": "order.placed"}, "api_url": ORDER_URL}, self.url[:-1]),
+            404,
+        )
+        # The token must not be sent anywhere but to Eventbrite
+        status = self.send(
+            {"config": {"action": "order.placed"}, "api_url": "https://example.com/v3/orders/1/"}
+        )
+        self.assertEqual(status, 500)
+        self.assertListEqual(self.received, [])
+        self.assertEqual(len(self.mock.calls), 0)
+
+    def test_push(self):
+        handle, filename = tempfile.mkstemp(suffix=".db")
+        os.close(handle)
+        os.unlink(filename)
+        self.addCleanup(os.unlink, filename)
+        self.server.callback = partial(
+            push,
+            "meetingtool.example.com",
+            "TOKEN",
+            cache_filename=filename,
+            meetingtool_settings={"rate_limit": None},
+        )
+
+        self.mock.add(
+            responses.GET,
+            f"{ORDER_URL}?token=TOKEN&expand=attendees",
+            json={"id": "1234", "attendees": [ATTENDEE]},
+        )
+        self.mock.add(responses.POST, IMPORT_URL, json={})
+
+        payload = {"config": {"action": "order.placed"}, "api_url": ORDER_URL}
+        self.assertEqual(self.send(payload), 200)
+        # Already registered
+        self.assertEqual(self.send(payload), 200)
+
+        posts = [call for call in self.mock.calls if call.request.method == "POST"]
+        self.assertEqual(len(posts), 1)
+        self.assertEqual(json.loads(posts[0].request.body)[0]["mail"], "marco@itnog.it")